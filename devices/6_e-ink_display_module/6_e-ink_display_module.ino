@@ -27,6 +27,10 @@
             1:New Top Text\n
         Set second line:
             2:Second Line Text\n
+        Stage a line without refreshing (batch several lines into one refresh):
+            S1:New Top Text\n
+            S2:Second Line Text\n
+            REFRESH\n
         Special commands:
             CLEAR    -> clears both lines and refreshes display
             REFRESH  -> redraws current text (useful after unintended partial update)
@@ -36,6 +40,9 @@
             - Leading spaces after the colon are trimmed.
             - Display auto-scales each line so both fit (shrinks if too wide / tall).
             - On success you get: "Updated L1 -> 'text'" or "Updated L2 -> 'text'".
+              These (and "Manual refresh done." / "Cleared.") are printed only after the
+              e-paper refresh has finished, so the host can use them as completion acks.
+            - Staged lines reply "Staged L1 -> 'text'" immediately (no refresh).
             - If an input line exceeds 63 chars total, it's dropped with: "Input overflow; line dropped.".
             - Unknown commands print: "Unknown cmd: '...'."
 
@@ -170,6 +177,16 @@ void processCommand(char *cmd) {
         return;
     }
 
+    // Staged format: SN:Text  (store only; a later REFRESH draws all staged lines at once)
+    if (cmd[0] == 'S' && (cmd[1] == '1' || cmd[1] == '2') && cmd[2] == ':') {
+        char *text = ltrim(cmd + 3);
+        char *dst = (cmd[1] == '1') ? line1 : line2;
+        strncpy(dst, text, sizeof(line1) - 1);
+        dst[sizeof(line1) - 1] = '\0';
+        Serial.print(F("Staged L")); Serial.print(cmd[1]); Serial.print(F(" -> '")); Serial.print(dst); Serial.println('\'');
+        return;
+    }
+
     if (strcmp(cmd, "REFRESH") == 0) { updateDisplay(); Serial.println(F("Manual refresh done.")); return; }
     if (strcmp(cmd, "CLEAR") == 0) { line1[0] = 0; line2[0] = 0; updateDisplay(); Serial.println(F("Cleared.")); return; }
     Serial.print(F("Unknown cmd: '")); Serial.print(cmd); Serial.println('\'');
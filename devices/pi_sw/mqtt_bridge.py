@@ -6,7 +6,8 @@ Functions:
   * Discovers all connected BusyBox Arduino modules by listening for alive beacons.
   * Starts a serial reader thread for each data-producing module (buttons, knob, sliders, switches, wires).
   * Publishes every parsed data update immediately to MQTT topics.
-  * Subscribes to a command topic for the e-ink display and forwards commands to the e-ink module's serial port.
+  * Subscribes to a command topic for the e-ink display; a dedicated worker thread queues commands,
+    coalesces superseded line writes into one e-paper refresh and publishes an ack once drawn.
 
 MQTT Topics (default prefix 'busybox'):
   busybox/buttons/state   -> JSON: {"ts": <unix_seconds>, "values": [..]}
@@ -14,19 +15,25 @@ MQTT Topics (default prefix 'busybox'):
   busybox/sliders/state
   busybox/switches/state
   busybox/wires/state
-  busybox/eink/cmd        -> SUBSCRIBE to send commands to e-ink display (payload is raw line, newline optional)
+  busybox/eink/cmd        -> SUBSCRIBE to send commands to e-ink display (payload is raw line, newline optional;
+                             several newline-separated lines, or JSON {"id": .., "cmds": [..]}, are drawn in one refresh)
+  busybox/eink/ack        -> JSON: {"seq", "ids", "cmds", "ok", "error", "queued_s", "draw_s", "ts"} per drawn batch
   busybox/status/bridge   -> Bridge lifecycle events / errors (plain text)
+  busybox/status/modules  -> Retained JSON: {"<device>": {"port": "/dev/ttyUSB0", "usb_serial": "A10K..."}, ...}
+                             (calibration profiles are keyed by these serials)
 
 Example e-ink publishes (from another machine):
   mosquitto_pub -h <pi-host> -t busybox/eink/cmd -m "1:BusyBox Demo"
   mosquitto_pub -h <pi-host> -t busybox/eink/cmd -m "2:Ready!"
   mosquitto_pub -h <pi-host> -t busybox/eink/cmd -m "CLEAR"
   mosquitto_pub -h <pi-host> -t busybox/eink/cmd -m "REFRESH"
+  mosquitto_pub -h <pi-host> -t busybox/eink/cmd -m '{"id": "c1", "cmds": ["1:Press Red", "2:"]}'
 
 CLI Options:
   --broker-host HOST   (default: localhost)
   --broker-port PORT   (default: 1883)
   --discovery-timeout S (default: 8.0)
+  --port-glob PATTERN  (default: /dev/ttyUSB*) serial ports to probe, e.g. the ptys of robots/aloha/sim/fake_busybox.py
   --base-topic PREFIX  (default: busybox)
   --log-file PATH      (optional) append text log
   --verbose            (extra stdout logging)
@@ -47,6 +54,7 @@ from pathlib import Path
 from typing import Dict, Optional
 
 import serial  # type: ignore
+from serial.tools import list_ports  # type: ignore
 import paho.mqtt.client as mqtt  # type: ignore
 
 # ---------------- Configuration Maps ----------------
@@ -69,6 +77,12 @@ WIRES_PREFIX = "Wire States:"
 SLIDERS_PREFIX = "Slider States:"  # A0=123 A1=456
 KNOB_PREFIX = "Knob State:"        # Knob State: 42
 
+# E-ink firmware replies (see 6_e-ink_display_module.ino)
+EINK_ERROR_PREFIXES = ("Unknown cmd:", "Input overflow")
+EINK_REFRESH_TIMEOUT = 10.0   # full e-paper refresh takes a few seconds
+EINK_STAGE_TIMEOUT = 1.0      # staged writes reply immediately
+EINK_COALESCE_WINDOW = 0.05   # seconds to wait for more commands before drawing
+
 # ----------------------------------------------------
 
 def parse_args():
@@ -76,6 +90,7 @@ def parse_args():
     ap.add_argument('--broker-host', default='localhost')
     ap.add_argument('--broker-port', type=int, default=1883)
     ap.add_argument('--discovery-timeout', type=float, default=8.0)
+    ap.add_argument('--port-glob', default='/dev/ttyUSB*')
     ap.add_argument('--base-topic', default='busybox')
     ap.add_argument('--log-file', default=None)
     ap.add_argument('--verbose', action='store_true')
@@ -96,14 +111,14 @@ def log(msg: str, *, state=None, file_handle=None, verbose=False):
 
 # ---------------- Port Discovery --------------------
 
-def identify_ports(timeout: float, verbose=False) -> Dict[str, str]:
-    """Listen on /dev/ttyUSB* for identity beacons.
+def identify_ports(timeout: float, verbose=False, port_glob: str = '/dev/ttyUSB*') -> Dict[str, str]:
+    """Listen on the ports matching `port_glob` for identity beacons.
     Returns mapping: logical_name -> port
     """
     reverse = {}  # identity -> path
     deadline = time.time() + timeout
     open_ports = []
-    for path in glob.glob('/dev/ttyUSB*'):
+    for path in glob.glob(port_glob):
         try:
             ser = serial.Serial(path, BAUD, timeout=0.3)
             open_ports.append(ser)
@@ -133,6 +148,16 @@ def identify_ports(timeout: float, verbose=False) -> Dict[str, str]:
         logical[logical_name] = port
     return logical
 
+def module_report(mapping: Dict[str, str]) -> Dict[str, Dict[str, Optional[str]]]:
+    """logical_name -> {"port", "usb_serial"} for the discovered modules."""
+    serials = {}
+    try:
+        for info in list_ports.comports():
+            serials[info.device] = info.serial_number
+    except Exception:
+        pass
+    return {name: {"port": port, "usb_serial": serials.get(port)} for name, port in mapping.items()}
+
 # ---------------- Data Parsing ----------------------
 
 def parse_values(device: str, line: str):
@@ -214,6 +239,40 @@ class EinkSink:
         except Exception:
             return False
 
+    def flush_input(self):
+        """Drop unread replies (late acks, beacon chatter) so the next reply belongs to the next command."""
+        if not self.ser:
+            return
+        try:
+            self.ser.reset_input_buffer()
+        except Exception:
+            pass
+
+    def read_line(self) -> Optional[str]:
+        """Read one reply line from the firmware ('' on timeout, None if the port is unusable)."""
+        if not self.ser:
+            return None
+        try:
+            return self.ser.readline().decode(errors='ignore').strip()
+        except Exception:
+            return None
+
+    def wait_for(self, prefixes, timeout: float):
+        """Read replies until one starts with any of `prefixes`. Returns (ok, reply_line)."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            line = self.read_line()
+            if line is None:
+                return False, None
+            if not line:
+                continue
+            if line.startswith(EINK_ERROR_PREFIXES):
+                return False, line
+            if line.startswith(prefixes):
+                return True, line
+            # anything else is beacon chatter ("e-ink_display_module", "Display Lines: ...")
+        return False, None
+
     def close(self):
         try:
             if self.ser:
@@ -221,6 +280,148 @@ class EinkSink:
         except Exception:
             pass
 
+
+def parse_eink_payload(payload: str):
+    """Split an e-ink cmd payload into (request_id, [commands]).
+
+    Accepted forms:
+      "1:Text"                          single command (legacy)
+      "1:Top\n2:Bottom"                 several commands, drawn with one refresh
+      {"id": "abc", "cmds": ["1:Top", "2:Bottom"]}   JSON; `id` is echoed in the ack
+    """
+    payload = payload.strip()
+    req_id = None
+    if payload.startswith('{'):
+        try:
+            obj = json.loads(payload)
+            req_id = obj.get('id')
+            cmds = obj.get('cmds', [])
+            if isinstance(cmds, str):
+                cmds = cmds.split('\n')
+        except Exception:
+            cmds = [payload]
+    else:
+        cmds = payload.split('\n')
+    cmds = [c.strip('\r') for c in cmds if c.strip()]
+    return req_id, cmds
+
+
+def coalesce_eink_commands(cmds):
+    """Collapse a command list into the minimal display operation.
+
+    Later line writes supersede earlier ones, CLEAR resets both lines, and REFRESH
+    is implied by any line change. Returns (lines, refresh, passthrough) where
+    `lines` maps '1'/'2' -> final text, `refresh` is True if a bare redraw was
+    requested, and `passthrough` holds unrecognized commands forwarded verbatim.
+    """
+    lines: Dict[str, str] = {}
+    refresh = False
+    passthrough = []
+    for cmd in cmds:
+        if len(cmd) >= 2 and cmd[0] in '12' and cmd[1] == ':':
+            lines[cmd[0]] = cmd[2:].lstrip(' \t')
+        elif cmd == 'CLEAR':
+            lines = {'1': '', '2': ''}
+        elif cmd == 'REFRESH':
+            refresh = True
+        else:
+            passthrough.append(cmd)
+    return lines, refresh, passthrough
+
+
+def _passthrough_op(cmd):
+    """(cmd, expected reply prefix, timeout) for a forwarded command; a None prefix sends it without an ack."""
+    if len(cmd) >= 3 and cmd[0] == 'S' and cmd[1] in '12' and cmd[2] == ':':
+        return cmd, f"Staged L{cmd[1]}", EINK_STAGE_TIMEOUT
+    return cmd, None, 0.0
+
+
+class EinkWorker(threading.Thread):
+    """Owns the e-ink port so MQTT callbacks never block on the slow e-paper refresh.
+
+    Requests queue up while a refresh is in progress; everything pending is then
+    coalesced into a single screen update (staged S1/S2 writes + one REFRESH),
+    completion is read back from the firmware (input is flushed before each
+    write and only that command's own reply counts), and `on_ack` is called
+    once per coalesced batch with the request ids it covered.
+    """
+
+    def __init__(self, sink: EinkSink, on_ack, stop_event: threading.Event, verbose=False):
+        super().__init__(daemon=True)
+        self.sink = sink
+        self.on_ack = on_ack
+        self.stop_event = stop_event
+        self.verbose = verbose
+        self.requests: queue.Queue = queue.Queue()
+        self.seq = 0
+
+    def submit(self, cmds, req_id=None):
+        self.requests.put((time.time(), req_id, list(cmds)))
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                first = self.requests.get(timeout=0.3)
+            except queue.Empty:
+                continue
+            batch = [first]
+            # Let a burst of separate publishes ("1:..." then "2:...") land before drawing.
+            deadline = time.time() + EINK_COALESCE_WINDOW
+            while True:
+                try:
+                    batch.append(self.requests.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+            self._apply(batch)
+
+    def _apply(self, batch):
+        self.seq += 1
+        t_start = time.time()
+        cmds = [c for _, _, req_cmds in batch for c in req_cmds]
+        ids = [req_id for _, req_id, _ in batch if req_id is not None]
+        ok, error = self._draw(cmds)
+        t_done = time.time()
+        if self.verbose:
+            print(f"E-ink batch {self.seq}: {cmds} ok={ok} ({t_done - t_start:.2f}s)")
+        self.on_ack({
+            "seq": self.seq,
+            "ids": ids,
+            "cmds": cmds,
+            "ok": ok,
+            "error": error,
+            "queued_s": round(t_start - batch[0][0], 3),
+            "draw_s": round(t_done - t_start, 3),
+            "ts": t_done,
+        })
+
+    def _draw(self, cmds):
+        if not self.sink.ser:
+            return False, "no e-ink port"
+        lines, refresh, passthrough = coalesce_eink_commands(cmds)
+        if len(lines) == 1:
+            idx, text = next(iter(lines.items()))
+            ops = [(f"{idx}:{text}", f"Updated L{idx}", EINK_REFRESH_TIMEOUT)]
+        elif lines == {'1': '', '2': ''}:
+            ops = [("CLEAR", "Cleared.", EINK_REFRESH_TIMEOUT)]
+        elif lines:
+            ops = [(f"S{idx}:{text}", f"Staged L{idx}", EINK_STAGE_TIMEOUT) for idx, text in sorted(lines.items())]
+            ops.append(("REFRESH", "Manual refresh done.", EINK_REFRESH_TIMEOUT))
+        elif refresh:
+            ops = [("REFRESH", "Manual refresh done.", EINK_REFRESH_TIMEOUT)]
+        else:
+            ops = []
+        ops += [_passthrough_op(cmd) for cmd in passthrough]
+        for cmd, expect, timeout in ops:
+            self.sink.flush_input()
+            if not self.sink.send(cmd):
+                return False, f"write failed: {cmd}"
+            if expect is None:
+                continue  # no known reply to wait for
+            ok, reply = self.sink.wait_for(expect, timeout)
+            if not ok:
+                return False, reply or f"no completion for: {cmd}"
+        return True, None
+
 # ---------------- MQTT Bridge -----------------------
 
 def main():
@@ -232,12 +433,13 @@ def main():
     print(f"  --broker-host {args.broker_host}")
     print(f"  --broker-port {args.broker_port}")
     print(f"  --discovery-timeout {args.discovery_timeout}")
+    print(f"  --port-glob {args.port_glob}")
     print(f"  --base-topic {args.base_topic}")
     print(f"  --log-file {args.log_file}")
     print(f"  --verbose {args.verbose}")
 
     log("Discovering modules...", file_handle=log_fp, verbose=True)
-    mapping = identify_ports(args.discovery_timeout, verbose=args.verbose)
+    mapping = identify_ports(args.discovery_timeout, verbose=args.verbose, port_glob=args.port_glob)
     if not mapping:
         log("No modules discovered; exiting.", file_handle=log_fp, verbose=True)
         return 1
@@ -250,6 +452,21 @@ def main():
     q: queue.Queue = queue.Queue()
     stop_event = threading.Event()
 
+    base = args.base_topic.rstrip('/')
+    eink_ack_topic = f"{base}/eink/ack"
+    client = None  # set below; the e-ink worker only publishes after connect
+
+    def publish_eink_ack(ack: dict):
+        if not ack["ok"]:
+            log(f"E-ink batch {ack['seq']} failed ({ack['error']}): {ack['cmds']}", file_handle=log_fp, verbose=True)
+        try:
+            client.publish(eink_ack_topic, json.dumps(ack), qos=0, retain=False)
+        except Exception:
+            pass
+
+    eink_worker = EinkWorker(eink_sink, publish_eink_ack, stop_event, verbose=args.verbose)
+    eink_worker.start()
+
     readers = []
     for dev in DATA_DEVICE_NAMES:
         if dev in mapping:
@@ -277,10 +494,10 @@ def main():
         if topic.endswith('/eink/cmd'):
             if eink_sink.port is None:
                 log("E-ink command received but no e-ink port available", file_handle=log_fp, verbose=True)
-            else:
-                ok = eink_sink.send(payload)
-                if not ok:
-                    log(f"Failed writing to e-ink: {payload}", file_handle=log_fp, verbose=True)
+            req_id, cmds = parse_eink_payload(payload)
+            if cmds:
+                # Never touch the serial port here: the worker acks once the refresh is done.
+                eink_worker.submit(cmds, req_id)
 
     client.on_connect = on_connect
     client.on_message = on_message
@@ -289,12 +506,12 @@ def main():
         client.connect(args.broker_host, args.broker_port, keepalive=30)
     except Exception as e:
         log(f"Cannot connect to MQTT broker: {e}", file_handle=log_fp, verbose=True)
+        stop_event.set()
         eink_sink.close()
         return 2
 
     client.loop_start()
 
-    base = args.base_topic.rstrip('/')
     status_topic = f"{base}/status/bridge"
 
     def publish_status(text: str):
@@ -304,6 +521,12 @@ def main():
             pass
 
     publish_status("online")
+    modules = module_report(mapping)
+    try:
+        client.publish(f"{base}/status/modules", json.dumps(modules), qos=1, retain=True)
+    except Exception:
+        pass
+    log(f"Module serials: {modules}", file_handle=log_fp, verbose=args.verbose)
 
     # Graceful shutdown
     running = True
@@ -316,11 +539,11 @@ def main():
     try:
         while running:
             try:
-                _, dev, vals = q.get(timeout=0.3)
+                ts, dev, vals = q.get(timeout=0.3)
             except queue.Empty:
                 continue
             topic = f"{base}/{dev}/state"
-            payload = json.dumps({"values": vals})
+            payload = json.dumps({"ts": ts, "values": vals})  # ts: when the serial line was read
             try:
                 client.publish(topic, payload, qos=0, retain=False)
                 if args.verbose:
@@ -332,6 +555,7 @@ def main():
         stop_event.set()
         for t in readers:
             t.join(timeout=1.0)
+        eink_worker.join(timeout=1.0)
         eink_sink.close()
         client.loop_stop()
         try:
@@ -0,0 +1,313 @@
+"""ClientScheduler: run policy clients with warm servers, hard timeouts and latency records.
+
+`eval_bbx_client.py` used to launch every client with `subprocess.run(shell=True)`
+and no timeout, so a hung client blocked the session, and with several
+clients each rollout paid every model's start-up in turn. The scheduler:
+
+- keeps each client's policy server (`server_command`, e.g. openpi's
+  `serve_policy.py` or the GR00T inference server) running for the whole
+  session, and starts the next client's server in the background while the
+  current client runs (`warm()`); at most `max_warm` servers are kept up, the
+  least recently used idle one is stopped first;
+- runs the per-rollout client command in its own process group and enforces
+  `task_timeout` (+ `grace_s`) for real: SIGINT to the group, SIGKILL after
+  `kill_after_s`; an optional `TaskSuccessOracle` stops it early on success;
+- records, per run, the server wait, the client start-up (spawn until the
+  first output line matching `ready_pattern`, when configured) and the run
+  time after that, so model start-up and inference can be compared per client.
+
+Clients are configured in `bbx_eval_config.yaml` under CLIENTS_TO_EVALUATE,
+either as a plain command string (as before) or as a mapping:
+
+    - RUN_OPENPI_CLIENT_COMMAND:
+        command: "cd ~/openpi/examples/aloha_real && source .venv/bin/activate && python3 main.py"
+        server_command: "cd ~/openpi && uv run scripts/serve_policy.py --env ALOHA"
+        server_port: 8000
+        ready_pattern: "Connected to server"
+
+Servers run in their own sessions, so Ctrl+C in the terminal does not reach
+them: use the scheduler as a context manager (or call `shutdown()` in a
+`finally`) so they are stopped however the evaluation ends. `run()` raises
+`ServerStartError` when a client's server exits or never starts listening.
+
+Typical usage:
+
+    with ClientScheduler(specs, task_timeout=30) as scheduler:
+        scheduler.warm(specs[0].name)
+        try:
+            result = scheduler.run(specs[0].name, "Push the blue button.", oracle=oracle)
+            print(result.startup_s, result.run_s, result.timed_out)
+        except ServerStartError as e:
+            ...  # record an error result for this client
+"""
+import os
+import re
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class ServerStartError(RuntimeError):
+    """A client's policy server exited or did not start listening in time."""
+
+
+class ClientSpec:
+    def __init__(self, name, command, server_command=None, server_port=None, server_host="localhost",
+                 ready_pattern=None, server_startup_timeout=300.0):
+        self.name = name
+        self.command = command
+        self.server_command = server_command
+        self.server_port = server_port
+        self.server_host = server_host
+        self.ready_pattern = re.compile(ready_pattern) if ready_pattern else None
+        self.server_startup_timeout = server_startup_timeout
+
+    @classmethod
+    def from_config(cls, name, value):
+        """From a CLIENTS_TO_EVALUATE entry: a command string or a mapping with a `command` key."""
+        if isinstance(value, str):
+            return cls(name, value)
+        return cls(name, **value)
+
+    def shell_cmd(self, prompt, timeout):
+        """Client command line for one prompt (the flags each client type understands)."""
+        client_key = self.name.upper()
+        if "OPENPI" in client_key:
+            return f"{self.command} --args.prompt {shlex.quote(prompt)} --args.prompt_timeout {timeout}"
+        if "GR00T" in client_key:
+            return f"{self.command} -l {shlex.quote(prompt)} -t {timeout}"
+        raise ValueError(f"Unknown client type for client {self.name}")
+
+    def __repr__(self):
+        return f"ClientSpec({self.name!r}, server={'yes' if self.server_command else 'no'})"
+
+
+class RunResult:
+    def __init__(self, client, returncode, timed_out, stopped_early, server_wait_s, startup_s, run_s, wall_s):
+        self.client = client
+        self.returncode = returncode
+        self.timed_out = timed_out
+        self.stopped_early = stopped_early
+        self.server_wait_s = server_wait_s  # time spent waiting for a server that was still starting
+        self.startup_s = startup_s  # client spawn -> ready_pattern (None if not configured / never seen)
+        self.run_s = run_s  # after start-up until exit
+        self.wall_s = wall_s
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def _stop_group(proc, kill_after_s):
+    """SIGINT the process group, SIGKILL it if it has not exited after `kill_after_s`."""
+    if proc.poll() is not None:
+        return proc.returncode
+    try:
+        os.killpg(proc.pid, signal.SIGINT)
+        return proc.wait(timeout=kill_after_s)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass  # the group exited after the timeout
+        return proc.wait()
+    except ProcessLookupError:
+        return proc.wait()
+
+
+class _Server:
+    """A client's long-running policy server and its readiness."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.proc = None
+        self.ready = threading.Event()
+        self.failed = None
+        self.spawned_at = None
+        self.startup_s = None
+
+    def start(self):
+        self.spawned_at = time.monotonic()
+        self.proc = subprocess.Popen(self.spec.server_command, shell=True, executable="/bin/bash",
+                                     start_new_session=True)
+        threading.Thread(target=self._wait_ready, daemon=True).start()
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def _wait_ready(self):
+        deadline = self.spawned_at + self.spec.server_startup_timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                self.failed = f"server exited with code {self.proc.returncode}"
+                break
+            if self.spec.server_port is None or self._port_open():
+                self.startup_s = time.monotonic() - self.spawned_at
+                print(f"[ClientScheduler] {self.spec.name} server ready after {self.startup_s:.1f}s")
+                break
+            time.sleep(0.2)
+        else:
+            self.failed = f"server not listening on port {self.spec.server_port} after {self.spec.server_startup_timeout:.0f}s"
+        self.ready.set()
+
+    def _port_open(self):
+        try:
+            with socket.create_connection((self.spec.server_host, self.spec.server_port), timeout=0.5):
+                return True
+        except OSError:
+            return False
+
+    def stop(self, kill_after_s):
+        if self.proc is not None:
+            _stop_group(self.proc, kill_after_s)
+
+
+class ClientScheduler:
+    def __init__(self, specs, task_timeout, grace_s=10.0, kill_after_s=5.0, max_warm=None, poll_dt=0.05):
+        self.specs = {spec.name: spec for spec in specs}
+        self.task_timeout = task_timeout
+        self.grace_s = grace_s
+        self.kill_after_s = kill_after_s
+        self.max_warm = max_warm
+        self.poll_dt = poll_dt
+        self.results = []
+        self._servers = OrderedDict()  # name -> _Server, least recently used first
+        self._active = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    # ------------- Servers -------------
+    def warm(self, name):
+        """Start `name`'s server in the background if it is not running (no-op without server_command)."""
+        spec = self.specs[name]
+        if spec.server_command is None:
+            return
+        server = self._servers.get(name)
+        if server is not None and server.alive():
+            self._servers.move_to_end(name)
+            return
+        if server is not None:
+            print(f"[ClientScheduler] {name} server died ({server.failed or 'exited'}); restarting")
+        self._evict(keep=name)
+        server = _Server(spec)
+        server.start()
+        self._servers[name] = server
+        print(f"[ClientScheduler] warming {name} server")
+
+    def _evict(self, keep):
+        if self.max_warm is None:
+            return
+        while len([n for n, s in self._servers.items() if s.alive()]) >= self.max_warm:
+            idle = [n for n, s in self._servers.items() if n not in (keep, self._active) and s.alive()]
+            if not idle:
+                return
+            print(f"[ClientScheduler] stopping {idle[0]} server to stay within {self.max_warm} warm")
+            self._servers.pop(idle[0]).stop(self.kill_after_s)
+
+    def _wait_server(self, name):
+        """Block until `name`'s server is ready; returns the time waited."""
+        if self.specs[name].server_command is None:
+            return 0.0
+        self.warm(name)
+        t0 = time.monotonic()
+        server = self._servers[name]
+        server.ready.wait()
+        if server.failed:
+            raise ServerStartError(f"{name}: {server.failed}")
+        return time.monotonic() - t0
+
+    # ------------- Runs -------------
+    def run(self, name, prompt, oracle=None, early_stop=True):
+        """Run client `name` on `prompt` until it exits, times out or (with an oracle) succeeds."""
+        spec = self.specs[name]
+        self._active = name
+        try:
+            server_wait_s = self._wait_server(name)
+            return self._run_client(spec, spec.shell_cmd(prompt, self.task_timeout), oracle, early_stop, server_wait_s)
+        finally:
+            self._active = None
+
+    def _run_client(self, spec, shell_cmd, oracle, early_stop, server_wait_s):
+        ready_at = []
+        t0 = time.monotonic()
+        proc = subprocess.Popen(
+            shell_cmd, shell=True, executable="/bin/bash", start_new_session=True,
+            stdout=subprocess.PIPE if spec.ready_pattern else None,
+            stderr=subprocess.STDOUT if spec.ready_pattern else None,
+            text=True, bufsize=1,
+        )
+        reader = None
+        if spec.ready_pattern:
+            reader = threading.Thread(target=self._echo, args=(proc, spec.ready_pattern, ready_at), daemon=True)
+            reader.start()
+
+        timed_out = stopped_early = False
+        deadline = t0 + self.task_timeout + self.grace_s
+        try:
+            while proc.poll() is None:
+                if early_stop and oracle is not None and oracle.succeeded.is_set():
+                    print(f"[ClientScheduler] success after {oracle.time_to_success:.1f}s; stopping {spec.name} early.")
+                    stopped_early = True
+                    break
+                if time.monotonic() > deadline:
+                    print(f"[ClientScheduler] {spec.name} still running {self.task_timeout + self.grace_s:.0f}s "
+                          "after start; stopping it.")
+                    timed_out = True
+                    break
+                time.sleep(self.poll_dt)
+        except KeyboardInterrupt:
+            _stop_group(proc, self.kill_after_s)
+            raise
+        returncode = _stop_group(proc, self.kill_after_s)
+        wall_s = time.monotonic() - t0
+        if reader is not None:
+            reader.join(timeout=1.0)
+
+        startup_s = ready_at[0] - t0 if ready_at else None
+        result = RunResult(spec.name, returncode, timed_out, stopped_early, server_wait_s, startup_s,
+                           wall_s - (startup_s or 0.0), wall_s)
+        self.results.append(result)
+        return result
+
+    @staticmethod
+    def _echo(proc, pattern, ready_at):
+        for line in proc.stdout:
+            sys.stdout.write(line)
+            if not ready_at and pattern.search(line):
+                ready_at.append(time.monotonic())
+        sys.stdout.flush()
+
+    # ------------- Reporting -------------
+    def summary(self):
+        """Per-client mean server wait / start-up / run seconds and timeout count."""
+        out = {}
+        for name in self.specs:
+            runs = [r for r in self.results if r.client == name]
+            if not runs:
+                continue
+            startups = [r.startup_s for r in runs if r.startup_s is not None]
+            server = self._servers.get(name)
+            out[name] = {
+                "runs": len(runs),
+                "timeouts": sum(r.timed_out for r in runs),
+                "server_startup_s": server.startup_s if server is not None else None,
+                "mean_server_wait_s": sum(r.server_wait_s for r in runs) / len(runs),
+                "mean_startup_s": sum(startups) / len(startups) if startups else None,
+                "mean_run_s": sum(r.run_s for r in runs) / len(runs),
+            }
+        return out
+
+    def shutdown(self):
+        for name, server in list(self._servers.items()):
+            if server.alive():
+                print(f"[ClientScheduler] stopping {name} server")
+            server.stop(self.kill_after_s)
+        self._servers.clear()
@@ -1,19 +1,19 @@
+import copy
 import json
-import subprocess
 import random
-import threading
-import time
 from datetime import datetime
 
+from client_scheduler import ClientScheduler, ClientSpec, ServerStartError
 from generate_task_eval_list import BoxState
-
-# Load configuration from a YAML file
-CONFIG_PATH = "bbx_eval_config.yaml"
+from results_store import ResultsStore, rollout_keys
+from rollout_ordering import expected_end_state, state_changes
 
 import yaml
 import os
 import sys
-import cv2
+
+# Load configuration from a YAML file (BBX_EVAL_CONFIG overrides the path, e.g. for the headless simulator)
+CONFIG_PATH = os.environ.get("BBX_EVAL_CONFIG", "bbx_eval_config.yaml")
 
 
 def _load_config(path):
@@ -28,105 +28,303 @@ DRY_RUN = _config["DRY_RUN"]
 TASK_TIMEOUT = _config["TASK_TIMEOUT"]  # seconds
 RECORD_VIDEOS = _config["RECORD_VIDEOS"]
 if RECORD_VIDEOS:
+    from video_recorder import VideoRecorder, busybox_events
+
     os.makedirs("eval_videos", exist_ok=True)
     VIDEO_DEVICE_INDEX = _config["VIDEO_DEVICE_INDEX"]
+    VIDEO_BACKEND = _config.get("VIDEO_BACKEND", "auto")  # "ffmpeg" | "opencv" | "auto"
+    VIDEO_CODEC = _config.get("VIDEO_CODEC", "libx264")  # ffmpeg encoder, e.g. h264_nvenc
+    VIDEO_QUEUE_SIZE = _config.get("VIDEO_QUEUE_SIZE", 64)  # frames buffered before dropping
 
 # paths
 TASK_EVAL_LIST_PATH = _config["TASK_EVAL_LIST_PATH"]
-OUTPUT_JSON_PATH = _config["OUTPUT_JSON_PATH"]
+OUTPUT_JSON_PATH = _config["OUTPUT_JSON_PATH"]  # legacy results file, imported into the log once
+RESULTS_LOG_PATH = _config.get("RESULTS_LOG_PATH", os.path.splitext(OUTPUT_JSON_PATH)[0] + ".jsonl")
 
 # shell commands / clients
 SLEEP_COMMAND = _config["SLEEP_COMMAND"]
 
+# automatic success checking from the instrumented BusyBox (optional keys)
+AUTO_SUCCESS_CHECK = _config.get("AUTO_SUCCESS_CHECK", False)
+EARLY_STOP_ON_SUCCESS = _config.get("EARLY_STOP_ON_SUCCESS", True)
+SUCCESS_SETTLE_TIME = _config.get("SUCCESS_SETTLE_TIME", 0.3)  # seconds the end state must hold
+MQTT_BROKER = _config.get("MQTT_BROKER", "localhost")
+MQTT_PORT = _config.get("MQTT_PORT", 1883)
+# task categories whose end state the box can observe (turn_knob added if the knob is calibrated)
+ORACLE_STATE_CATEGORIES = {"move_slider", "flip_switch", "pull_wire", "insert_wire"}
+
+# client scheduling (optional keys): hard-stop grace after TASK_TIMEOUT, policy servers kept warm at once
+CLIENT_GRACE_TIME = _config.get("CLIENT_GRACE_TIME", 10)  # seconds
+MAX_WARM_SERVERS = _config.get("MAX_WARM_SERVERS")  # None: keep every client's server up
+
 # New config format supports a list of clients under CLIENTS_TO_EVALUATE.
 _raw_clients = _config["CLIENTS_TO_EVALUATE"]
 
 _clients = []
 for item in _raw_clients:
     for k, v in item.items():
-        _clients.append((k, v))
-
-
-def load_tally_system(output_json_path):
-    """Load the tally system from the output JSON file."""
-    with open(output_json_path, "r") as f:
-        output_data = json.load(f)
-    tally = output_data.get("tally", {})
-    notes = output_data.get("notes", [])
-    index = output_data.get("index", 0)
-    meta = output_data.get("meta", [])
-    print(f"Loaded previous evaluation from {output_json_path}:")
-    print(f"  - Current index: {index}")
-    print(
-        f'Last task performed was "{notes[-1]["task_prompt"]}"'
-        if notes
-        else "No tasks performed yet."
-    )
-    return tally, notes, index, meta
+        _clients.append(ClientSpec.from_config(k, v))
+
+
+def open_results_store(rollout_key_list):
+    """Open the results log, importing the legacy OUTPUT_JSON_PATH file the first time."""
+    store = ResultsStore(RESULTS_LOG_PATH)
+    if not store.sessions and os.path.exists(OUTPUT_JSON_PATH):
+        imported = store.import_legacy(OUTPUT_JSON_PATH, rollout_key_list)
+        print(f"Imported {imported} results from {OUTPUT_JSON_PATH} into {RESULTS_LOG_PATH}.")
+    if store.results():
+        last = store.results()[-1]
+        print(f"Loaded previous evaluation from {RESULTS_LOG_PATH}: {len(store.results())} results, "
+              f'last task performed was "{last.get("task_prompt")}"')
+    else:
+        print(f"Starting new evaluation at {RESULTS_LOG_PATH}.")
+    return store
 
 
-def start_video_capture(output_path: str, device_index: int):
-    cap = cv2.VideoCapture(device_index)
-    if not cap.isOpened():
-        raise RuntimeError(f"Could not open video device {device_index}")
+repo_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if repo_root not in sys.path:
+    sys.path.insert(0, repo_root)
 
-    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 640)
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 480)
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-    if not writer.isOpened():
-        cap.release()
-        raise RuntimeError(f"Could not open video writer for {output_path}")
 
-    stop_event = threading.Event()
+class SessionHooks:
+    """Operator and robot interaction of an evaluation session.
 
-    def _capture_loop():
-        while not stop_event.is_set():
-            ret, frame = cap.read()
-            if ret:
-                writer.write(frame)
-            else:
-                time.sleep(0.01)
+    The defaults ask the operator at the terminal and leave the robot alone
+    (DRY_RUN); RobotHooks resets the arms between rollouts, and
+    scripts/run_headless_eval.py drives run_session() with a simulated box.
+    With a `busybox_listener`, state and button tasks are judged by a
+    TaskSuccessOracle decoding with `calibration` (default: the box's profile).
+    """
 
-    thread = threading.Thread(target=_capture_loop, daemon=True)
-    thread.start()
+    def __init__(self, busybox_listener=None, calibration=None):
+        self.busybox_listener = busybox_listener
+        self.calibration = calibration
+        self.state_categories = set(ORACLE_STATE_CATEGORIES)
+        if busybox_listener is not None:
+            from robots.aloha.utils.success_oracle import default_calibration
 
-    def stop_and_close():
-        stop_event.set()
-        thread.join(timeout=2.0)
-        writer.release()
-        cap.release()
+            self.calibration = calibration or default_calibration()
+            if self.calibration.knob is not None:
+                self.state_categories.add("turn_knob")
 
-    return stop_and_close
+    def set_up_box(self, rollout):
+        """Return once the box is in the rollout's initial state (printed by run_session)."""
+        input("\nPress Enter to continue...")
 
+    def reset_robot(self):
+        pass
 
-if not DRY_RUN:
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    helpers_path = os.path.abspath(os.path.join(base_dir, "..", "busybox_utils"))
-    if helpers_path not in sys.path:
-        sys.path.insert(0, helpers_path)
+    def make_success_oracle(self, rollout: dict, task_prompt: str):
+        """Build an oracle for the rollout's expected end state, or None if not observable."""
+        if self.busybox_listener is None:
+            return None
+        from robots.aloha.utils.success_oracle import TaskSuccessOracle, target_from_box_state
 
-    from real_aloha_helpers import bringup_robots
-    from aloha.constants import LEADER_GRIPPER_JOINT_MID, START_ARM_POSE
-    from aloha.robot_utils import move_arms, move_grippers
-    _, env = bringup_robots()
+        task_category = rollout["task_category"]
+        if task_category == "push_button":
+            return TaskSuccessOracle(self.busybox_listener, button=rollout["target"], calibration=self.calibration)
+        if task_category not in self.state_categories:
+            return None
+        expected_box = BoxState()
+        expected_box.load_from_dict(copy.deepcopy(rollout["init_box_state"]))
+        expected_state = expected_box.update_assuming_task_performed(
+            {"task_str": task_prompt, "task_category": task_category, "target": rollout["target"]}
+        )
+        return TaskSuccessOracle(
+            self.busybox_listener,
+            target_state=target_from_box_state(expected_state, self.calibration),
+            settle_s=SUCCESS_SETTLE_TIME,
+            calibration=self.calibration,
+        )
+
+    def ask_success(self, client_name):
+        return input(f"Was the task successful for client {client_name}? (y/n): ").strip().lower() == "y"
+
+    def ask_note(self, client_name):
+        return input(f"Any notes for client {client_name} on this task? (press Enter to skip): ").strip()
+
+
+class RobotHooks(SessionHooks):
+    """SessionHooks that bring up the robots and move them to the start pose between rollouts."""
+
+    def __init__(self, busybox_listener=None, calibration=None):
+        super().__init__(busybox_listener, calibration)
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        helpers_path = os.path.abspath(os.path.join(base_dir, "..", "busybox_utils"))
+        if helpers_path not in sys.path:
+            sys.path.insert(0, helpers_path)
+
+        from real_aloha_helpers import bringup_robots
+        _, self.env = bringup_robots()
+
+    def reset_robot(self):
+        from aloha.constants import LEADER_GRIPPER_JOINT_MID, START_ARM_POSE
+        from aloha.robot_utils import move_arms, move_grippers
 
-    def perform_opening_ceremony():
         print("Performing opening ceremony...")
         start_arm_qpos = START_ARM_POSE[:6]
         move_arms(
-            [env.follower_bot_left, env.follower_bot_right],
+            [self.env.follower_bot_left, self.env.follower_bot_right],
             [start_arm_qpos] * 4,
             moving_time=2.0,
         )
         move_grippers(
-            [env.follower_bot_left, env.follower_bot_right],
+            [self.env.follower_bot_left, self.env.follower_bot_right],
             [LEADER_GRIPPER_JOINT_MID] * 2,
             moving_time=0.5,
         )
 
 
+def run_session(eval_order, keys, selected_clients, store, hooks):
+    """Evaluate every pending (rollout, client) pair of `eval_order` into `store`."""
+    with ClientScheduler(selected_clients, TASK_TIMEOUT, grace_s=CLIENT_GRACE_TIME,
+                         max_warm=MAX_WARM_SERVERS) as scheduler:  # stops the warm servers however the session ends
+        if not DRY_RUN:
+            scheduler.warm(selected_clients[0].name)
+            hooks.reset_robot()
+
+        box = BoxState()  # to track current box state
+        previous_end_state = None
+
+        for i, rollout in enumerate(eval_order):
+            # resume per (rollout, client): only clients without a recorded result
+            pending_clients = [c for c in selected_clients if not store.is_done(keys[i], c.name)]
+            if not pending_clients:
+                continue
+            task_category = rollout["task_category"]
+            task_prompt = rollout.get("task_str") or rollout["task_prompt"]
+            init_box_state = rollout["init_box_state"]
+            if previous_end_state is None and i > 0:
+                previous_end_state = expected_end_state(eval_order[i - 1])
+
+            print("\n" + "=" * 40 + "\n")
+            print(f"Evaluating [{task_category}]: \033[1m\033[93m{task_prompt}\033[0m\n")
+
+            print("Before proceeeding, please set the task's initial state as follows:")
+            box.load_from_dict(init_box_state)
+            print(box)
+            if previous_end_state is not None:
+                changes = state_changes(previous_end_state, init_box_state)
+                print(f"\nChanges from the end of the last task: {', '.join(changes) if changes else 'none'}")
+            previous_end_state = expected_end_state(rollout)
+            end_box_state = previous_end_state
+            hooks.set_up_box(rollout)
+
+            # For each selected client, run the client and collect success/failure
+            random.shuffle(pending_clients)
+            for k, client in enumerate(pending_clients):
+                client_name = client.name
+                run_result = run_error = None
+                temp_video_path = final_video_path = None
+                print(f'Task "{task_prompt}" executing on client {client_name}...')
+                oracle = hooks.make_success_oracle(rollout, task_prompt)
+                if oracle is not None and not oracle.verifiable:
+                    oracle = None
+
+                if DRY_RUN:
+                    print("Dry run mode - skipping task execution.")
+                else:
+                    # start the next client's server while this one runs
+                    if k + 1 < len(pending_clients):
+                        scheduler.warm(pending_clients[k + 1].name)
+
+                    recorder = None
+                    try:
+                        if RECORD_VIDEOS:
+                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                            video_path_prefix = f"eval_videos/{i:02d}_{client_name}_{task_category}_{timestamp}_"
+                            temp_video_path = f"{video_path_prefix}recording.mp4"
+                            recorder = VideoRecorder(temp_video_path, VIDEO_DEVICE_INDEX, backend=VIDEO_BACKEND,
+                                                     codec=VIDEO_CODEC, queue_size=VIDEO_QUEUE_SIZE).start()
+
+                        if oracle is not None:
+                            oracle.start()
+                        if recorder:
+                            recorder.mark("rollout_start", client=client_name, task_prompt=task_prompt)
+                        run_result = scheduler.run(client_name, task_prompt, oracle, early_stop=EARLY_STOP_ON_SUCCESS)
+                        if recorder:
+                            recorder.mark("rollout_end", timed_out=run_result.timed_out, stopped_early=run_result.stopped_early)
+                        if run_result.timed_out:
+                            print(f"{client_name} client timed out after {TASK_TIMEOUT} seconds. Treating as valid end of run.")
+                    except ServerStartError as e:
+                        run_error = str(e)
+                        print(f"\033[91m{run_error}; recording an error result for {client_name}.\033[0m")
+                    except KeyboardInterrupt:
+                        print("\033[91mInterrupted by user. Continuing evaluation. Press Ctrl+C again to exit.\033[0m")
+                    finally:
+                        if recorder:
+                            events = []
+                            if oracle is not None and oracle.time_to_success is not None:
+                                events.append({"label": "success", "ts": oracle.t_start + oracle.time_to_success})
+                            if hooks.busybox_listener is not None:
+                                events += busybox_events(hooks.busybox_listener, recorder.started_at)
+                            recorder.stop(events)
+
+                if run_error is not None:
+                    if oracle is not None:
+                        oracle.stop()
+                    # not done for resume: the next session retries this client on the rollout
+                    store.append_result(keys[i], client_name, None, index=i, task_category=task_category,
+                                        task_prompt=task_prompt, target=rollout["target"], error=run_error)
+                    hooks.reset_robot()
+                    continue
+
+                time_to_success = None
+                if oracle is not None and not DRY_RUN:
+                    oracle.stop()
+                    if not oracle.verifiable:  # the live state could not be checked; ask the operator
+                        oracle = None
+                if oracle is not None and not DRY_RUN:
+                    is_rollout_success = oracle.succeeded.is_set()
+                    time_to_success = oracle.time_to_success
+                    print(
+                        f"Auto-judged {'SUCCESS' if is_rollout_success else 'FAIL'} for client {client_name}"
+                        + (f" (time to success {time_to_success:.1f}s)" if is_rollout_success else "")
+                    )
+                else:
+                    is_rollout_success = hooks.ask_success(client_name)
+
+                if not DRY_RUN:
+                    hooks.reset_robot()
+
+                if RECORD_VIDEOS and temp_video_path:
+                    final_video_path = f"{video_path_prefix}{is_rollout_success}.mp4"
+                    try:
+                        recorder.rename(final_video_path)
+                    except FileNotFoundError:
+                        final_video_path = None
+
+                note = hooks.ask_note(client_name)
+                store.append_result(
+                    keys[i],
+                    client_name,
+                    is_rollout_success,
+                    index=i,
+                    task_category=task_category,
+                    task_prompt=task_prompt,
+                    target=rollout["target"],
+                    note=note,
+                    init_box_state=init_box_state,
+                    expected_end_state=end_box_state,
+                    auto_judged=oracle is not None and not DRY_RUN,
+                    time_to_success=time_to_success,
+                    latency=run_result.to_dict() if run_result is not None else None,
+                    video=final_video_path,
+                    dry_run=DRY_RUN,
+                )
+
+                stats = store.tally()[f"{client_name}:{task_category}"]
+                print(
+                    f"Tally for client '{client_name}' category '{task_category}': {stats['success']} success, {stats['fail']} fail "
+                    f"(95% CI {stats['ci_low'] * 100:.0f}-{stats['ci_high'] * 100:.0f}%)."
+                )
+
+    for client_name, stats in scheduler.summary().items():
+        startup = f"{stats['mean_startup_s']:.1f}s" if stats["mean_startup_s"] is not None else "n/a"
+        print(f"{client_name}: {stats['runs']} runs, mean start-up {startup}, mean run {stats['mean_run_s']:.1f}s, "
+              f"{stats['timeouts']} timeouts")
+
+
 if __name__ == "__main__":
     # load eval_rollouts from json file
     with open(TASK_EVAL_LIST_PATH, "r") as f:
@@ -139,33 +337,22 @@ if __name__ == "__main__":
     )
     input("\n\033[1m\033[93mPress enter when box is ready...\033[0m")
 
-    try:
-        tally, notes, index, meta = load_tally_system(OUTPUT_JSON_PATH)
-    except FileNotFoundError:
-        print(f"Starting new evaluation at {OUTPUT_JSON_PATH}.")
-        tally, notes, index, meta = {}, [], 0, []
+    busybox_listener = None
+    if AUTO_SUCCESS_CHECK:
+        from robots.aloha.utils.busybox_listener import BusyBoxListener
+        from robots.aloha.utils.config import MQTT_SUBSCRIBE_TOPICS
 
-    session_note = input("\033[1m\033[93mNotes for this evaluation session?\033[0m (press Enter to skip): ").strip()
-    meta.append({
-        "timestamp": datetime.now().isoformat(timespec="seconds"),
-        "note": session_note,
-        "models": [name for name, _ in _clients],
-        "task_count": len(eval_order),
-        "task_timeout": TASK_TIMEOUT,
-        "start_index": index,
-        "task_source": TASK_EVAL_LIST_PATH,
-    })
-
-    if index >= len(eval_order):
-        print(
-            f"All tasks already evaluated (index={index}, total={len(eval_order)}). Nothing to do."
-        )
-        exit(0)
+        busybox_listener = BusyBoxListener(MQTT_BROKER, MQTT_PORT, MQTT_SUBSCRIBE_TOPICS)
+        busybox_listener.start()
+    hooks = SessionHooks(busybox_listener) if DRY_RUN else RobotHooks(busybox_listener)
+
+    keys = rollout_keys(eval_order)
+    store = open_results_store(keys)
 
     # Present configured clients and allow selecting one or 'all'
     print("\nConfigured clients to evaluate:")
-    for idx, (name, cmd) in enumerate(_clients):
-        print(f"  [{idx}] {name}: {cmd}")
+    for idx, client in enumerate(_clients):
+        print(f"  [{idx}] {client.name}: {client.command}")
     choice = (
         input(
             "Select client index to evaluate (or type 'all' to run all clients for each task) [all]: "
@@ -178,129 +365,24 @@ if __name__ == "__main__":
     else:
         selected_clients = [_clients[int(choice)]]
 
-    if not DRY_RUN:
-        perform_opening_ceremony()
-
-    box = BoxState()  # to track current box state
+    remaining = sum(not store.is_done(key, c.name) for key in keys for c in selected_clients)
+    if remaining == 0:
+        print(f"All tasks already evaluated for the selected clients (total={len(eval_order)}). Nothing to do.")
+        exit(0)
 
-    for i, rollout in enumerate(eval_order[index:], start=index):
-        task_category = rollout["task_category"]
-        task_prompt = rollout.get("task_str") or rollout["task_prompt"]
-        init_box_state = rollout["init_box_state"]
-
-        print("\n" + "=" * 40 + "\n")
-        # prepare tally buckets per client+category
-        for client_name, _ in selected_clients:
-            key = f"{client_name}:{task_category}"
-            if key not in tally:
-                tally[key] = {"success": 0, "fail": 0, "total": 0}
-
-        print(f"Evaluating [{task_category}]: \033[1m\033[93m{task_prompt}\033[0m\n")
-
-        print("Before proceeeding, please set the task's initial state as follows:")
-        box.load_from_dict(init_box_state)
-        initial_state = str(box)
-        print(box)
-        input("\nPress Enter to continue...")
+    session_note = input("\033[1m\033[93mNotes for this evaluation session?\033[0m (press Enter to skip): ").strip()
+    store.start_session(
+        note=session_note,
+        models=[client.name for client in selected_clients],
+        task_count=len(eval_order),
+        remaining=remaining,
+        task_timeout=TASK_TIMEOUT,
+        task_source=TASK_EVAL_LIST_PATH,
+    )
 
-        # For each selected client, run the client and collect success/failure
-        random.shuffle(selected_clients)
-        for client_name, client_cmd in selected_clients:
-            print(f'Task "{task_prompt}" executing on client {client_name}...')
-
-            if DRY_RUN:
-                print("Dry run mode - skipping task execution.")
-            else:
-                # Build shell_cmd per client type.
-                client_key = client_name.upper()
-                if "OPENPI" in client_key:
-                    shell_cmd = f'{client_cmd} --args.prompt "{task_prompt}" --args.prompt_timeout {TASK_TIMEOUT}'
-                elif "GR00T" in client_key:
-                    shell_cmd = f'{client_cmd} -l "{task_prompt}" -t {TASK_TIMEOUT}'
-                else:
-                    raise ValueError(f"Unknown client type for client {client_name}")
-
-                try:
-                    stop_capture = None
-                    temp_video_path = None
-                    if RECORD_VIDEOS:
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        video_path_prefix = f"eval_videos/{i:02d}_{client_name}_{task_category}_{timestamp}_"
-                        temp_video_path = f"{video_path_prefix}recording.mp4"
-                        stop_capture = start_video_capture(temp_video_path, VIDEO_DEVICE_INDEX)
-
-                    subprocess.run(
-                        shell_cmd,
-                        shell=True,
-                        executable="/bin/bash",
-                        check=False,
-                    )
-                    if stop_capture:
-                        stop_capture()
-                except KeyboardInterrupt:
-                    print("\033[91mInterrupted by user. Continuing evaluation. Press Ctrl+C again to exit.\033[0m")
-                except subprocess.TimeoutExpired:
-                    if "OPENPI" in client_key:
-                        print(
-                            f"OpenPI client timed out after {TASK_TIMEOUT} seconds. Treating as valid end of run."
-                        )
-                    elif "GR00T" in client_key:
-                        print(
-                            f"GR00T client timed out after {TASK_TIMEOUT} seconds. Treating as valid end of run."
-                        )
-                    else:
-                        raise
-                finally:
-                    if RECORD_VIDEOS and stop_capture:
-                        stop_capture()
-
-            is_rollout_success = (
-                input(f"Was the task successful for client {client_name}? (y/n): ")
-                .strip()
-                .lower()
-                == "y"
-            )
-
-            if not DRY_RUN:
-                perform_opening_ceremony()
-
-            key = f"{client_name}:{task_category}"
-            if is_rollout_success:
-                tally[key]["success"] += 1
-            else:
-                tally[key]["fail"] += 1
-            tally[key]["total"] += 1
-
-            if RECORD_VIDEOS and temp_video_path:
-                final_video_path = f"{video_path_prefix}{is_rollout_success}.mp4"
-                try:
-                    os.replace(temp_video_path, final_video_path)
-                except FileNotFoundError:
-                    pass
-
-            note = (
-                input(
-                    f"Any notes for client {client_name} on this task? (press Enter to skip): "
-                )
-                .strip()
-            )
-            notes.append(
-                {
-                    "client": client_name,
-                    "task_category": task_category,
-                    "task_prompt": task_prompt,
-                    "success": is_rollout_success,
-                    "note": note,
-                    "index": i,
-                    "initial_state": initial_state,
-                }
-            )
-
-            print(
-                f"Tally for client '{client_name}' category '{task_category}': {tally[key]['success']} success, {tally[key]['fail']} fail."
-            )
-
-        index = i + 1
-        with open(OUTPUT_JSON_PATH, "w") as f:
-            json.dump({"tally": tally, "notes": notes, "index": index, "meta": meta}, f, indent=4)
+    run_session(eval_order, keys, selected_clients, store, hooks)
 
+    print("\nFinal tallies (all sessions):")
+    for client_name, stats in store.tally(by=("client",)).items():
+        print(f"{client_name}: {stats['success']}/{stats['total']} ({stats['rate'] * 100:.1f}% success, "
+              f"95% CI {stats['ci_low'] * 100:.1f}-{stats['ci_high'] * 100:.1f}%)")
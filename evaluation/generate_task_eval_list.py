@@ -68,8 +68,12 @@ turn_knob = [
 Target: TypeAlias = int | str | None
 
 class BoxState:
-    """Class to represent the state of the box."""
-    def __init__(self):
+    """Class to represent the state of the box.
+
+    Randomness comes from `rng` (a `random.Random`), or the global `random` module if None.
+    """
+    def __init__(self, rng=None):
+        self._rng = rng if rng is not None else random
         self.sliders = {"top": 1, "bottom": 1}
         self.wires_inserted = {"black": True, "blue": True, "red": True, "white": True}
         self.switches = {"top": True, "bottom": True}
@@ -88,13 +92,13 @@ class BoxState:
         self.knob_position = position
 
     def randomize_box(self):
-        self.sliders["top"] = random.randint(1, 5)
-        self.sliders["bottom"] = random.randint(1, 5)
+        self.sliders["top"] = self._rng.randint(1, 5)
+        self.sliders["bottom"] = self._rng.randint(1, 5)
         for color in self.wires_inserted:
-            self.wires_inserted[color] = random.choice([True, False])
-        self.switches["top"] = random.choice([True, False])
-        self.switches["bottom"] = random.choice([True, False])
-        self.knob_position = random.randint(1, 6)
+            self.wires_inserted[color] = self._rng.choice([True, False])
+        self.switches["top"] = self._rng.choice([True, False])
+        self.switches["bottom"] = self._rng.choice([True, False])
+        self.knob_position = self._rng.randint(1, 6)
 
         return self.to_dict()
 
@@ -131,7 +135,7 @@ class BoxState:
             task_lc = task_prompt.lower()
             slider_id = "top" if "top" in task_lc else "bottom"
             while self.sliders[slider_id] == target:
-                self.sliders[slider_id] = random.randint(1, 5)
+                self.sliders[slider_id] = self._rng.randint(1, 5)
             self.update_slider(slider_id, self.sliders[slider_id])
         elif task_category == "insert_wire":
             # Ensure the specified wire is not inserted
@@ -152,7 +156,7 @@ class BoxState:
                     f"For task_category='turn_knob', target must be int; got {type(target).__name__}: {target!r}"
                 )
             while self.knob_position == target:
-                self.knob_position = random.randint(1, 6)
+                self.knob_position = self._rng.randint(1, 6)
             self.update_knob(self.knob_position)
         return self.to_dict()
 
@@ -306,7 +310,7 @@ def parse_target(task: str, category: str):
 
     raise ValueError(f"Unknown category={category!r} for task={task!r}")
 
-def sample_without_replacement(lst, n):
+def sample_without_replacement(lst, n, rng=None):
     """
     Sample n elements from lst without replacement.
     If the list runs out of elements, restart sampling from the full list.
@@ -314,26 +318,29 @@ def sample_without_replacement(lst, n):
     Args:
         lst: The list to sample from
         n: Number of samples to draw
+        rng: random.Random to draw from (default: the global `random` module)
 
     Returns:
         A list of n sampled elements
     """
+    rng = rng if rng is not None else random
     result = []
-    pool = lst.copy()
+    pool = []
 
     for _ in range(n):
         if not pool:
-            pool = lst.copy()
+            pool = list(lst)
 
-        selected = random.choice(pool)
-        result.append(selected)
-        pool.remove(selected)
+        # swap the pick with the last element and pop: O(1) instead of list.remove's O(n)
+        i = rng.randrange(len(pool))
+        pool[i], pool[-1] = pool[-1], pool[i]
+        result.append(pool.pop())
 
     return result
 
 if __name__ == "__main__":
     seed = 37
-    random.seed(seed)
+    rng = random.Random(seed)
     num_samples_per_task = 10
     # task_types = ["flip_switch", "insert_wire", "move_bb", "move_slider", "pull_wire", "push_button", "turn_knob"]
     task_types = ["flip_switch", "move_bb", "move_slider", "pull_wire", "push_button", "turn_knob"]
@@ -349,17 +356,17 @@ if __name__ == "__main__":
         "initial_box_position": initial_box_position,
     }
     sampled_tasks = {
-        task_types[0]: sample_without_replacement(flip_switch, num_samples_per_task),
+        task_types[0]: sample_without_replacement(flip_switch, num_samples_per_task, rng),
         # task_types[1]: sample_without_replacement(insert_wire, num_samples_per_task),
-        task_types[1]: sample_without_replacement(move_bb, num_samples_per_task),
-        task_types[2]: sample_without_replacement(move_slider, num_samples_per_task),
-        task_types[3]: sample_without_replacement(pull_wire, num_samples_per_task),
-        task_types[4]: sample_without_replacement(push_button, num_samples_per_task),
-        task_types[5]: sample_without_replacement(turn_knob, num_samples_per_task),
+        task_types[1]: sample_without_replacement(move_bb, num_samples_per_task, rng),
+        task_types[2]: sample_without_replacement(move_slider, num_samples_per_task, rng),
+        task_types[3]: sample_without_replacement(pull_wire, num_samples_per_task, rng),
+        task_types[4]: sample_without_replacement(push_button, num_samples_per_task, rng),
+        task_types[5]: sample_without_replacement(turn_knob, num_samples_per_task, rng),
     }
 
     # add task category, target, and initial box state to each rollout
-    box = BoxState()  # initialize the box to it's default state
+    box = BoxState(rng)  # initialize the box to it's default state
     eval_rollouts = []
     for category, task_prompts in sampled_tasks.items():
         for i in range(len(task_prompts)):
@@ -374,7 +381,7 @@ if __name__ == "__main__":
             })
 
     # shuffle eval_rollouts
-    random.shuffle(eval_rollouts)
+    rng.shuffle(eval_rollouts)
 
     with open("eval_rollouts.json", "w") as f:
         import json
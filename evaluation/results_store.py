@@ -0,0 +1,235 @@
+"""ResultsStore: append-only evaluation results with crash-safe resume.
+
+The evaluators used to rewrite one `{"tally", "notes", "index", "meta"}` JSON
+file after every rollout and resume from the single `index`, so a crash
+during the write lost the file, and an interrupted multi-client rollout was
+either redone for every client or skipped. The store instead appends one
+JSON line per event to a `.jsonl` log:
+
+- `{"kind": "session", ...}`: session metadata (start time, clients, plan);
+- `{"kind": "result", "rollout": <key>, "client": <name>, ...}`: one
+  (rollout, client) outcome with its timings and box states.
+
+Each line is written with a single `write` on an `O_APPEND` file, then
+`flush` + `fsync` before `append()` returns, so a crash loses at most the
+line being written. A torn last line is ignored on load and cut off before
+the next append. Resume is per (rollout, client): `is_done()` is true once a
+result was recorded, in whatever order the rollouts were run. When a pair is
+recorded twice (e.g. a redo), the last record counts. A result recorded with
+an `error` (e.g. the client's policy server did not start) stays in the log
+but is not done, so the next session retries the pair.
+
+Rollouts are keyed by `rollout_id` if they have one (eval plans), else by a
+hash of their content (`rollout_keys()`), so reordering a rollout list (see
+`rollout_ordering.py`) does not lose finished results.
+
+`tally()` aggregates over all sessions in one pass, with Wilson score
+intervals per group. Old result files are converted with `import_legacy()`.
+
+Typical usage (from this directory):
+
+    store = ResultsStore("eval_results.jsonl")
+    keys = rollout_keys(eval_order)
+    if not store.is_done(keys[i], client):
+        ...
+        store.append_result(keys[i], client, success=True, task_category="push_button", ...)
+    store.tally(by=("client", "task_category"))
+
+    python3 results_store.py eval_results.jsonl --by client task_category
+    python3 results_store.py eval_results.jsonl --import-legacy eval_results.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+from collections import Counter
+from datetime import datetime
+
+RESULT = "result"
+SESSION = "session"
+
+
+def wilson_interval(successes, total, z=1.96):
+    """Wilson score interval for a binomial proportion ((0, 1) for no trials)."""
+    if total == 0:
+        return 0.0, 1.0
+    p = successes / total
+    denom = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denom
+    half = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def rollout_keys(rollouts):
+    """Stable key per rollout: its `rollout_id`, else a content hash (#n for repeats)."""
+    keys, seen = [], Counter()
+    for rollout in rollouts:
+        if rollout.get("rollout_id"):
+            keys.append(str(rollout["rollout_id"]))
+            continue
+        digest = hashlib.sha1(json.dumps(rollout, sort_keys=True).encode()).hexdigest()[:12]
+        seen[digest] += 1
+        keys.append(digest if seen[digest] == 1 else f"{digest}#{seen[digest]}")
+    return keys
+
+
+class ResultsStore:
+    def __init__(self, path):
+        self.path = path
+        self.sessions = []
+        self._results = {}  # (rollout, client) -> latest result record
+        self._load()
+
+    # ------------- Writing -------------
+    def append(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._index(record)
+
+    def start_session(self, **meta):
+        record = {"kind": SESSION, "timestamp": datetime.now().isoformat(timespec="seconds"), **meta}
+        self.append(record)
+        return record
+
+    def append_result(self, rollout, client, success, **fields):
+        """Record one (rollout, client) outcome; `success` None marks it skipped or failed (not tallied)."""
+        record = {
+            "kind": RESULT,
+            "rollout": rollout,
+            "client": client,
+            "success": success,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            **fields,
+        }
+        self.append(record)
+        return record
+
+    # ------------- Reading -------------
+    def is_done(self, rollout, client):
+        record = self._results.get((rollout, client))
+        return record is not None and not record.get("error")
+
+    def results(self):
+        return list(self._results.values())
+
+    def tally(self, by=("client", "task_category")):
+        """{group: {success, fail, total, rate, ci_low, ci_high}} over recorded (non-skipped) results."""
+        counts = {}
+        for record in self._results.values():
+            if record.get("success") is None:
+                continue
+            group = tuple(record.get(field) for field in by)
+            bucket = counts.setdefault(group, [0, 0])
+            bucket[0] += bool(record["success"])
+            bucket[1] += 1
+        out = {}
+        for group in sorted(counts, key=str):
+            success, total = counts[group]
+            low, high = wilson_interval(success, total)
+            out[":".join(str(g) for g in group)] = {
+                "success": success,
+                "fail": total - success,
+                "total": total,
+                "rate": success / total,
+                "ci_low": low,
+                "ci_high": high,
+            }
+        return out
+
+    # ------------- Legacy -------------
+    def import_legacy(self, legacy_path, rollout_key_list=None, default_client=None, plan_id=None):
+        """Append the notes of an old `{"tally", "notes", "index", "meta"}` file; returns the number imported.
+
+        Notes are matched to rollouts by their `index` through `rollout_key_list`
+        (or keyed `index-<n>` without it). With `plan_id`, the indexes are only
+        trusted if the file was recorded against that plan; otherwise the notes
+        are kept under `index-<n>` keys, which mark no rollout of the plan done.
+        Pairs already in the store are kept.
+        """
+        with open(legacy_path, "r") as f:
+            legacy = json.load(f)
+        imported = 0
+        meta = legacy.get("meta")
+        legacy_plan_id = legacy.get("plan_id")
+        if plan_id is not None and rollout_key_list is not None and legacy_plan_id != plan_id:
+            print(f"[ResultsStore] WARNING: {legacy_path} was recorded against plan {legacy_plan_id}, not the "
+                  f"current plan {plan_id}; importing its notes under index-<n> keys, no rollout is marked done.")
+            rollout_key_list = None
+            legacy_plan_id = None  # the index keys belong to no plan
+        self.start_session(imported_from=legacy_path, legacy_meta=meta, plan_id=legacy_plan_id,
+                           legacy_plan_id=legacy.get("plan_id"))
+        for note in legacy.get("notes", []):
+            index = note.get("index")
+            if rollout_key_list is not None and index is not None and index < len(rollout_key_list):
+                rollout = rollout_key_list[index]
+            else:
+                rollout = f"index-{index}"
+            client = note.get("client", default_client)
+            if self.is_done(rollout, client):
+                continue
+            fields = {k: v for k, v in note.items() if k not in ("client", "success")}
+            fields.setdefault("task_category", note.get("task_type"))
+            fields.setdefault("task_prompt", note.get("task"))
+            self.append_result(rollout, client, note.get("success"), imported=True, **fields)
+            imported += 1
+        return imported
+
+    # ------------- Helpers -------------
+    def _index(self, record):
+        if record.get("kind") == SESSION:
+            self.sessions.append(record)
+        elif record.get("kind") == RESULT:
+            self._results[(record["rollout"], record["client"])] = record
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        good = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # torn write at the end
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"[ResultsStore] skipping unreadable line at byte {good} of {self.path}")
+                good += len(line)
+                continue
+            self._index(record)
+            good += len(line)
+        if good < len(data):
+            print(f"[ResultsStore] dropping {len(data) - good} bytes of an incomplete last record in {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+                os.fsync(f.fileno())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tally an evaluation results log.")
+    parser.add_argument("log", help="results .jsonl")
+    parser.add_argument("--by", nargs="+", default=["client", "task_category"], help="record fields to group by")
+    parser.add_argument("--import-legacy", default=None, help="old eval results .json to append first")
+    parser.add_argument("--rollouts", default=None, help="rollout list the legacy file indexes into")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.log)
+    if args.import_legacy:
+        keys = current_plan_id = None
+        if args.rollouts:
+            with open(args.rollouts, "r") as f:
+                data = json.load(f)
+            keys = rollout_keys(data.get("eval_rollouts") or data.get("plan") or [])
+            current_plan_id = (data.get("meta") or {}).get("plan_id")  # set in eval_plan_generator plan files
+        imported = store.import_legacy(args.import_legacy, keys, plan_id=current_plan_id)
+        print(f"Imported {imported} results from {args.import_legacy}")
+    print(f"{len(store.results())} results over {len(store.sessions)} sessions")
+    for group, stats in store.tally(tuple(args.by)).items():
+        print(f"{group}: {stats['success']}/{stats['total']} ({stats['rate'] * 100:.1f}% success, "
+              f"95% CI {stats['ci_low'] * 100:.1f}-{stats['ci_high'] * 100:.1f}%)")
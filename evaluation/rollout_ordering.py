@@ -0,0 +1,223 @@
+"""Order eval rollouts so the operator changes as few BusyBox controls as possible.
+
+`generate_task_eval_list.py` shuffles rollouts whose `init_box_state`s were
+drawn independently, so between two rollouts the operator typically has to
+re-set most of the box. This module reorders a rollout list to minimise that
+setup work without changing which rollouts are run:
+
+- reconfiguration cost from rollout a to rollout b: the controls that differ
+  between a's expected end state (`BoxState.update_assuming_task_performed` on
+  a's initial state) and b's `init_box_state`, with slider/knob moves costing
+  a little extra per position (see `DEFAULT_COSTS`);
+- order: greedy nearest neighbour from the box's default state, then 2-opt
+  (segment reversal with the asymmetric cost accounted for) until no move
+  improves;
+- `block_size` optimises each consecutive block of the shuffled list on its
+  own. Task categories then stay spread over the session the way the shuffle
+  spread them (drift or operator fatigue cannot line up with a category),
+  while setup within a block is minimised.
+
+`--chain` additionally rewrites each initial state as the previous rollout's
+end state, changed only as much as the next task requires
+(`BoxState.generate_valid_state`). This cuts setup to a single control per
+rollout, but the untouched controls are no longer independently randomised,
+so it changes the evaluation's statistical design: use it for quick checks,
+not for reported numbers.
+
+Typical usage (from this directory):
+
+    python3 rollout_ordering.py eval_rollouts.json --out eval_rollouts_ordered.json --block-size 10
+"""
+import argparse
+import copy
+import json
+import random
+
+import numpy as np
+
+from generate_task_eval_list import BoxState
+
+# cost of changing one control; sliders / knob add `per_position` per position moved
+DEFAULT_COSTS = {
+    "slider": 1.0,
+    "wire": 1.0,
+    "switch": 1.0,
+    "knob": 1.0,
+    "per_position": 0.25,
+}
+
+
+def _position(value):
+    """Slider / knob value as a number (intermediate positions are (a, b) pairs)."""
+    if isinstance(value, (list, tuple)):
+        return sum(value) / len(value)
+    return value
+
+
+def state_changes(from_state: dict, to_state: dict) -> list:
+    """Human-readable list of the controls to change to get from `from_state` to `to_state`."""
+    changes = []
+    for slider, pos in to_state["sliders"].items():
+        if from_state["sliders"].get(slider) != pos:
+            changes.append(f"{slider} slider -> {pos}")
+    for color, inserted in to_state["wires_inserted"].items():
+        if from_state["wires_inserted"].get(color) != inserted:
+            changes.append(f"{'insert' if inserted else 'pull'} {color} wire")
+    for switch, on in to_state["switches"].items():
+        if from_state["switches"].get(switch) != on:
+            changes.append(f"{switch} switch {'ON' if on else 'OFF'}")
+    if from_state["knob_position"] != to_state["knob_position"]:
+        changes.append(f"knob -> {to_state['knob_position']}")
+    return changes
+
+
+def reconfiguration_cost(from_state: dict, to_state: dict, costs: dict = DEFAULT_COSTS) -> float:
+    cost = 0.0
+    for slider, pos in to_state["sliders"].items():
+        prev = from_state["sliders"].get(slider)
+        if prev != pos:
+            cost += costs["slider"] + costs["per_position"] * abs(_position(pos) - _position(prev))
+    cost += costs["wire"] * sum(
+        from_state["wires_inserted"].get(c) != v for c, v in to_state["wires_inserted"].items()
+    )
+    cost += costs["switch"] * sum(from_state["switches"].get(s) != v for s, v in to_state["switches"].items())
+    if from_state["knob_position"] != to_state["knob_position"]:
+        cost += costs["knob"] + costs["per_position"] * abs(
+            _position(to_state["knob_position"]) - _position(from_state["knob_position"])
+        )
+    return cost
+
+
+def expected_end_state(rollout: dict) -> dict:
+    """State the box is left in if the rollout's task succeeds."""
+    box = BoxState()
+    box.load_from_dict(copy.deepcopy(rollout["init_box_state"]))
+    return box.update_assuming_task_performed({
+        "task_str": rollout.get("task_str") or rollout["task_prompt"],
+        "task_category": rollout["task_category"],
+        "target": rollout["target"],
+    })
+
+
+def cost_matrix(rollouts: list, start_state: dict, costs: dict = DEFAULT_COSTS) -> np.ndarray:
+    """(n+1, n+1) matrix: row/col 0 is the start state, C[i, j] = cost of running j after i."""
+    ends = [start_state] + [expected_end_state(r) for r in rollouts]
+    inits = [start_state] + [r["init_box_state"] for r in rollouts]
+    n = len(rollouts) + 1
+    matrix = np.zeros((n, n))
+    for i in range(n):
+        for j in range(1, n):
+            if i != j:
+                matrix[i, j] = reconfiguration_cost(ends[i], inits[j], costs)
+    return matrix  # column 0 stays 0: the path is open, nothing returns to the start
+
+
+def path_cost(matrix: np.ndarray, order: list) -> float:
+    path = [0] + list(order)
+    return float(sum(matrix[a, b] for a, b in zip(path, path[1:])))
+
+
+def _greedy(matrix: np.ndarray) -> list:
+    remaining = set(range(1, len(matrix)))
+    order, current = [], 0
+    while remaining:
+        current = min(remaining, key=lambda j: (matrix[current, j], j))
+        order.append(current)
+        remaining.remove(current)
+    return order
+
+
+def _two_opt(matrix: np.ndarray, order: list) -> list:
+    """Reverse segments while that lowers the (asymmetric, open) path cost."""
+    path = [0] + list(order)
+    n = len(path)
+    improved = True
+    while improved:
+        improved = False
+        # prefix sums of forward and backward edge costs along the current path
+        fwd = np.concatenate([[0.0], np.cumsum([matrix[path[k], path[k + 1]] for k in range(n - 1)])])
+        bwd = np.concatenate([[0.0], np.cumsum([matrix[path[k + 1], path[k]] for k in range(n - 1)])])
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                # reverse path[i..j]
+                before = matrix[path[i - 1], path[i]] + (fwd[j] - fwd[i])
+                after = matrix[path[i - 1], path[j]] + (bwd[j] - bwd[i])
+                if j + 1 < n:
+                    before += matrix[path[j], path[j + 1]]
+                    after += matrix[path[i], path[j + 1]]
+                if after < before - 1e-9:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    improved = True
+                    break
+            if improved:
+                break
+    return path[1:]
+
+
+def order_rollouts(rollouts: list, start_state: dict = None, block_size: int = None, costs: dict = DEFAULT_COSTS) -> list:
+    """Reordered copy of `rollouts` (see module docstring); each block starts where the previous one ended."""
+    state = start_state or BoxState().to_dict()
+    block_size = block_size or len(rollouts)
+    ordered = []
+    for b in range(0, len(rollouts), block_size):
+        block = rollouts[b:b + block_size]
+        matrix = cost_matrix(block, state, costs)
+        order = _two_opt(matrix, _greedy(matrix))
+        ordered += [block[k - 1] for k in order]
+        state = expected_end_state(ordered[-1])
+    return ordered
+
+
+def chain_init_states(rollouts: list, start_state: dict = None, rng: random.Random = None) -> list:
+    """Copy of `rollouts` whose init states start from the previous rollout's expected end state."""
+    box = BoxState(rng)
+    box.load_from_dict(copy.deepcopy(start_state or BoxState().to_dict()))
+    chained = []
+    for rollout in rollouts:
+        rollout = dict(rollout)
+        prompt = rollout.get("task_str") or rollout["task_prompt"]
+        rollout["init_box_state"] = box.generate_valid_state({
+            "task_prompt": prompt, "task_category": rollout["task_category"], "target": rollout["target"],
+        })
+        box.update_assuming_task_performed({
+            "task_str": prompt, "task_category": rollout["task_category"], "target": rollout["target"],
+        })
+        chained.append(rollout)
+    return chained
+
+
+def total_setup_cost(rollouts: list, start_state: dict = None, costs: dict = DEFAULT_COSTS) -> float:
+    state = start_state or BoxState().to_dict()
+    total = 0.0
+    for rollout in rollouts:
+        total += reconfiguration_cost(state, rollout["init_box_state"], costs)
+        state = expected_end_state(rollout)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reorder eval rollouts to minimise box setup between them.")
+    parser.add_argument("rollouts", help="eval_rollouts.json from generate_task_eval_list.py")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--block-size", type=int, default=None, help="optimise each block of N rollouts separately")
+    parser.add_argument("--chain", action="store_true", help="rewrite init states from the previous end state")
+    parser.add_argument("--seed", type=int, default=37, help="seed for --chain")
+    args = parser.parse_args()
+
+    with open(args.rollouts, "r") as f:
+        data = json.load(f)
+    rollouts = data["eval_rollouts"]
+    before = total_setup_cost(rollouts)
+    rollouts = order_rollouts(rollouts, block_size=args.block_size)
+    if args.chain:
+        rollouts = chain_init_states(rollouts, rng=random.Random(args.seed))
+    after = total_setup_cost(rollouts)
+    print(f"Setup cost for {len(rollouts)} rollouts: {before:.1f} -> {after:.1f} "
+          f"({before / len(rollouts):.2f} -> {after / len(rollouts):.2f} per rollout)")
+
+    data["eval_rollouts"] = rollouts
+    data["meta"] = dict(data["meta"], ordering={
+        "block_size": args.block_size, "chain": args.chain, "setup_cost_before": before, "setup_cost_after": after,
+    })
+    with open(args.out, "w") as f:
+        json.dump(data, f, indent=4)
@@ -0,0 +1,286 @@
+"""VideoRecorder: evaluation video with bounded memory, per-frame timestamps and event marks.
+
+`start_video_capture` read and encoded each frame on one thread, at whatever
+FPS the camera reported, with no timestamps and a sleep-and-retry loop. The
+recorder splits the work in two:
+
+- a capture thread blocks on the camera and puts (frame, wall-clock time)
+  into a bounded queue. When the encoder falls behind, new frames are
+  dropped and counted; capture never stalls and memory stays bounded;
+- an encoder thread writes the queued frames, either piped as raw BGR into
+  `ffmpeg` (H.264: `libx264`, or a hardware encoder such as `h264_nvenc` /
+  `h264_vaapi` via `codec`) or through OpenCV's VideoWriter (`mp4v`) when
+  ffmpeg is not installed or exits right away (e.g. the configured encoder
+  is missing).
+
+If the encoder fails mid-recording, capture stops, the failure is kept in
+`error` and in the sidecar, and `stop()` still returns: it never blocks on a
+full queue or a dead encoder.
+
+Next to `<name>.mp4` a `<name>.json` sidecar holds the capture time of every
+written frame, the drop count and the marked events (`mark()`: rollout
+start/end, success, ...; `busybox_events()`: module changes from the
+listener history), each with the frame index it falls on. A moment in the
+rollout can then be found in the video without scrubbing.
+
+Timestamps are `time.time()`, the clock `BusyBoxListener` stamps its messages
+with.
+
+Typical usage (from this directory):
+
+    recorder = VideoRecorder("eval_videos/03_openpi_recording.mp4", device_index=0)
+    recorder.start()
+    recorder.mark("rollout_start")
+    ...
+    recorder.mark("rollout_end")
+    recorder.stop(events=busybox_events(listener, recorder.started_at))
+    recorder.rename("eval_videos/03_openpi_True.mp4")
+"""
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+import cv2
+
+
+def busybox_events(listener, since, until=None):
+    """Module changes in a BusyBoxListener's history since `since`, as recorder events."""
+    events = []
+    for logical in listener.topics:
+        previous = None
+        for ts, payload in listener.history_since(logical, since):
+            if until is not None and ts > until:
+                break
+            values = payload.get("values") if isinstance(payload, dict) else payload  # ignore the bridge's "ts"
+            if values != previous:
+                events.append({"label": f"busybox:{logical}", "ts": ts, "value": values})
+            previous = values
+    return sorted(events, key=lambda e: e["ts"])
+
+
+class _FFmpegWriter:
+    def __init__(self, path, fps, width, height, codec, crf, preset, startup_check_s=0.3):
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{fps}", "-i", "-",
+            "-c:v", codec, "-pix_fmt", "yuv420p",
+        ]
+        if codec == "libx264":
+            cmd += ["-preset", preset, "-crf", str(crf)]
+        cmd.append(path)
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        try:  # an unknown encoder makes ffmpeg exit while parsing its options
+            returncode = self.proc.wait(timeout=startup_check_s)
+        except subprocess.TimeoutExpired:
+            return
+        raise RuntimeError(f"ffmpeg exited with code {returncode} (is the {codec} encoder available?)")
+
+    def write(self, frame):
+        self.proc.stdin.write(frame.tobytes())
+
+    def release(self):
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass  # ffmpeg already exited
+        try:
+            self.proc.wait(timeout=30.0)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+class _OpenCVWriter:
+    def __init__(self, path, fps, width, height):
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        if not self.writer.isOpened():
+            raise RuntimeError(f"Could not open video writer for {path}")
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def release(self):
+        self.writer.release()
+
+
+class VideoRecorder:
+    def __init__(self, output_path, device_index=0, fps=None, backend="auto", codec="libx264", crf=28,
+                 preset="veryfast", queue_size=64):
+        self.output_path = output_path
+        self.device_index = device_index
+        self.fps = fps
+        if backend == "auto":
+            backend = "ffmpeg" if shutil.which("ffmpeg") else "opencv"
+        self.backend = backend
+        self.codec = codec
+        self.crf = crf
+        self.preset = preset
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.started_at = None
+        self.stopped_at = None
+        self.frame_ts = []  # capture time of every written frame
+        self.events = []
+        self.captured = 0
+        self.dropped = 0
+        self.error = None  # encoder failure, if any
+        self._cap = None
+        self._writer = None
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    # ------------- Lifecycle -------------
+    def start(self):
+        self._cap = cv2.VideoCapture(self.device_index)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Could not open video device {self.device_index}")
+        self.fps = self.fps or self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 640)
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 480)
+        if self.backend == "ffmpeg":
+            try:
+                self._writer = _FFmpegWriter(self.output_path, self.fps, self.width, self.height, self.codec,
+                                             self.crf, self.preset)
+            except RuntimeError as e:
+                print(f"[VideoRecorder] {e}; falling back to OpenCV (mp4v)")
+                self.backend = "opencv"
+        if self.backend != "ffmpeg":
+            try:
+                self._writer = _OpenCVWriter(self.output_path, self.fps, self.width, self.height)
+            except RuntimeError:
+                self._cap.release()
+                self._cap = None
+                raise
+        self.started_at = time.time()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, daemon=True, name="VideoRecorder-capture"),
+            threading.Thread(target=self._encode_loop, daemon=True, name="VideoRecorder-encode"),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, events=()):
+        """Stop capture, drain the queue, close the file and write the sidecar."""
+        if self._cap is None:
+            return
+        self.stopped_at = time.time()
+        self._stop_event.set()
+        capture, encoder = self._threads
+        capture.join(timeout=2.0)
+        deadline = time.monotonic() + 30.0
+        while encoder.is_alive() and time.monotonic() < deadline:
+            try:
+                self.queue.put(None, timeout=0.5)  # encoder drains what is queued, then exits
+                break
+            except queue.Full:
+                continue  # encoder still working through the queue
+        encoder.join(timeout=max(0.0, deadline - time.monotonic()))
+        if encoder.is_alive():
+            self.error = self.error or "encoder did not finish within 30s"
+        unwritten = self._discard_queue()
+        if unwritten:
+            print(f"[VideoRecorder] {unwritten} captured frames were never encoded ({self.error})")
+        self._writer.release()
+        self._cap.release()
+        self._cap = None
+        self.events.extend(events)
+        self._write_sidecar()
+        if self.dropped:
+            print(f"[VideoRecorder] dropped {self.dropped} of {self.captured} frames (encoder behind)")
+
+    def mark(self, label, ts=None, **data):
+        self.events.append({"label": label, "ts": ts if ts is not None else time.time(), **data})
+
+    def rename(self, output_path):
+        """Move the video and its sidecar (e.g. once the rollout outcome is known)."""
+        os.replace(self.output_path, output_path)
+        os.replace(self.sidecar_path, self._sidecar(output_path))
+        self.output_path = output_path
+
+    @property
+    def sidecar_path(self):
+        return self._sidecar(self.output_path)
+
+    # ------------- Threads -------------
+    def _capture_loop(self):
+        while not self._stop_event.is_set():
+            ret, frame = self._cap.read()  # blocks until the next frame
+            if not ret:
+                self._stop_event.wait(0.05)
+                continue
+            self.captured += 1
+            try:
+                self.queue.put_nowait((frame, time.time()))
+            except queue.Full:
+                self.dropped += 1
+
+    def _encode_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            frame, ts = item
+            try:
+                self._writer.write(frame)
+            except (BrokenPipeError, OSError) as e:
+                self.error = f"encoder failed: {e}"
+                print(f"[VideoRecorder] {self.error}; stopping capture")
+                self._stop_event.set()
+                return
+            self.frame_ts.append(ts)
+
+    def _discard_queue(self):
+        discarded = 0
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return discarded
+            discarded += item is not None
+
+    # ------------- Sidecar -------------
+    @staticmethod
+    def _sidecar(video_path):
+        return os.path.splitext(video_path)[0] + ".json"
+
+    def _frame_index(self, ts):
+        """Index of the last frame captured at or before `ts` (0 before the first frame)."""
+        lo, hi = 0, len(self.frame_ts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.frame_ts[mid] <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return max(lo - 1, 0)
+
+    def _write_sidecar(self):
+        events = sorted(self.events, key=lambda e: e["ts"])
+        for event in events:
+            event["frame"] = self._frame_index(event["ts"])
+            event["t"] = event["ts"] - self.started_at
+        sidecar = {
+            "video": os.path.basename(self.output_path),
+            "backend": self.backend,
+            "codec": self.codec if self.backend == "ffmpeg" else "mp4v",
+            "nominal_fps": self.fps,
+            "measured_fps": (len(self.frame_ts) - 1) / (self.frame_ts[-1] - self.frame_ts[0])
+            if len(self.frame_ts) > 1 and self.frame_ts[-1] > self.frame_ts[0] else None,
+            "width": self.width,
+            "height": self.height,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "error": self.error,
+            "events": events,
+            "frame_ts": self.frame_ts,
+        }
+        tmp_path = self.sidecar_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(sidecar, f, default=str)
+        os.replace(tmp_path, self.sidecar_path)
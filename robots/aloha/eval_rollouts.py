@@ -1,27 +1,27 @@
-import random
-import json
 import subprocess
 import os
 
-from robots.aloha.utils.sample_init_states import sample_init_state
-from robots.aloha.utils.task_generator import (
-    flip_switches,
-    push_button,
-    pull_wire,
-    insert_wire,
-    move_slider,
-    turn_knob,
-    move_box,
-)
+from evaluation.results_store import ResultsStore, rollout_keys
+from robots.aloha.utils.eval_plan_generator import generate_plan, plan_id
+from robots.aloha.utils.policy_worker import PolicyWorker
 
 # Configuration constants
 OPENPI_EXAMPLES_PATH = '/home/aloha/project_green/macgyver-demo/openpi/examples/aloha_real'
 VENV_ACTIVATE = 'source .venv/bin/activate'
 MAIN_SCRIPT = 'main.py'
-OUTPUT_JSON_PATH = os.path.join(os.path.dirname(__file__), 'evaluation_results_rollouts.json')
+OUTPUT_JSON_PATH = os.path.join(os.path.dirname(__file__), 'evaluation_results_rollouts.json')  # legacy, imported once
+RESULTS_LOG_PATH = os.path.join(os.path.dirname(__file__), 'evaluation_results_rollouts.jsonl')
+CLIENT_NAME = 'openpi'
 TASK_TIMEOUT = 35  # seconds
 SLEEP_COMMAND_PATH = "/home/aloha/interbotix_ws/src/aloha/scripts"
 SLEEP_SCRIPT = "sleep.py"
+AUTO_SUCCESS_CHECK = False  # judge rollouts from the instrumented BusyBox instead of asking
+EARLY_STOP_ON_SUCCESS = True
+# Persistent client: a worker that loads the policy once and takes prompts over stdin/stdout
+# (see robots/aloha/utils/policy_worker.py); None launches MAIN_SCRIPT per rollout.
+# e.g. f"cd {OPENPI_EXAMPLES_PATH} && {VENV_ACTIVATE} && python3 worker.py"
+#      "python3 -m robots.aloha.utils.policy_worker --load-time 5 --run-time 3"  (fake, no robot)
+PERSISTENT_WORKER_COMMAND = None
 
 
 def format_busybox_state(busybox_module_states, full_instruction):
@@ -114,31 +114,8 @@ def format_busybox_state(busybox_module_states, full_instruction):
 
 
 def generate_evaluation_plan(seed=37, rollouts_per_task_type=10):
-    random.seed(seed)
-    evaluation_plan = []
-    # For each task type, sample multiple rollouts
-    task_types = {
-        "FlipSwitch": flip_switches,
-        "PushButton": push_button,
-        "PullWire": pull_wire,
-        "InsertWire": insert_wire,
-        "MoveSlider": move_slider,
-        "TurnKnob": turn_knob,
-        "MoveBox": move_box,
-    }
-    for task_type, tasks in task_types.items():
-        if len(tasks) == 0:
-            continue
-        for _ in range(rollouts_per_task_type):
-            task = random.choice(tasks)
-            init_state, busybox_module_states = sample_init_state(task['task_goal'], seed=random.randint(0, 1e6))
-            evaluation_plan.append({
-                "task_type": task_type,
-                "task_instruction": task['task_instruction'],
-                "initial_state": init_state,
-                "busybox_module_states": busybox_module_states
-            })
-    return evaluation_plan
+    """Stratified plan from eval_plan_generator (per-task-type RNG streams, BoxState-checked init states)."""
+    return generate_plan(seed=seed, rollouts_per_task_type=rollouts_per_task_type)
 
 
 def run_sleep_script():
@@ -152,14 +129,31 @@ def run_sleep_script():
         print(f"Error running sleep script: {e}")
 
 
-def run_inference_task(task_instruction):
-    """Run the main inference script with the given task instruction"""
+def run_inference_task(task_instruction, oracle=None, worker=None):
+    """Run the main inference script with the given task instruction.
+
+    If a started TaskSuccessOracle is given, the client is interrupted as soon
+    as the expected end state is reached (when EARLY_STOP_ON_SUCCESS).
+    With a PolicyWorker the prompt goes to the already-loaded worker instead,
+    and its result (status, start latency) is returned.
+    """
+    if worker is not None:
+        stop = oracle.succeeded if oracle is not None and EARLY_STOP_ON_SUCCESS else None
+        try:
+            return worker.run(task_instruction, TASK_TIMEOUT, stop=stop)
+        except Exception as e:
+            print(f"Error running task '{task_instruction}': {e}")
+            return {'status': 'error', 'error': str(e)}
+
     shell_cmd_cd = f"cd {OPENPI_EXAMPLES_PATH}"
     shell_cmd_activate = f"{VENV_ACTIVATE}"
     shell_cmd_run = f"python3 {MAIN_SCRIPT} --args.prompt \"{task_instruction}\" --args.prompt-timeout {TASK_TIMEOUT}"
     shell_cmd = f"{shell_cmd_cd} && {shell_cmd_activate} && {shell_cmd_run}"
     try:
-        subprocess.run(shell_cmd, shell=True, executable='/bin/bash', check=False)
+        if oracle is not None:
+            run_client_until_success(shell_cmd, oracle, early_stop=EARLY_STOP_ON_SUCCESS)
+        else:
+            subprocess.run(shell_cmd, shell=True, executable='/bin/bash', check=False)
     except Exception as e:
         print(f"Error running task '{task_instruction}': {e}")
 
@@ -167,45 +161,60 @@ def run_inference_task(task_instruction):
 if __name__ == "__main__":
     # Generate evaluation plan
     eval_plan = generate_evaluation_plan(seed=37, rollouts_per_task_type=10)
-    
-    # Tally system: {task_type: {'success': int, 'fail': int, 'total': int}}
-    tally = {}
-    notes = []
-    index = 0
+    current_plan_id = plan_id(eval_plan)
+    keys = rollout_keys(eval_plan)
 
-    # Initialize the output JSON file with empty tally and notes if it doesn't exist
-    if not os.path.exists(OUTPUT_JSON_PATH):
-        with open(OUTPUT_JSON_PATH, 'w') as f:
-            json.dump({'tally': {}, 'notes': [], 'index': index}, f, indent=4)
+    # Append-only results log, one record per (rollout, client); resumes wherever results are missing
+    store = ResultsStore(RESULTS_LOG_PATH)
+    if not store.sessions and os.path.exists(OUTPUT_JSON_PATH):
+        imported = store.import_legacy(OUTPUT_JSON_PATH, keys, default_client=CLIENT_NAME, plan_id=current_plan_id)
+        print(f"Imported {imported} results from {OUTPUT_JSON_PATH}")
+    previous_plans = {s.get('plan_id') for s in store.sessions if s.get('plan_id')}
+    if previous_plans - {current_plan_id}:
+        print(f"[WARNING]: {RESULTS_LOG_PATH} has results recorded against plans {sorted(previous_plans)}, "
+              f"not only the current plan {current_plan_id}; rollout ids may refer to different rollouts.")
 
-    # Load existing data from the output JSON file
-    with open(OUTPUT_JSON_PATH, 'r') as f:
-        output_data = json.load(f)
-    tally = output_data.get('tally', {})
-    notes = output_data.get('notes', [])
-    index = output_data.get('index', 0)
-    
+    pending = [i for i in range(len(eval_plan)) if not store.is_done(keys[i], CLIENT_NAME)]
     # Check if all tasks are already evaluated
-    if index >= len(eval_plan):
-        print(f"All tasks already evaluated (index={index}, total={len(eval_plan)}). Nothing to do.")
+    if not pending:
+        print(f"All tasks already evaluated (total={len(eval_plan)}). Nothing to do.")
         print("\nFinal tallies:")
-        for task_type, stats in tally.items():
+        for task_type, stats in store.tally(by=('task_type',)).items():
             print(f"{task_type}: {stats['success']} success, {stats['fail']} fail, {stats['total']} total")
         exit()
+    store.start_session(plan_id=current_plan_id, client=CLIENT_NAME, task_count=len(eval_plan), remaining=len(pending),
+                        task_timeout=TASK_TIMEOUT, persistent_worker=PERSISTENT_WORKER_COMMAND)
     
-    print(f"Resuming evaluation at index {index} of {len(eval_plan)}")
+    busybox_listener = None
+    if AUTO_SUCCESS_CHECK:
+        from robots.aloha.utils.busybox_listener import BusyBoxListener
+        from robots.aloha.utils.config import COLLECTION_CONFIG, MQTT_SUBSCRIBE_TOPICS
+        from robots.aloha.utils.success_oracle import (
+            TaskSuccessOracle,
+            run_client_until_success,
+            target_from_task_goal,
+        )
+        busybox_listener = BusyBoxListener(
+            broker=COLLECTION_CONFIG['MQTT_broker'],
+            port=COLLECTION_CONFIG['MQTT_port'],
+            topics=MQTT_SUBSCRIBE_TOPICS,
+        )
+        busybox_listener.start()
+
+    worker = None
+    if PERSISTENT_WORKER_COMMAND:
+        worker = PolicyWorker(PERSISTENT_WORKER_COMMAND, name='openpi', grace_s=10.0)
+        worker.start()
+
+    print(f"Resuming evaluation: {len(pending)} of {len(eval_plan)} rollouts left")
     print(f"Total rollouts to evaluate: {len(eval_plan)}")
     
     # Main evaluation loop
-    for i in range(index, len(eval_plan)):
+    for i in pending:
         plan = eval_plan[i]
         task_type = plan['task_type']
         task_instruction = plan['task_instruction']
         
-        # Initialize tally for this task type if not present
-        if task_type not in tally:
-            tally[task_type] = {'success': 0, 'fail': 0, 'total': 0}
-        
         print("\n" + "=" * 80)
         print(f"Rollout {i+1}/{len(eval_plan)} - [{task_type}]: {task_instruction}")
         print("=" * 80)
@@ -218,42 +227,59 @@ if __name__ == "__main__":
         
         if user_choice == 's':
             print("Skipping this task...")
-            # Update index to continue to next task
-            index = i + 1
-            with open(OUTPUT_JSON_PATH, 'w') as f:
-                json.dump({'tally': tally, 'notes': notes, 'index': index}, f, indent=4)
+            # recorded without an outcome: done for resume, not tallied
+            store.append_result(keys[i], CLIENT_NAME, None, index=i, task_type=task_type, task=task_instruction,
+                                skipped=True)
             continue
         
+        oracle = None
+        if busybox_listener is not None:
+            target_state, button = target_from_task_goal(plan['busybox_module_states'], plan['task_goal'])
+            oracle = TaskSuccessOracle(busybox_listener, target_state=target_state, button=button)
+            if oracle.verifiable:
+                oracle.start()
+            else:
+                oracle = None
+
         # Run the inference task
         print(f"Running inference for: {task_instruction}")
-        run_inference_task(task_instruction)
-        
-        # Get user evaluation
-        result = input(f"\nWas '{task_instruction}' successful? (y/n): ").strip().lower()
-        if result == 'y':
-            tally[task_type]['success'] += 1
-            success = True
+        run_result = run_inference_task(task_instruction, oracle, worker)
+        if run_result is not None:
+            print(f"Client {run_result['status']}, started after {run_result.get('start_latency_s') or 0:.2f}s")
+
+        # Get automatic or user evaluation
+        time_to_success = None
+        if oracle is not None:
+            oracle.stop()
+            if not oracle.verifiable:  # the live state could not be checked; ask the operator
+                oracle = None
+        if oracle is not None:
+            result = 'y' if oracle.succeeded.is_set() else 'n'
+            time_to_success = oracle.time_to_success
+            print(f"Auto-judged: {'SUCCESS' if result == 'y' else 'FAIL'}"
+                  + (f" (time to success {time_to_success:.1f}s)" if result == 'y' else ""))
         else:
-            tally[task_type]['fail'] += 1
-            success = False
-        tally[task_type]['total'] += 1
+            result = input(f"\nWas '{task_instruction}' successful? (y/n): ").strip().lower()
+        success = result == 'y'
 
         note = input("Any notes about this task? (press Enter to skip): ").strip()
-        notes.append({
-            'task_type': task_type, 
-            'task': task_instruction, 
-            'success': success, 
-            'note': note, 
-            'index': i
-        })
+        store.append_result(
+            keys[i], CLIENT_NAME, success,
+            index=i,
+            task_type=task_type,
+            task=task_instruction,
+            note=note,
+            init_values=plan.get('init_values'),
+            task_goal=plan['task_goal'],
+            auto_judged=oracle is not None,
+            time_to_success=time_to_success,
+            run=run_result,
+        )
 
         # Print current tally for this task type
-        print(f"Tally for {task_type}: {tally[task_type]['success']} success, {tally[task_type]['fail']} fail, {tally[task_type]['total']} total")
-
-        # Update the JSON file after each task (increment index by 1)
-        index = i + 1
-        with open(OUTPUT_JSON_PATH, 'w') as f:
-            json.dump({'tally': tally, 'notes': notes, 'index': index}, f, indent=4)
+        stats = store.tally(by=('task_type',))[task_type]
+        print(f"Tally for {task_type}: {stats['success']} success, {stats['fail']} fail, {stats['total']} total "
+              f"(95% CI {stats['ci_low'] * 100:.0f}-{stats['ci_high'] * 100:.0f}%)")
         
         # Optional sleep robot prompt
         sleep_robot = input("Move robot to sleep position? (y/n): ").strip().lower()
@@ -261,15 +287,18 @@ if __name__ == "__main__":
             print("Moving robot to sleep position...")
             run_sleep_script()
 
+    if worker is not None:
+        worker.close()
+
     print("\n" + "=" * 80)
     print("EVALUATION COMPLETE!")
     print("=" * 80)
     print("\nFinal tallies:")
-    for task_type, stats in tally.items():
-        success_rate = (stats['success'] / stats['total'] * 100) if stats['total'] > 0 else 0
-        print(f"{task_type}: {stats['success']}/{stats['total']} ({success_rate:.1f}% success)")
-    
-    total_success = sum(stats['success'] for stats in tally.values())
-    total_tasks = sum(stats['total'] for stats in tally.values())
-    overall_rate = (total_success / total_tasks * 100) if total_tasks > 0 else 0
-    print(f"\nOverall: {total_success}/{total_tasks} ({overall_rate:.1f}% success)")
+    for task_type, stats in store.tally(by=('task_type',)).items():
+        print(f"{task_type}: {stats['success']}/{stats['total']} ({stats['rate'] * 100:.1f}% success, "
+              f"95% CI {stats['ci_low'] * 100:.1f}-{stats['ci_high'] * 100:.1f}%)")
+
+    overall = store.tally(by=('client',)).get(CLIENT_NAME)
+    if overall:
+        print(f"\nOverall: {overall['success']}/{overall['total']} ({overall['rate'] * 100:.1f}% success, "
+              f"95% CI {overall['ci_low'] * 100:.1f}-{overall['ci_high'] * 100:.1f}%)")
@@ -6,9 +6,12 @@ import pprint
 from datetime import datetime
 import time
 
+import numpy as np
+
 from robots.aloha.utils.config import COLLECTION_CONFIG
 if COLLECTION_CONFIG['using_instrumented_busybox']:
-    from robots.aloha.utils.config import MQTT_SUBSCRIBE_TOPICS
+    from robots.aloha.utils.config import MQTT_SUBSCRIBE_TOPICS, MQTT_MODULES_TOPIC
+    from robots.aloha.utils.calibration_store import load_calibration, warn_if_stale
 
 from robots.aloha.utils.data_collect_ui import (
     DataCollectUI,
@@ -17,17 +20,25 @@ from robots.aloha.utils.data_collect_ui import (
     LEFT_PEDAL,
     MIDDLE_PEDAL,
     RIGHT_PEDAL,
+    NO_KEY,
 )
 from robots.aloha.utils.data_collect import EpisodeWriter, create_data_dict
 from robots.aloha.utils.robot_utils import opening_ceremony, bringup_robots
 from robots.aloha.utils.busybox_listener import BusyBoxListener
+from robots.aloha.utils.frame_grabber import FrameGrabber, ImageRecorderFrames
+from robots.aloha.utils.loop_profiler import TickProfiler, TimingReport
+from robots.aloha.utils.loop_scheduler import LoopScheduler
+from robots.aloha.utils.pedal_input import PedalInput
+from robots.aloha.utils.preroll_buffer import PrerollBuffer
+from robots.aloha.utils.session_metrics import SessionMetrics
 from robots.aloha.utils.smart_task_selector import TaskSelectionHandler
+from robots.aloha.utils.adaptive_task_selector import AdaptiveTaskSelector
+from robots.aloha.utils.box_state_planner import BoxStatePlanner
 
 from aloha.real_env import get_action
 from aloha.constants import IS_MOBILE
 
 FPS = 50  # TODO(dean): import FPS from constants
-DELAY_CONSTANT = 0.003
 
 
 # TODO(dean): consider moving this to robot_utils.py so I can remove aloha.real_env import
@@ -40,8 +51,13 @@ def capture_episode_state_machine(
     episode_writer: EpisodeWriter,
     task_selector: TaskSelectionHandler,
     busybox_listener: BusyBoxListener | None = None,
+    timing_report: TimingReport | None = None,
+    frame_grabber: FrameGrabber | ImageRecorderFrames | None = None,
+    pedals: PedalInput | None = None,
+    metrics: SessionMetrics | None = None,
 ):
     _ = env.reset(fake=True)  # TODO(dean): is this needed?
+    t_task_shown = time.time()
     observations = []
     observation_timestamps = []
     actions = []
@@ -49,8 +65,26 @@ def capture_episode_state_machine(
     # BusyBox instrumentation buffers (populated only if using_instrumented_busybox)
     busybox_states = []  # list[dict] latest BusyBox topic->value snapshot per recorded timestep
     busybox_timestamps = []  # list[float] timestamps aligned with observation acquisition
+    image_timestamps = []  # list[dict] camera -> capture time (only with frame_grabber)
+    pedal_events = []  # [timestamp, key] for every pedal press while recording
+    record_start_ts = None
     actual_dt_history = []
-    DT = 1 / FPS
+    scheduler = LoopScheduler(
+        FPS,
+        spin_s=COLLECTION_CONFIG.get('loop_spin_s', 0.001),
+        missed_tick_policy=COLLECTION_CONFIG.get('loop_missed_tick_policy', 'skip'),
+    )
+    profiler = TickProfiler()
+    preroll = PrerollBuffer(
+        COLLECTION_CONFIG.get('preroll_s', 0.0),
+        FPS,
+        COLLECTION_CONFIG['camera_names'],
+        jpeg_quality=COLLECTION_CONFIG.get('preroll_jpeg_quality'),
+    )
+    postroll_steps = int(round(COLLECTION_CONFIG.get('postroll_s', 0.0) * FPS))
+    postroll_remaining = None  # ticks still to record after the stop pedal; None while not stopping
+    preroll_steps = 0
+    record_stop_ts = None
     recorded_fps = None
 
     total_timesteps = 0
@@ -64,17 +98,27 @@ def capture_episode_state_machine(
         task_folder, task_instruction = task_info
         task_edge = None
 
-    # Loop rate is DT only when recording. loop_partial enforces this
+    # Loop rate is FPS while recording (and while filling the pre-roll); the scheduler is anchored when recording starts
+    if pedals is not None:
+        stale = pedals.drain()  # pressed while the previous episode was saved / reset
+        if stale:
+            print(f"[PedalInput] Ignoring {stale} pedal press(es) made before this episode")
     in_loop = True
     while in_loop:
-        loop_start = time.time()
-        key = ui.get_key()
+        profiler.start_tick()
+        if pedals is not None:
+            key, key_ts = pedals.poll()
+        else:
+            key, key_ts = ui.get_key(), time.time()
+        profiler.lap('key_poll')
         # Handle Arm State
         if arm_state == ArmState.ACTIVE:
             t0 = time.time()
             action = get_action(leader_bot_left, leader_bot_right)
+            profiler.lap('get_action')
             t1 = time.time()
             observation = env.step(action, get_base_vel=IS_MOBILE)
+            profiler.lap('env_step')
             if key == RIGHT_PEDAL and not record_state == RecordState.RECORDING:
                 print("[RIGHT PEDAL] pausing robot teleop")
                 arm_state = ArmState.IDLE
@@ -83,15 +127,23 @@ def capture_episode_state_machine(
             if key == RIGHT_PEDAL:
                 print("[RIGHT PEDAL] enabling robot teleop")
                 arm_state = ArmState.ACTIVE
+                preroll.clear()  # do not bridge the pause
                 ui.paint_instructions(arm_state, task_instruction, record_state=record_state)
 
         # Handle Record State
         if record_state == RecordState.IDLE:
             reject_recording = False
+            if arm_state == ArmState.ACTIVE and preroll.maxlen and key not in (LEFT_PEDAL, RIGHT_PEDAL):
+                preroll.push(
+                    observation, t1, action, t0,
+                    busybox_listener.latest_state() if busybox_listener is not None else None,
+                    frame_grabber.get_timestamps() if frame_grabber is not None else None,
+                )
             if key == LEFT_PEDAL:
                 if arm_state == ArmState.ACTIVE:
                     print("[LEFT PEDAL] starting recording")
                     record_state = RecordState.RECORDING
+                    record_start_ts = key_ts
                     ui.paint_instructions(arm_state, task_instruction, record_state=record_state)
                 else:
                     print("Robot must be ENABLED to start recording. Press RIGHT foot pedal to enable robot teleop.")
@@ -99,6 +151,7 @@ def capture_episode_state_machine(
                 print("[MIDDLE PEDAL] refreshing prompt")
                 record_state = RecordState.GET_NEW_TASK
         if record_state == RecordState.GET_NEW_TASK:
+            task_selector.record_outcome(saved=False)  # prompt skipped
             task_id, task_type, task_instruction, task_edge = get_next_task(task_selector)
             
             # Use task_type (sanitized) as folder label
@@ -120,26 +173,57 @@ def capture_episode_state_machine(
         elif record_state == RecordState.RECORDING and observation is not None:
             if total_timesteps == 0:
                 record_start_time = time.time()
+                if metrics is not None:
+                    metrics.record_idle(record_start_time - t_task_shown)
+                scheduler.reset()
+                profiler.reset()
+                # prepend the ticks just before the pedal press
+                for pre_obs, pre_obs_ts, pre_action, pre_action_ts, pre_bb, pre_stamps in preroll.drain():
+                    observations.append(pre_obs)
+                    observation_timestamps.append(pre_obs_ts)
+                    actions.append(pre_action)
+                    action_timestamps.append(pre_action_ts)
+                    if frame_grabber is not None:
+                        image_timestamps.append(pre_stamps)
+                    if COLLECTION_CONFIG['using_instrumented_busybox'] and busybox_listener is not None:
+                        busybox_states.append(pre_bb)
+                        busybox_timestamps.append(pre_obs_ts)
+                    total_timesteps += 1
+                preroll_steps = total_timesteps
             # collect actual data
             observations.append(observation)
             observation_timestamps.append(t1)
             actions.append(action)
             action_timestamps.append(t0)
+            if frame_grabber is not None:
+                image_timestamps.append(frame_grabber.get_timestamps())
             if COLLECTION_CONFIG['using_instrumented_busybox'] and busybox_listener is not None:  # recording busybox!
                 # Capture a shallow copy of the latest BusyBox state right after obtaining obs/action timestamps.
                 # Each entry is a dict logical_topic -> parsed payload (JSON-decoded if possible)
                 busybox_states.append(busybox_listener.latest_state())
                 busybox_timestamps.append(t1)  # align with observation timestamp
+                profiler.lap('busybox_snapshot')
+            if key != NO_KEY:
+                pedal_events.append([key_ts, key])
             # end actual data collection
             total_timesteps += 1
+            profiler.mark_recorded()
             actual_dt_history.append([t0, t1])
 
-            if key == MIDDLE_PEDAL and total_timesteps > 100:
+            # the minimum length applies to the live part, not the prepended pre-roll
+            if key == MIDDLE_PEDAL and total_timesteps - preroll_steps > 100 and postroll_remaining is None:
                 print("[MIDDLE PEDAL] stopping recording")
+                record_stop_ts = key_ts
+                postroll_remaining = postroll_steps
+            elif postroll_remaining:
+                postroll_remaining -= 1
+
+            if postroll_remaining == 0:
                 ui.paint_instructions(arm_state, task_instruction, record_state=record_state)
-                print(f"Timesteps recorded: {total_timesteps}")
-                recorded_fps = total_timesteps / (time.time() - record_start_time)
+                print(f"Timesteps recorded: {total_timesteps} (pre-roll {preroll_steps}, post-roll {postroll_steps})")
+                recorded_fps = (total_timesteps - preroll_steps) / (time.time() - record_start_time)
                 print(f"Recorded FPS: {recorded_fps:.2f} (target: {FPS})")
+                print(f"Loop timing: {scheduler.summary()}")
                 data_dict = create_data_dict(
                     actions,
                     action_timestamps,
@@ -148,11 +232,30 @@ def capture_episode_state_machine(
                     COLLECTION_CONFIG['camera_names'],
                     busybox_states=busybox_states if COLLECTION_CONFIG['using_instrumented_busybox'] else None,
                     busybox_timestamps=busybox_timestamps if COLLECTION_CONFIG['using_instrumented_busybox'] else None,
+                    image_timestamps=image_timestamps if frame_grabber is not None else None,
                 )
                 if task_edge is not None:
                     data_dict['task_edge'] = task_edge  # (from_pos, to_pos)
+                # pre-roll ticks were not profiled: NaN rows keep /timing/* aligned with the samples
+                data_dict.update(profiler.episode_arrays(pad_front=preroll_steps))
+                # episode boundaries as stamped by the pedal reader (kernel time with evdev)
+                data_dict['/markers/record_start'] = [record_start_ts]
+                data_dict['/markers/record_stop'] = [record_stop_ts]
+                # rows [preroll_steps, T - postroll_steps) lie between the pedal presses
+                data_dict['/markers/preroll_steps'] = [preroll_steps]
+                data_dict['/markers/postroll_steps'] = [postroll_steps]
+                data_dict['/markers/pedal_events'] = np.asarray(pedal_events, dtype=np.float64).reshape(-1, 2)
+                if timing_report is not None:
+                    timing_report.add_episode(f'episode_{episode_writer.n}', data_dict)
+                if metrics is not None:
+                    metrics.record_episode(task_folder, total_timesteps, recorded_fps)
                 # data_dict['task_instruction'] = task_instruction
-                episode_writer.write_episode(
+                # pipelined: the file is written while the next reset runs
+                if COLLECTION_CONFIG.get('pipelined_reset'):
+                    write = episode_writer.write_episode_async
+                else:
+                    write = episode_writer.write_episode
+                write(
                     data_dict,
                     task_instruction,
                     task_folder,
@@ -160,6 +263,7 @@ def capture_episode_state_machine(
                     recorded_fps,
                     reject_recording
                 )
+                task_selector.record_outcome(saved=not reject_recording)
                 # exit loop
                 in_loop = False
 
@@ -167,14 +271,21 @@ def capture_episode_state_machine(
                 print("[RIGHT PEDAL] rejecting current recording")
                 jj = True
                 print(f"Timesteps recorded: {total_timesteps}")
-                recorded_fps = total_timesteps / (time.time() - record_start_time)
+                recorded_fps = (total_timesteps - preroll_steps) / (time.time() - record_start_time)
                 print(f"Recorded FPS: {recorded_fps:.2f} (target: {FPS})")
+                print(f"Loop timing: {scheduler.summary()}")
+                if metrics is not None:
+                    metrics.record_reject(task_folder)
+                task_selector.record_outcome(saved=False)
                 # exit loop
                 in_loop = False
 
-            # this needs to remain at the end of the loop to maintain correct loop timing
-            loop_partial = time.time() - loop_start
-            time.sleep(max(0, DT - loop_partial - DELAY_CONSTANT))  # maintain loop rate
+        # this needs to remain at the end of the loop to maintain correct loop timing
+        if in_loop and (
+            record_state == RecordState.RECORDING or (preroll.maxlen and arm_state == ArmState.ACTIVE)
+        ):
+            scheduler.wait_next()  # absolute deadline; overruns are accounted in scheduler.summary()
+            profiler.lap('sleep')
 
 
 def get_next_task(task_selector: TaskSelectionHandler):
@@ -199,18 +310,26 @@ def main(config):
     os.makedirs(session_dir, exist_ok=True)
 
     # create instruction UI
-    ui = DataCollectUI()
+    ui = DataCollectUI(threaded=config.get('threaded_ui', False))
     ui.create_window()
     ui.paint_instructions("ENABLED", "Booting up...", record_state=None)
     key = ui.get_key()
+    pedals = PedalInput(ui, device=config.get('pedal_device'))
+    pedals.start()
 
     # create task generator
     # task_generator = TaskGenerator(all_knob_turns=all_knob_turns, all_slider_moves=all_slider_moves)
 
     _, leader_bot_left, leader_bot_right, env = bringup_robots()
-    episode_writer = EpisodeWriter(session_dir, config['camera_names'])
-    # Initialize task selector (persistent across episodes)
-    task_selector = TaskSelectionHandler()
+    frame_grabber = None
+    if config.get('camera_timestamps'):
+        # same frames as before, plus each frame's ROS capture stamp per tick
+        frame_grabber = ImageRecorderFrames(env.image_recorder, config['camera_names'])
+        frame_grabber.start()
+        env.image_recorder = frame_grabber
+    metrics = SessionMetrics(session_dir, http_port=config.get('metrics_port'))
+    episode_writer = EpisodeWriter(session_dir, config['camera_names'], metrics=metrics)
+    timing_report = TimingReport(session_dir, FPS)
 
     if COLLECTION_CONFIG['using_instrumented_busybox']:
             # Later: integrate busybox_listener.latest_state()/history into data_dict.
@@ -218,17 +337,41 @@ def main(config):
                 broker=COLLECTION_CONFIG['MQTT_broker'],
                 port=COLLECTION_CONFIG['MQTT_port'],
                 topics=MQTT_SUBSCRIBE_TOPICS,
+                modules_topic=MQTT_MODULES_TOPIC,
+                # the box-state planner re-syncs from the decoded live state
+                calibration=(
+                    load_calibration(COLLECTION_CONFIG.get('busybox_id'))
+                    if config.get('task_selector') == 'box_state' else None
+                ),
             )
             busybox_listener.start()
+            warn_if_stale(COLLECTION_CONFIG.get('busybox_id'), busybox_listener.module_serials(timeout=2.0))
+
+    # Initialize task selector (persistent across episodes)
+    if config.get('task_selector') == 'adaptive':
+        task_selector = AdaptiveTaskSelector(config['dataset_dir'], target_per_cell=config.get('target_demos_per_cell', 10))
+    elif config.get('task_selector') == 'box_state':
+        task_selector = BoxStatePlanner(
+            config['dataset_dir'],
+            state_fn=busybox_listener.decoded_state if COLLECTION_CONFIG['using_instrumented_busybox'] else None,
+        )
+    else:
+        task_selector = TaskSelectionHandler(
+            joint_sliders=config.get('joint_slider_coverage', False),
+            state_path=os.path.join(config['dataset_dir'], 'coverage_cursors.json'),
+        )
 
     try:
         while True:
+            t_reset = time.time()
             opening_ceremony(
                 leader_bot_left,
                 leader_bot_right,
                 env.follower_bot_left,
                 env.follower_bot_right,
+                pipelined=config.get('pipelined_reset', False),
             )
+            metrics.record_reset(time.time() - t_reset)
             
             # Sample next task using TaskSelectionHandler
             task_id, task_type, task_instruction, task_edge = get_next_task(task_selector)
@@ -252,15 +395,29 @@ def main(config):
                 task_info,
                 episode_writer,
                 task_selector,
-                busybox_listener if COLLECTION_CONFIG['using_instrumented_busybox'] else None
+                busybox_listener if COLLECTION_CONFIG['using_instrumented_busybox'] else None,
+                timing_report,
+                frame_grabber,
+                pedals,
+                metrics,
             )
+            metrics.print_summary()
+            timing_report.write()
 
     except KeyboardInterrupt:
         print("Session interrupted by user.")
     finally:
         print("Cleaning up and closing session.")
+        episode_writer.flush()
+        metrics.print_summary()
+        metrics.close()
+        timing_report.print_summary()
+        if frame_grabber is not None:
+            print(f"[FrameGrabber] {frame_grabber.stats()}")
+            frame_grabber.stop()
         busybox_listener.stop() if COLLECTION_CONFIG['using_instrumented_busybox'] else None
-        # ui.close_window()  # Example: close out things, cleanup
+        pedals.stop()
+        ui.close_window()
 
 
 if __name__ == "__main__":
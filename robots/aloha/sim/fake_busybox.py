@@ -0,0 +1,495 @@
+"""FakeBusyBox: a simulated BusyBox that talks the module firmware's serial protocol on pseudo-terminals.
+
+Each module (buttons, knob, sliders, switches, wires, e-ink) gets a pty whose
+slave end is linked as `<link_dir>/tty_<module>`, so the unmodified
+`devices/pi_sw/mqtt_bridge.py --port-glob '<link_dir>/tty_*'` discovers and
+reads it like the real USB serial ports:
+
+- every `beacon_s` each module prints its identity line ("sliders_module")
+  followed by its data line ("Slider States: A0=515 A1=1010"), as the
+  firmware does every second;
+- a change prints the data line immediately. Sliders glide to the new
+  position in `move_steps` updates over `move_s` (the firmware's filtered
+  20 Hz output), the knob steps one encoder count at a time, a button press
+  is followed by its release `press_s` later;
+- the e-ink module answers the bridge's commands ("1:Text", "S1:Text",
+  "REFRESH", "CLEAR") with the firmware's replies after `eink_refresh_s`.
+
+The box state is a `BoxState` (`evaluation/generate_task_eval_list.py`);
+raw values follow `SIM_MAPPING`, a calibration mapping in the
+`busybox_digital_mapping.json` format, so `CompiledCalibration(SIM_MAPPING)`
+decodes what the bridge publishes. Writes to a pty nobody reads are dropped
+and counted (like a USB serial adapter with no host), never blocking the box.
+
+`perform(prompt, success)` plays a rollout's effect on the box (the task's
+end state, or a press for button tasks). With `control_port` set, a TCP
+server takes the same operations as JSON lines, so fake policy clients in
+other processes can act on the box (`FakeBusyBoxControl`):
+
+    {"op": "perform", "prompt": "Pull the red wire.", "success": true}
+    {"op": "set", "state": {...BoxState dict...}}
+    {"op": "press", "color": "red"}
+    {"op": "get"}
+    -> {"ok": true, "state": {...}, "eink": ["Pull the red wire.", ""]}
+
+Typical usage:
+
+    box = FakeBusyBox(control_port=0).start()
+    bridge = subprocess.Popen([sys.executable, 'devices/pi_sw/mqtt_bridge.py', '--port-glob', box.port_glob, ...])
+    box.set_state(rollout['init_box_state'])
+    box.perform("Move the top slider to position 3.")
+    box.stop()
+
+    python -m robots.aloha.sim.fake_busybox --link-dir /tmp/busybox --control-port 8765
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import fcntl
+import json
+import os
+import random
+import select
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import tty
+from typing import Any, Dict, List, Optional, Tuple
+
+from evaluation.generate_task_eval_list import BoxState, parse_target
+
+# Calibration mapping of the simulated box (busybox_digital_mapping.json format).
+SIM_MAPPING: Dict[str, Any] = {
+    'sliders': {
+        'top_slider': {'index': 0, 'mapping': {'1': 1010, '2': 770, '3': 515, '4': 260, '5': 15}},
+        'bottom_slider': {'index': 1, 'mapping': {'1': 1010, '2': 770, '3': 515, '4': 260, '5': 15}},
+    },
+    'knob': {'index': 0, 'mapping': {str(pos): (pos - 1) * 4 for pos in range(1, 7)}},
+    'switches': {
+        'top_switch': {'index': 0, 'on_value': 1, 'off_value': 0},
+        'bottom_switch': {'index': 1, 'on_value': 1, 'off_value': 0},
+    },
+    'wires': {
+        f'{color}_wire': {'index': i, 'connected_value': 1, 'disconnected_value': 0}
+        for i, color in enumerate(('black', 'blue', 'red', 'white'))
+    },
+    'buttons': {
+        f'{color}_button': {'index': i, 'pressed_state': 0}
+        for i, color in enumerate(('red', 'blue', 'green', 'yellow'))
+    },
+}
+
+# module -> (identity beacon, data line prefix, channel names)
+MODULES = {
+    'buttons': ('buttons_module', 'Button States:', ('D2', 'D3', 'D4', 'D5')),
+    'knob': ('knob_module', 'Knob State:', ()),
+    'sliders': ('sliders_module', 'Slider States:', ('A0', 'A1')),
+    'switches': ('switches_module', 'Switch States:', ('D2', 'D3')),
+    'wires': ('wires_module', 'Wire States:', ('D2', 'D3', 'D4', 'D5')),
+    'eink': ('e-ink_display_module', None, ()),
+}
+
+# prompt keyword -> task category (see the task lists in generate_task_eval_list.py)
+CATEGORY_KEYWORDS = (
+    ('slider', 'move_slider'),
+    ('knob', 'turn_knob'),
+    ('switch', 'flip_switch'),
+    ('button', 'push_button'),
+    ('insert', 'insert_wire'),
+    ('wire', 'pull_wire'),
+    ('box', 'move_bb'),
+)
+
+
+def format_line(module: str, values: List[int], extra: Optional[Dict[str, int]] = None) -> str:
+    """A module's firmware data line, e.g. ('sliders', [515, 1010]) -> 'Slider States: A0=515 A1=1010'.
+
+    `extra` appends more NAME=value channels (the bridge parses them as extra values).
+    """
+    _, prefix, channels = MODULES[module]
+    if module == 'knob':
+        return f"{prefix} {values[0]}"
+    pairs = list(zip(channels, values)) + list((extra or {}).items())
+    return prefix + ' ' + ' '.join(f"{ch}={v}" for ch, v in pairs)
+
+
+def categorize(prompt: str) -> Tuple[str, Any]:
+    """(task_category, target) for a task prompt, e.g. ('pull_wire', 'red')."""
+    prompt_lc = prompt.lower()
+    for keyword, category in CATEGORY_KEYWORDS:
+        if keyword in prompt_lc:
+            return category, parse_target(prompt, category)
+    raise ValueError(f"Cannot tell the task category of {prompt!r}")
+
+
+class _Port:
+    """One module's pty: the box writes to the master, the bridge opens the slave."""
+
+    def __init__(self, identity: str, link_path: str) -> None:
+        self.identity = identity
+        self.link_path = link_path
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # no echo / newline translation before the bridge configures it
+        flags = fcntl.fcntl(self.master, fcntl.F_GETFL)
+        fcntl.fcntl(self.master, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        if os.path.lexists(link_path):
+            os.unlink(link_path)
+        os.symlink(os.ttyname(self.slave), link_path)
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.dropped = 0
+
+    def write_line(self, line: str) -> bool:
+        data = (line + '\r\n').encode()
+        with self.lock:
+            try:
+                written = os.write(self.master, data)
+            except OSError:  # EAGAIN: nobody is reading and the tty buffer is full
+                written = 0
+            if written < len(data):  # a cut-off line is garbage to the reader as well
+                self.dropped += 1
+                return False
+            self.sent += 1
+        return True
+
+    def close(self) -> None:
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if os.path.islink(self.link_path):
+            os.unlink(self.link_path)
+
+
+class FakeBusyBox:
+    def __init__(
+        self,
+        link_dir: Optional[str] = None,
+        mapping: Dict[str, Any] = SIM_MAPPING,
+        beacon_s: float = 1.0,
+        move_steps: int = 5,
+        move_s: float = 0.25,
+        press_s: float = 0.15,
+        eink_refresh_s: float = 0.5,
+        noise: int = 2,
+        seed: Optional[int] = None,
+        control_port: Optional[int] = None,
+    ) -> None:
+        self._own_dir = link_dir is None
+        self.link_dir = link_dir or tempfile.mkdtemp(prefix='fake_busybox_')
+        self.mapping = mapping
+        self.beacon_s = beacon_s
+        self.move_steps = max(1, move_steps)
+        self.move_s = move_s
+        self.press_s = press_s
+        self.eink_refresh_s = eink_refresh_s
+        self.noise = noise
+        self.rng = random.Random(seed)
+        self.control_port = control_port
+        self.box = BoxState()
+        self.pressed: Dict[str, bool] = {color: False for color in self._names('buttons', '_button')}
+        self.eink_lines = ['', '']
+        self.performs: List[Dict[str, Any]] = []  # {'ts', 'prompt', 'success'} per perform()
+        self._slider_raw = {
+            side: float(self._slider_table(side)[str(self.box.sliders[side])]) for side in ('top', 'bottom')
+        }
+        self._knob_raw = self._knob_table()[str(self.box.knob_position)]
+        self._ports: Dict[str, _Port] = {}
+        self._state_lock = threading.RLock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._server: Optional[socketserver.ThreadingTCPServer] = None
+
+    # ------------- Lifecycle -------------
+    def start(self) -> "FakeBusyBox":
+        os.makedirs(self.link_dir, exist_ok=True)
+        for module, (identity, _, _) in MODULES.items():
+            self._ports[module] = _Port(identity, os.path.join(self.link_dir, f'tty_{module}'))
+        self._threads = [
+            threading.Thread(target=self._beacon_loop, daemon=True, name='FakeBusyBox-beacon'),
+            threading.Thread(target=self._eink_loop, daemon=True, name='FakeBusyBox-eink'),
+        ]
+        if self.control_port is not None:
+            self._server = _ControlServer(('localhost', self.control_port), self)
+            self.control_port = self._server.server_address[1]
+            self._threads.append(
+                threading.Thread(target=self._server.serve_forever, daemon=True, name='FakeBusyBox-control')
+            )
+        for thread in self._threads:
+            thread.start()
+        print(f"[FakeBusyBox] modules on {self.port_glob}"
+              + (f", control on localhost:{self.control_port}" if self._server else ''))
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        for port in self._ports.values():
+            port.close()
+        self._ports.clear()
+        if self._own_dir:
+            try:
+                os.rmdir(self.link_dir)
+            except OSError:
+                pass
+
+    @property
+    def port_glob(self) -> str:
+        return os.path.join(self.link_dir, 'tty_*')
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {module: {'sent': port.sent, 'dropped': port.dropped} for module, port in self._ports.items()}
+
+    def send_line(self, module: str, line: str) -> bool:
+        """Write a raw line on a module's port (load generators, replays); False if it was dropped."""
+        return self._ports[module].write_line(line)
+
+    # ------------- Box operations -------------
+    def state(self) -> Dict[str, Any]:
+        with self._state_lock:
+            return self.box.to_dict()
+
+    def set_state(self, state: Dict[str, Any], instant: bool = False) -> None:
+        """Move every control to `state` (a BoxState dict), emitting updates as the firmware would."""
+        with self._state_lock:
+            target = copy.deepcopy(state)
+            for color, inserted in target['wires_inserted'].items():
+                self.box.update_wire(color, inserted)
+            self._emit('wires')
+            for side, on in target['switches'].items():
+                self.box.update_switch(side, on)
+            self._emit('switches')
+            for side, pos in target['sliders'].items():
+                self._move_slider(side, pos, instant)
+            self._turn_knob(target['knob_position'], instant)
+
+    def perform(self, prompt: str, success: bool = True) -> Dict[str, Any]:
+        """Play the rollout `prompt` on the box: its end state on success, nothing otherwise."""
+        category, target = categorize(prompt)
+        with self._state_lock:
+            self.performs.append({'ts': time.time(), 'prompt': prompt, 'success': success})
+            if success and category == 'push_button':
+                self.press(target)
+            elif success and category != 'move_bb':
+                box = BoxState()
+                box.load_from_dict(self.box.to_dict())
+                self.set_state(box.update_assuming_task_performed(
+                    {'task_str': prompt, 'task_category': category, 'target': target}
+                ))
+            return {'task_category': category, 'target': target, 'state': self.box.to_dict()}
+
+    def press(self, color: str, hold_s: Optional[float] = None) -> None:
+        """Press and release a button (pullup input: pressed reads 0)."""
+        if color not in self.pressed:
+            raise ValueError(f"Unknown button {color!r}")
+        self.pressed[color] = True
+        self._emit('buttons')
+        time.sleep(self.press_s if hold_s is None else hold_s)
+        self.pressed[color] = False
+        self._emit('buttons')
+
+    # ------------- Raw values -------------
+    def _names(self, module: str, suffix: str) -> List[str]:
+        entries = sorted(self.mapping[module].items(), key=lambda kv: kv[1]['index'])
+        return [name[:-len(suffix)] if suffix and name.endswith(suffix) else name for name, _ in entries]
+
+    def _slider_table(self, side: str) -> Dict[str, int]:
+        return self.mapping['sliders'][f'{side}_slider']['mapping']
+
+    def _knob_table(self) -> Dict[str, int]:
+        return self.mapping['knob']['mapping']
+
+    def _values(self, module: str) -> List[int]:
+        if module == 'sliders':
+            values = [0, 0]
+            for side in ('top', 'bottom'):
+                raw = int(round(self._slider_raw[side])) + self.rng.randint(-self.noise, self.noise)
+                values[self.mapping['sliders'][f'{side}_slider']['index']] = min(1023, max(0, raw))
+            return values
+        if module == 'knob':
+            return [self._knob_raw]
+        if module == 'switches':
+            entries = self.mapping['switches']
+            values = [0] * len(entries)
+            for side, on in self.box.switches.items():
+                info = entries[f'{side}_switch']
+                values[info['index']] = info['on_value'] if on else info.get('off_value', 1 - info['on_value'])
+            return values
+        if module == 'wires':
+            entries = self.mapping['wires']
+            values = [0] * len(entries)
+            for color, inserted in self.box.wires_inserted.items():
+                info = entries[f'{color}_wire']
+                values[info['index']] = (info['connected_value'] if inserted
+                                         else info.get('disconnected_value', 1 - info['connected_value']))
+            return values
+        entries = self.mapping['buttons']
+        values = [0] * len(entries)
+        for color, pressed in self.pressed.items():
+            info = entries[f'{color}_button']
+            values[info['index']] = info['pressed_state'] if pressed else 1 - info['pressed_state']
+        return values
+
+    def _data_line(self, module: str) -> str:
+        return format_line(module, self._values(module))
+
+    def _emit(self, module: str) -> None:
+        port = self._ports.get(module)
+        if port is not None:
+            port.write_line(self._data_line(module))
+
+    def _move_slider(self, side: str, pos: int, instant: bool) -> None:
+        start, end = self._slider_raw[side], float(self._slider_table(side)[str(pos)])
+        self.box.update_slider(side, pos)
+        if start == end:
+            return
+        steps = 1 if instant else self.move_steps
+        for i in range(1, steps + 1):
+            self._slider_raw[side] = start + (end - start) * i / steps
+            self._emit('sliders')
+            if not instant:
+                time.sleep(self.move_s / steps)
+
+    def _turn_knob(self, pos: int, instant: bool) -> None:
+        end = self._knob_table()[str(pos)]
+        self.box.update_knob(pos)
+        if instant:
+            self._knob_raw = end
+            self._emit('knob')
+            return
+        step = 1 if end > self._knob_raw else -1
+        counts = abs(end - self._knob_raw)
+        while self._knob_raw != end:
+            self._knob_raw += step
+            self._emit('knob')
+            time.sleep(self.move_s / max(counts, 1))
+
+    # ------------- Threads -------------
+    def _beacon_loop(self) -> None:
+        while not self._stop.is_set():
+            for module, port in list(self._ports.items()):
+                port.write_line(port.identity)
+                if module == 'eink':
+                    port.write_line(f"Display Lines: L1='{self.eink_lines[0]}' L2='{self.eink_lines[1]}'")
+                else:
+                    port.write_line(self._data_line(module))  # no lock: beacons keep going during a glide
+            self._stop.wait(self.beacon_s)
+
+    def _eink_loop(self) -> None:
+        port = self._ports['eink']
+        buffer = b''
+        while not self._stop.is_set():
+            try:
+                readable, _, _ = select.select([port.master], [], [], 0.2)
+                if not readable:
+                    continue
+                buffer += os.read(port.master, 1024)
+            except OSError:
+                self._stop.wait(0.2)  # slave not open yet / closed by the bridge
+                continue
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                cmd = line.decode(errors='ignore').strip('\r')
+                if cmd:
+                    port.write_line(self._eink_command(cmd))
+
+    def _eink_command(self, cmd: str) -> str:
+        """Apply one e-ink command and return the firmware's reply (6_e-ink_display_module.ino)."""
+        if len(cmd) >= 2 and cmd[0] in '12' and cmd[1] == ':':
+            self.eink_lines[int(cmd[0]) - 1] = cmd[2:].lstrip(' \t')
+            time.sleep(self.eink_refresh_s)
+            return f"Updated L{cmd[0]} -> '{self.eink_lines[int(cmd[0]) - 1]}'"
+        if len(cmd) >= 3 and cmd[0] == 'S' and cmd[1] in '12' and cmd[2] == ':':
+            self.eink_lines[int(cmd[1]) - 1] = cmd[3:].lstrip(' \t')
+            return f"Staged L{cmd[1]} -> '{self.eink_lines[int(cmd[1]) - 1]}'"
+        if cmd == 'REFRESH':
+            time.sleep(self.eink_refresh_s)
+            return "Manual refresh done."
+        if cmd == 'CLEAR':
+            self.eink_lines = ['', '']
+            time.sleep(self.eink_refresh_s)
+            return "Cleared."
+        return f"Unknown cmd: '{cmd}'"
+
+
+# ------------------------ Control server ------------------------
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        box: FakeBusyBox = self.server.box  # type: ignore[attr-defined]
+        for line in self.rfile:
+            try:
+                req = json.loads(line)
+                op = req.get('op')
+                reply: Dict[str, Any] = {'ok': True}
+                if op == 'perform':
+                    reply.update(box.perform(req['prompt'], bool(req.get('success', True))))
+                elif op == 'set':
+                    box.set_state(req['state'], instant=bool(req.get('instant', False)))
+                elif op == 'press':
+                    box.press(req['color'])
+                elif op != 'get':
+                    raise ValueError(f"unknown op {op!r}")
+                reply.setdefault('state', box.state())
+                reply['eink'] = list(box.eink_lines)
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(reply) + '\n').encode())
+
+
+class _ControlServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int], box: FakeBusyBox) -> None:
+        self.box = box
+        super().__init__(address, _ControlHandler)
+
+
+class FakeBusyBoxControl:
+    """Client for a FakeBusyBox control server (one persistent connection)."""
+
+    def __init__(self, host: str, port: int, timeout: float = 30.0) -> None:
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._sock.makefile('rwb')
+
+    @classmethod
+    def from_address(cls, address: str) -> "FakeBusyBoxControl":
+        host, _, port = address.rpartition(':')
+        return cls(host or 'localhost', int(port))
+
+    def request(self, op: str, **kwargs: Any) -> Dict[str, Any]:
+        self._file.write((json.dumps(dict(kwargs, op=op)) + '\n').encode())
+        self._file.flush()
+        reply = json.loads(self._file.readline())
+        if not reply.get('ok'):
+            raise RuntimeError(f"FakeBusyBox {op} failed: {reply.get('error')}")
+        return reply
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulated BusyBox modules on pseudo-terminals.")
+    parser.add_argument('--link-dir', default=None, help="directory for the tty_<module> links (default: a temp dir)")
+    parser.add_argument('--control-port', type=int, default=8765)
+    parser.add_argument('--beacon-s', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    fake = FakeBusyBox(args.link_dir, beacon_s=args.beacon_s, seed=args.seed, control_port=args.control_port).start()
+    print(f"Run the bridge with: python3 devices/pi_sw/mqtt_bridge.py --port-glob '{fake.port_glob}'")
+    try:
+        while True:
+            time.sleep(10.0)
+            print(f"[FakeBusyBox] {fake.stats()}")
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,104 @@
+"""Scripted fake policy client for headless evaluation runs.
+
+Stands in for the openpi / GR00T clients on a machine without robot or GPU.
+It takes the same command-line flags the evaluators pass
+(`--args.prompt P --args.prompt_timeout T`, or `-l P -t T`), "loads" for
+`--startup-time`, prints "Connected to server" (the `ready_pattern` the
+ClientScheduler times start-up with), "acts" for `--act-time` and then, with
+probability `--success-rate`, performs the task on a FakeBusyBox through its
+control server (`--sim host:port`); otherwise it leaves the box untouched.
+After performing it keeps running for up to `--hold-time` (as a real client
+does until it is stopped), so a TaskSuccessOracle can confirm the end state
+and stop it early.
+
+With `--worker` it is a persistent PolicyWorker instead (see
+`robots/aloha/utils/policy_worker.py`): it loads once and serves prompts over
+stdin/stdout.
+
+Outcomes are drawn from `random.Random(seed)`; a one-shot client mixes the
+prompt into the seed so a rerun of the same session draws the same outcomes.
+
+Typical usage:
+
+    python -m robots.aloha.sim.fake_client --sim localhost:8765 --success-rate 0.7 \
+        --args.prompt "Pull the red wire." --args.prompt_timeout 30
+    python -m robots.aloha.sim.fake_client --sim localhost:8765 --worker --startup-time 3
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from robots.aloha.sim.fake_busybox import FakeBusyBoxControl
+from robots.aloha.utils.policy_worker import serve
+
+
+class FakePolicy:
+    def __init__(self, sim: Optional[str], success_rate: float = 1.0, act_time: float = 1.0,
+                 seed: Optional[str] = None) -> None:
+        self.control = FakeBusyBoxControl.from_address(sim) if sim else None
+        self.success_rate = success_rate
+        self.act_time = act_time
+        self.rng = random.Random(seed)
+
+    def run(self, prompt: str, timeout: float, cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Act on `prompt` for `act_time` (bounded by `timeout`), then maybe perform it on the box."""
+        print(f"[FakePolicy] acting on {prompt!r}")
+        cancel = cancel or threading.Event()
+        if cancel.wait(min(self.act_time, timeout)):
+            return {'status': 'cancelled', 'performed': False}
+        if self.act_time > timeout:
+            return {'status': 'timeout', 'performed': False}
+        success = self.rng.random() < self.success_rate
+        reply = self.control.request('perform', prompt=prompt, success=success) if self.control else {}
+        return {'status': 'done', 'performed': success, 'task_category': reply.get('task_category')}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scripted fake policy client for a FakeBusyBox.")
+    parser.add_argument('--args.prompt', '-l', dest='prompt', default=None)
+    parser.add_argument('--args.prompt_timeout', '--args.prompt-timeout', '-t', dest='timeout', type=float,
+                        default=30.0)
+    parser.add_argument('--sim', default=None, help="FakeBusyBox control server host:port")
+    parser.add_argument('--success-rate', type=float, default=1.0)
+    parser.add_argument('--act-time', type=float, default=1.0, help="seconds of 'inference' per rollout")
+    parser.add_argument('--startup-time', type=float, default=0.0, help="seconds of 'model loading'")
+    parser.add_argument('--hold-time', type=float, default=0.0,
+                        help="seconds to keep running after performing the task (bounded by the timeout)")
+    parser.add_argument('--seed', default=None)
+    parser.add_argument('--worker', action='store_true', help="serve prompts as a PolicyWorker")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.worker:
+        def load():
+            time.sleep(args.startup_time)
+            return FakePolicy(args.sim, args.success_rate, args.act_time, args.seed).run
+        serve(load)
+        return 0
+
+    if args.prompt is None:
+        print("No prompt given (--args.prompt / -l)", file=sys.stderr)
+        return 2
+    try:
+        time.sleep(args.startup_time)
+        seed = None if args.seed is None else f"{args.seed}:{args.prompt}"
+        policy = FakePolicy(args.sim, args.success_rate, args.act_time, seed)
+        print("Connected to server", flush=True)
+        result = policy.run(args.prompt, args.timeout)
+        print(f"[FakePolicy] {result}", flush=True)
+        if result['performed']:
+            time.sleep(min(args.hold_time, max(0.0, args.timeout - args.act_time)))
+    except KeyboardInterrupt:  # stopped early by the scheduler / oracle
+        return 130
+    return 0 if result['status'] == 'done' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
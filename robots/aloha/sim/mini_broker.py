@@ -0,0 +1,245 @@
+"""MiniBroker: an in-process MQTT 3.1.1 broker for simulation and benchmarks.
+
+Enough of MQTT for the bridge, `BusyBoxListener` and `mosquitto_pub`/`_sub`
+to talk to each other on a machine without mosquitto:
+
+- CONNECT / CONNACK, PINGREQ / PINGRESP, DISCONNECT;
+- SUBSCRIBE / UNSUBSCRIBE with `+` and `#` wildcards (granted at QoS 0);
+- PUBLISH at QoS 0 and 1 (PUBACK sent, delivery always QoS 0), retained
+  messages (an empty retained payload clears the topic).
+
+No persistence, authentication, will messages or QoS 2. Delivery to a
+subscriber whose socket buffer is over `max_buffer` bytes is dropped and
+counted, so a stalled client cannot grow the broker's memory.
+
+The broker runs an asyncio loop on a background thread; `port=0` picks a
+free port (read it back from `broker.port`).
+
+Typical usage:
+
+    broker = MiniBroker(port=0).start()
+    listener = BusyBoxListener('localhost', broker.port, MQTT_SUBSCRIBE_TOPICS)
+    ...
+    broker.stats()   # {'clients': 2, 'received': 1532, 'delivered': 1532, 'dropped': 0}
+    broker.stop()
+
+    python -m robots.aloha.sim.mini_broker --port 1883
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """MQTT filter match ('a/+/c', 'a/#'); '$'-topics only match filters that name them."""
+    f_parts, t_parts = topic_filter.split('/'), topic.split('/')
+    if topic.startswith('$') and not topic_filter.startswith('$'):
+        return False
+    for i, part in enumerate(f_parts):
+        if part == '#':
+            return True
+        if i >= len(t_parts) or (part != '+' and part != t_parts[i]):
+            return False
+    return len(f_parts) == len(t_parts)
+
+
+def _encode_length(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte, n = n % 128, n // 128
+        out.append(byte | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def _string(data: bytes, pos: int) -> Tuple[str, int]:
+    (n,) = struct.unpack_from('!H', data, pos)
+    return data[pos + 2:pos + 2 + n].decode('utf-8', errors='replace'), pos + 2 + n
+
+
+def publish_packet(topic: str, payload: bytes, retain: bool = False) -> bytes:
+    topic_b = topic.encode()
+    body = struct.pack('!H', len(topic_b)) + topic_b + payload
+    return bytes([(PUBLISH << 4) | int(retain)]) + _encode_length(len(body)) + body
+
+
+class _Session:
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.client_id = ''
+        self.filters: List[str] = []
+
+
+class MiniBroker:
+    def __init__(self, host: str = 'localhost', port: int = 1883, max_buffer: int = 1 << 20) -> None:
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self.retained: Dict[str, bytes] = {}
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._sessions: List[_Session] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    # ------------- Lifecycle -------------
+    def start(self) -> "MiniBroker":
+        self._thread = threading.Thread(target=self._run, daemon=True, name='MiniBroker')
+        self._thread.start()
+        if not self._ready.wait(5.0) or self._server is None:
+            raise RuntimeError(f"MiniBroker could not listen on {self.host}:{self.port}")
+        print(f"[MiniBroker] listening on {self.host}:{self.port}")
+        return self
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2.0)
+        self._loop = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'clients': len(self._sessions),
+            'received': self.received,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'retained': len(self.retained),
+        }
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            print(f"[MiniBroker] {e}")
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            for session in self._sessions:
+                session.writer.close()
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+
+    # ------------- Protocol -------------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = _Session(writer)
+        self._sessions.append(session)
+        try:
+            while True:
+                header = await reader.readexactly(1)
+                length, shift = 0, 0
+                while True:
+                    byte = (await reader.readexactly(1))[0]
+                    length |= (byte & 0x7F) << shift
+                    shift += 7
+                    if not byte & 0x80:
+                        break
+                body = await reader.readexactly(length) if length else b''
+                if not self._packet(session, header[0], body):
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._sessions.remove(session)
+            writer.close()
+
+    def _packet(self, session: _Session, first: int, body: bytes) -> bool:
+        kind, flags = first >> 4, first & 0x0F
+        write = session.writer.write
+        if kind == CONNECT:
+            _, pos = _string(body, 0)  # protocol name
+            pos += 4  # level, flags, keepalive
+            session.client_id, _ = _string(body, pos)
+            write(bytes([CONNACK << 4, 2, 0, 0]))
+        elif kind == PUBLISH:
+            qos, retain = (flags >> 1) & 0x03, bool(flags & 0x01)
+            topic, pos = _string(body, 0)
+            if qos:
+                (packet_id,) = struct.unpack_from('!H', body, pos)
+                pos += 2
+                write(bytes([PUBACK << 4, 2]) + struct.pack('!H', packet_id))
+            self._publish(topic, body[pos:], retain)
+        elif kind == SUBSCRIBE:
+            (packet_id,) = struct.unpack_from('!H', body, 0)
+            pos, granted = 2, bytearray()
+            new_filters = []
+            while pos < len(body):
+                topic_filter, pos = _string(body, pos)
+                pos += 1  # requested QoS
+                if topic_filter not in session.filters:
+                    session.filters.append(topic_filter)
+                new_filters.append(topic_filter)
+                granted.append(0)
+            ack = struct.pack('!H', packet_id) + bytes(granted)
+            write(bytes([SUBACK << 4]) + _encode_length(len(ack)) + ack)
+            for topic, payload in self.retained.items():
+                if any(topic_matches(f, topic) for f in new_filters):
+                    write(publish_packet(topic, payload, retain=True))
+        elif kind == UNSUBSCRIBE:
+            (packet_id,) = struct.unpack_from('!H', body, 0)
+            pos = 2
+            while pos < len(body):
+                topic_filter, pos = _string(body, pos)
+                if topic_filter in session.filters:
+                    session.filters.remove(topic_filter)
+            write(bytes([UNSUBACK << 4, 2]) + struct.pack('!H', packet_id))
+        elif kind == PINGREQ:
+            write(bytes([PINGRESP << 4, 0]))
+        elif kind == DISCONNECT:
+            return False
+        return True
+
+    def _publish(self, topic: str, payload: bytes, retain: bool) -> None:
+        self.received += 1
+        if retain:
+            if payload:
+                self.retained[topic] = payload
+            else:
+                self.retained.pop(topic, None)
+        packet = None
+        for session in self._sessions:
+            if not any(topic_matches(f, topic) for f in session.filters):
+                continue
+            transport = session.writer.transport
+            if transport.is_closing() or transport.get_write_buffer_size() > self.max_buffer:
+                self.dropped += 1
+                continue
+            packet = packet or publish_packet(topic, payload)
+            session.writer.write(packet)
+            self.delivered += 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Minimal MQTT broker for BusyBox simulation.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=1883)
+    args = parser.parse_args()
+    broker = MiniBroker(args.host, args.port).start()
+    try:
+        while True:
+            time.sleep(10.0)
+            print(f"[MiniBroker] {broker.stats()}")
+    except KeyboardInterrupt:
+        broker.stop()
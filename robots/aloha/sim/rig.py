@@ -0,0 +1,114 @@
+"""SimRig: the simulated telemetry path, from module ptys to BusyBoxListener.
+
+Starts, in order:
+
+- a `MiniBroker` on a free port;
+- a `FakeBusyBox` with its module ptys (and control server);
+- the unmodified `devices/pi_sw/mqtt_bridge.py` as a subprocess, probing the
+  fake box's ports (`--port-glob`) and publishing to the broker;
+- a `BusyBoxListener` decoding with `CompiledCalibration(SIM_MAPPING)`;
+
+then waits until every data module has reached the listener. Used by
+`scripts/run_headless_eval.py` and `scripts/bench_telemetry.py`. Needs
+pyserial and paho-mqtt (requirements.txt).
+
+Typical usage:
+
+    with SimRig(box_kwargs={'move_s': 0.1}) as rig:
+        rig.box.set_state(init_state)
+        rig.listener.latest_state()
+"""
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+from robots.aloha.sim.fake_busybox import SIM_MAPPING, FakeBusyBox
+from robots.aloha.sim.mini_broker import MiniBroker
+from robots.aloha.utils.busybox_listener import BusyBoxListener
+from robots.aloha.utils.compiled_calibration import CompiledCalibration
+from robots.aloha.utils.config import EINK_PUBLISH_TOPIC, MQTT_SUBSCRIBE_TOPICS
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+BRIDGE_PATH = REPO_ROOT / 'devices' / 'pi_sw' / 'mqtt_bridge.py'
+
+
+class SimRig:
+    def __init__(
+        self,
+        box_kwargs: Optional[Dict[str, Any]] = None,
+        listener_kwargs: Optional[Dict[str, Any]] = None,
+        bridge_args: Sequence[str] = (),
+        ready_timeout: float = 15.0,
+        verbose: bool = False,
+    ) -> None:
+        self.box_kwargs = dict(box_kwargs or {})
+        self.box_kwargs.setdefault('control_port', 0)
+        self.listener_kwargs = dict(listener_kwargs or {})
+        self.bridge_args = list(bridge_args)
+        self.ready_timeout = ready_timeout
+        self.verbose = verbose
+        self.calibration = CompiledCalibration(SIM_MAPPING)
+        self.broker: Optional[MiniBroker] = None
+        self.box: Optional[FakeBusyBox] = None
+        self.bridge: Optional[subprocess.Popen] = None
+        self.listener: Optional[BusyBoxListener] = None
+        self.setup_s: Optional[float] = None
+
+    def __enter__(self) -> "SimRig":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @staticmethod
+    def subprocess_env() -> Dict[str, str]:
+        """Environment for child processes that import `robots.*` / `evaluation.*`."""
+        paths = [str(REPO_ROOT), os.environ.get('PYTHONPATH')]
+        return dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in paths if p))
+
+    def start(self) -> "SimRig":
+        t0 = time.monotonic()
+        self.broker = MiniBroker(port=0).start()
+        self.box = FakeBusyBox(**self.box_kwargs).start()
+        quiet = None if self.verbose else subprocess.DEVNULL
+        self.bridge = subprocess.Popen(
+            [sys.executable, str(BRIDGE_PATH), '--broker-port', str(self.broker.port),
+             '--port-glob', self.box.port_glob, '--discovery-timeout', '5', *self.bridge_args],
+            stdout=quiet, stderr=quiet, env=self.subprocess_env(),
+        )
+        self.listener = BusyBoxListener('localhost', self.broker.port, MQTT_SUBSCRIBE_TOPICS,
+                                        e_ink_topic=EINK_PUBLISH_TOPIC, calibration=self.calibration,
+                                        **self.listener_kwargs)
+        try:
+            self.listener.start()
+            deadline = time.monotonic() + self.ready_timeout
+            while not all(v is not None for v in self.listener.latest_state().values()):
+                if self.bridge.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"bridge did not publish every module (exit code {self.bridge.poll()}); "
+                                       "rerun with verbose output")
+                time.sleep(0.05)
+        except BaseException:
+            self.close()
+            raise
+        self.setup_s = time.monotonic() - t0
+        return self
+
+    def close(self) -> None:
+        if self.listener is not None:
+            self.listener.stop()
+        if self.bridge is not None and self.bridge.poll() is None:
+            self.bridge.send_signal(signal.SIGINT)
+            try:
+                self.bridge.wait(timeout=5.0)
+            except subprocess.TimeoutExpired:
+                self.bridge.kill()
+        if self.box is not None:
+            self.box.stop()
+        if self.broker is not None:
+            self.broker.stop()
@@ -0,0 +1,249 @@
+"""AdaptiveTaskSelector: pick the next task by how far each cell is below its target count.
+
+A cell is one (task type, target, gripper, edge) combination:
+
+- regular tasks: one cell per TASKBOX_TASKS entry (the gripper, where the
+  instruction names one, is part of the entry);
+- MoveSlider / TurnKnob: one cell per directed move (from_pos, to_pos), since
+  the same target reached from different positions is a different demo.
+
+Existing demos are counted from every `manifest.json` under the dataset
+directory (successful entries only; episodes carry `task_edge` for moves).
+Cells sit in a heap ordered by deficit (target - saved - in flight), so the
+most under-represented valid cell is chosen each time. Moves must start where
+the control currently is, so only edges leaving the current slider / knob
+position are eligible.
+
+`record_outcome()` updates counts as episodes are saved or rejected. A
+skipped or rejected cell (MIDDLE pedal, `saved=False`) cools down: it is
+passed over for the next `skip_cooldown` picks, times the number of times in
+a row it was skipped, unless no other cell is valid. So the operator gets
+past a task they cannot set up instead of being handed it again. Positions
+and attempt/reject history are persisted in `<dataset_dir>/task_selector_state.json`
+so the next session continues from the same state.
+
+Drop-in for TaskSelectionHandler: iterating yields (task_id, task_type,
+instruction) and `last_special_edges()` returns the move just emitted.
+
+Typical usage:
+
+    selector = AdaptiveTaskSelector(COLLECTION_CONFIG['dataset_dir'], target_per_cell=10)
+    task_id, task_type, instruction = next(selector)
+    ...
+    selector.record_outcome(saved=True)
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import os
+import random
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from robots.aloha.utils.task_registry import TASKBOX_REGISTRY
+
+STATE_FILENAME = 'task_selector_state.json'
+
+# (task_id, edge) — edge is (from_pos, to_pos) for moves, None otherwise
+Cell = Tuple[int, Optional[Tuple[int, int]]]
+
+
+def _cell_key(cell: Cell) -> str:
+    task_id, edge = cell
+    return str(task_id) if edge is None else f"{task_id}:{edge[0]}->{edge[1]}"
+
+
+class AdaptiveTaskSelector(Iterator):
+    def __init__(
+        self,
+        dataset_dir: str,
+        target_per_cell: int = 10,
+        seed: Optional[int] = None,
+        state_path: Optional[str] = None,
+        skip_cooldown: int = 5,
+    ) -> None:
+        self.dataset_dir = Path(dataset_dir)
+        self.target_per_cell = target_per_cell
+        self.skip_cooldown = skip_cooldown
+        self.state_path = Path(state_path) if state_path else self.dataset_dir / STATE_FILENAME
+        self._rng = random.Random(seed)
+        self._tie = itertools.count()
+
+        # control ('TurnKnob', 'MoveSlider:Top', ...) -> {position: task_id}
+        self._move_targets: Dict[str, Dict[int, int]] = {}
+        self._cells: List[Cell] = []
+        self._cell_control: Dict[Cell, Optional[str]] = {}
+        for spec in TASKBOX_REGISTRY:
+            control = spec.move_control
+            if control is None:
+                self._add_cell((spec.task_id, None), None)
+            else:
+                self._move_targets.setdefault(control, {})[spec.target] = spec.task_id
+        for control, targets in self._move_targets.items():
+            for u in targets:
+                for v, task_id in targets.items():
+                    if u != v:
+                        self._add_cell((task_id, (u, v)), control)
+
+        state = self._load_state()
+        self.attempts: Counter = Counter(state.get('attempts', {}))
+        self.rejects: Counter = Counter(state.get('rejects', {}))
+        self.positions: Dict[str, int] = {
+            control: state.get('positions', {}).get(control) or self._rng.choice(sorted(targets))
+            for control, targets in self._move_targets.items()
+        }
+        self.saved: Counter = self._count_catalog()
+        self.in_flight: Counter = Counter()
+        self._picks = 0
+        self._skip_streak: Counter = Counter()  # consecutive skips / rejects per cell this session
+        self._cooldown_until: Dict[Cell, int] = {}  # cell -> pick number it is eligible again
+
+        self._heap: List[Tuple[int, float, int, Cell]] = []
+        for cell in self._cells:
+            self._push(cell)
+
+        self._last: Optional[Tuple[Cell, Optional[str]]] = None
+        self._last_edges: Dict[str, Optional[Tuple[int, int]]] = {control: None for control in self._move_targets}
+        print(
+            f"[AdaptiveTaskSelector] {len(self._cells)} cells, {sum(self.saved.values())} demos in catalog, "
+            f"{sum(1 for c in self._cells if self.deficit(c) > 0)} below target {target_per_cell}"
+        )
+
+    # --------- Iterator Protocol ---------
+    def __iter__(self) -> "AdaptiveTaskSelector":
+        return self
+
+    def __next__(self) -> Tuple[int, str, str]:
+        if not self._cells:
+            raise StopIteration
+        cell = self._pop_valid()
+        task_id, edge = cell
+        control = self._cell_control[cell]
+        self._picks += 1
+        self.in_flight[cell] += 1
+        self._push(cell)
+        self._last = (cell, control)
+        spec = TASKBOX_REGISTRY.get(task_id)
+        if control is not None:
+            self._last_edges[control] = edge
+        return task_id, control or spec.task_type, spec.instruction
+
+    # ------------- Public API -------------
+    def deficit(self, cell: Cell) -> int:
+        return self.target_per_cell - self.saved[cell] - self.in_flight[cell]
+
+    def last_special_edges(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        return dict(self._last_edges)
+
+    def record_outcome(self, saved: bool) -> None:
+        """Close out the last emitted task: saved (counts toward its target) or rejected / skipped."""
+        if self._last is None:
+            return
+        cell, control = self._last
+        self._last = None
+        self.in_flight[cell] -= 1
+        key = _cell_key(cell)
+        self.attempts[key] += 1
+        if saved:
+            self.saved[cell] += 1
+            self._skip_streak.pop(cell, None)
+            self._cooldown_until.pop(cell, None)
+            if control is not None:
+                self.positions[control] = cell[1][1]  # the control was left at the move's target
+        else:
+            self.rejects[key] += 1
+            self._skip_streak[cell] += 1
+            self._cooldown_until[cell] = self._picks + self.skip_cooldown * self._skip_streak[cell]
+        self._push(cell)
+        self.save_state()
+
+    def save_state(self) -> None:
+        state = {
+            'version': 1,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'target_per_cell': self.target_per_cell,
+            'positions': self.positions,
+            'attempts': dict(self.attempts),
+            'rejects': dict(self.rejects),
+        }
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.json.tmp')
+        with tmp_path.open('w') as f:
+            json.dump(state, f, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+    # ------------- Helpers -------------
+    def _add_cell(self, cell: Cell, control: Optional[str]) -> None:
+        self._cells.append(cell)
+        self._cell_control[cell] = control
+
+    def _push(self, cell: Cell) -> None:
+        # heapq is a min-heap: largest deficit first, random tie-break, then insertion order
+        heapq.heappush(self._heap, (-self.deficit(cell), self._rng.random(), next(self._tie), cell))
+        if len(self._heap) > 4 * len(self._cells):
+            # drop stale entries left behind by deficit updates
+            self._heap = [e for e in self._heap if -e[0] == self.deficit(e[3])]
+            heapq.heapify(self._heap)
+
+    def _pop_valid(self) -> Cell:
+        """Highest-deficit cell whose move (if any) starts at its control's current position.
+
+        Cells cooling down after a skip are only chosen when no other cell is valid.
+        """
+        deferred = []
+        cooling = []
+        chosen = None
+        while self._heap:
+            neg_deficit, _, _, cell = heapq.heappop(self._heap)
+            if -neg_deficit != self.deficit(cell):
+                continue  # stale entry; the cell's current entry is elsewhere in the heap
+            control = self._cell_control[cell]
+            if control is not None and cell[1][0] != self.positions[control]:
+                deferred.append(cell)
+                continue
+            if self._cooldown_until.get(cell, 0) > self._picks:
+                cooling.append(cell)
+                continue
+            chosen = cell
+            break
+        if chosen is None and cooling:
+            chosen = min(cooling, key=lambda c: self._cooldown_until[c])
+            cooling.remove(chosen)
+        for cell in deferred + cooling:
+            self._push(cell)
+        if chosen is None:
+            raise StopIteration
+        return chosen
+
+    def _load_state(self) -> dict:
+        if not self.state_path.exists():
+            return {}
+        with self.state_path.open('r') as f:
+            return json.load(f)
+
+    def _count_catalog(self) -> Counter:
+        """Successful demos per cell over all session manifests under the dataset directory."""
+        counts: Counter = Counter()
+        if not self.dataset_dir.is_dir():
+            return counts
+        for manifest_path in self.dataset_dir.rglob('manifest.json'):
+            try:
+                with manifest_path.open('r') as f:
+                    manifest = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue  # partially written session
+            for key, entry in manifest.items():
+                if not key.startswith('episode_') or not isinstance(entry, dict) or not entry.get('success', True):
+                    continue
+                spec = TASKBOX_REGISTRY.lookup(entry.get('task_instruction'))
+                if spec is None:
+                    continue
+                edge = entry.get('task_edge')
+                cell = (spec.task_id, tuple(edge) if edge else None)
+                if cell in self._cell_control:
+                    counts[cell] += 1
+        return counts
@@ -0,0 +1,235 @@
+"""BoxStatePlanner: pick the next task the box is already set up for.
+
+TaskSelectionHandler and AdaptiveTaskSelector know where the sliders and the
+knob are, but nothing else about the box, so a prompt like "Insert the red
+wire." can arrive while the red wire is already in and the operator has to
+reset it before recording. The planner keeps a `BoxState` (from
+`evaluation/generate_task_eval_list.py`) of the whole box and only proposes
+tasks whose preconditions already hold:
+
+- PullWire needs the wire inserted, InsertWire needs it pulled;
+- FlipSwitch on/off needs the switch in the opposite state;
+- MoveSlider / TurnKnob moves start from the current position (so consecutive
+  moves chain into a walk over (from_pos, to_pos) edges, least-covered first);
+- PushButton is always available.
+
+Among the available tasks the least-skipped task (skips and rejects this
+session, cleared when the task is saved), then the least-collected task type,
+then the least-collected task / edge, wins (random tie-break), so a task the
+operator cannot set up is not proposed again until the others were skipped too. After a wire is pulled
+the matching insert is proposed next, which puts the wire back and keeps every
+pull task available.
+
+The model advances when an episode is saved (`record_outcome(saved=True)`
+applies the task to the BoxState); rejected or skipped tasks leave it as is.
+With a live `state_fn` (e.g. `BusyBoxListener.decoded_state` with a
+calibration) the model is re-synced from the box before every pick, so
+unrecorded fiddling by the operator is picked up too. If nothing is available
+the cheapest task is proposed and the resets it needs are printed.
+
+Box state and per-cell counts are persisted in `<dataset_dir>/box_state.json`.
+
+Drop-in for TaskSelectionHandler: iterating yields (task_id, task_type,
+instruction) and `last_special_edges()` returns the move just emitted.
+
+Typical usage:
+
+    planner = BoxStatePlanner(COLLECTION_CONFIG['dataset_dir'], state_fn=busybox_listener.decoded_state)
+    task_id, task_type, instruction = next(planner)
+    ...
+    planner.record_outcome(saved=True)
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from evaluation.generate_task_eval_list import BoxState
+from robots.aloha.utils.task_registry import TASKBOX_REGISTRY, TaskSpec
+
+STATE_FILENAME = 'box_state.json'
+
+
+def _rollout(spec: TaskSpec) -> Dict[str, Any]:
+    """The eval-rollout dict BoxState expects (targets as parse_target returns them)."""
+    if spec.task_type in ('PullWire', 'InsertWire', 'PushButton'):
+        target: Any = spec.flavor
+    elif spec.task_type == 'FlipSwitch':
+        target = 'on' if spec.target else 'off'
+    else:
+        target = spec.target
+    return {'task_str': spec.instruction, 'task_prompt': spec.instruction, 'task_category': spec.category, 'target': target}
+
+
+def unmet_preconditions(box: BoxState, task: TaskSpec) -> List[str]:
+    """Manual resets `box` needs before `task` can be demonstrated ([] if none)."""
+    if task.category == 'pull_wire' and not box.wires_inserted[task.flavor]:
+        return [f"insert the {task.flavor} wire"]
+    if task.category == 'insert_wire' and box.wires_inserted[task.flavor]:
+        return [f"pull the {task.flavor} wire"]
+    if task.category == 'flip_switch' and box.switches[task.flavor] == bool(task.target):
+        return [f"flip the {task.flavor} switch {'off' if task.target else 'on'}"]
+    if task.category == 'move_slider' and box.sliders[task.flavor] == task.target:
+        return [f"move the {task.flavor} slider off position {task.target}"]
+    if task.category == 'turn_knob' and box.knob_position == task.target:
+        return [f"turn the knob off position {task.target}"]
+    return []
+
+
+class BoxStatePlanner(Iterator):
+    def __init__(
+        self,
+        dataset_dir: Optional[str] = None,
+        state_fn: Optional[Callable[[], Dict[str, Any]]] = None,
+        seed: Optional[int] = None,
+        chain_wires: bool = True,
+        state_path: Optional[str] = None,
+    ) -> None:
+        self.state_fn = state_fn
+        self.chain_wires = chain_wires
+        self._rng = random.Random(seed)
+        if state_path:
+            self.state_path: Optional[Path] = Path(state_path)
+        else:
+            self.state_path = Path(dataset_dir) / STATE_FILENAME if dataset_dir else None
+
+        self.tasks: List[TaskSpec] = list(TASKBOX_REGISTRY)
+
+        self.box = BoxState()
+        state = self._load_state()
+        if state.get('box'):
+            self.box.load_from_dict(state['box'])
+        self.type_counts: Counter = Counter(state.get('type_counts', {}))
+        self.cell_counts: Counter = Counter(state.get('cell_counts', {}))
+        self.resets_needed = 0
+        self.skips: Counter = Counter()  # task_id -> skips / rejects since it was last saved (this session)
+
+        self._last: Optional[Tuple[TaskSpec, Optional[Tuple[int, int]]]] = None
+        self._follow_up: Optional[TaskSpec] = None
+        self._last_edges: Dict[str, Optional[Tuple[int, int]]] = {
+            t.move_control: None for t in self.tasks if t.move_control is not None
+        }
+        print(f"[BoxStatePlanner] {len(self.tasks)} tasks, starting box state:\n{self.box}")
+
+    # --------- Iterator Protocol ---------
+    def __iter__(self) -> "BoxStatePlanner":
+        return self
+
+    def __next__(self) -> Tuple[int, str, str]:
+        if not self.tasks:
+            raise StopIteration
+        self.sync()
+        task = self._pick()
+        resets = self.unmet_preconditions(task)
+        if resets:
+            self.resets_needed += 1
+            print(f"[BoxStatePlanner] No task matches the box; reset first: {', '.join(resets)}")
+            self._apply_preconditions(task)
+        edge = self._edge(task)
+        self._last = (task, edge)
+        if task.move_control is not None:
+            self._last_edges[task.move_control] = edge
+            return task.task_id, task.move_control, task.instruction
+        return task.task_id, task.task_type, task.instruction
+
+    # ------------- Public API -------------
+    def last_special_edges(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        return dict(self._last_edges)
+
+    def record_outcome(self, saved: bool) -> None:
+        """Close out the last emitted task; a saved task is applied to the box model."""
+        if self._last is None:
+            return
+        task, edge = self._last
+        self._last = None
+        self._follow_up = None
+        if not saved:
+            self.skips[task.task_id] += 1
+        else:
+            self.skips.pop(task.task_id, None)
+            self.box.update_assuming_task_performed(_rollout(task))
+            self.type_counts[task.task_type] += 1
+            self.cell_counts[self._cell_key(task, edge)] += 1
+            if self.chain_wires and task.category == 'pull_wire':
+                self._follow_up = next(iter(TASKBOX_REGISTRY.for_target(task.control, 1)), None)
+        self.save_state()
+
+    def sync(self) -> None:
+        """Overwrite the model with whatever the live box reports (modules without data are kept)."""
+        if self.state_fn is None:
+            return
+        decoded = self.state_fn() or {}
+        sliders = decoded.get('sliders')
+        if isinstance(sliders, dict):
+            for name, pos in sliders.items():
+                self.box.update_slider(name.split('_')[0], int(pos))
+        if decoded.get('knob') is not None:
+            self.box.update_knob(int(decoded['knob']))
+        switches = decoded.get('switches')
+        if isinstance(switches, dict):
+            for name, label in switches.items():
+                self.box.update_switch(name.split('_')[0], label == 'on')
+        wires = decoded.get('wires')
+        if isinstance(wires, dict):
+            for color, label in wires.items():
+                self.box.update_wire(color, label == 'connected')
+
+    def unmet_preconditions(self, task: TaskSpec) -> List[str]:
+        """Manual resets the box needs before `task` can be demonstrated ([] if none)."""
+        return unmet_preconditions(self.box, task)
+
+    def save_state(self) -> None:
+        if self.state_path is None:
+            return
+        state = {
+            'version': 1,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'box': self.box.to_dict(),
+            'type_counts': dict(self.type_counts),
+            'cell_counts': dict(self.cell_counts),
+        }
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.json.tmp')
+        with tmp_path.open('w') as f:
+            json.dump(state, f, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+    # ------------- Helpers -------------
+    def _pick(self) -> TaskSpec:
+        if self._follow_up is not None and not self.unmet_preconditions(self._follow_up):
+            return self._follow_up
+        ready = [t for t in self.tasks if not self.unmet_preconditions(t)]
+        if ready:
+            return min(ready, key=self._priority)
+        # nothing fits: fewest resets, then the usual priority
+        return min(self.tasks, key=lambda t: (len(self.unmet_preconditions(t)), self._priority(t)))
+
+    def _priority(self, task: TaskSpec) -> Tuple[int, int, int, float]:
+        cell = self._cell_key(task, self._edge(task))
+        return self.skips[task.task_id], self.type_counts[task.task_type], self.cell_counts[cell], self._rng.random()
+
+    def _edge(self, task: TaskSpec) -> Optional[Tuple[int, int]]:
+        if task.category == 'move_slider':
+            return self.box.sliders[task.flavor], task.target
+        if task.category == 'turn_knob':
+            return self.box.knob_position, task.target
+        return None
+
+    def _apply_preconditions(self, task: TaskSpec) -> None:
+        """Assume the operator performed the printed resets."""
+        self.box.generate_valid_state(_rollout(task))
+
+    @staticmethod
+    def _cell_key(task: TaskSpec, edge: Optional[Tuple[int, int]]) -> str:
+        return str(task.task_id) if edge is None else f"{task.task_id}:{edge[0]}->{edge[1]}"
+
+    def _load_state(self) -> dict:
+        if self.state_path is None or not self.state_path.exists():
+            return {}
+        with self.state_path.open('r') as f:
+            return json.load(f)
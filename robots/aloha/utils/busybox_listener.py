@@ -9,6 +9,11 @@ Responsibilities:
 - Maintain thread-safe latest snapshot and append-only history per topic
 - Provide shallow-copy access to latest state for integration during
   episode data collection.
+- Optionally publish e-ink display commands and wait for the bridge's
+  ack (published once the e-paper refresh has actually finished).
+- Optionally decode each module update once on arrival with a
+  CompiledCalibration (see `decoded_state()`), and track the bridge's
+  retained module/USB-serial report (see `module_serials()`).
 
 Typical usage:
 
@@ -20,6 +25,10 @@ Typical usage:
     # ... on shutdown ...
     listener.stop()
 
+E-ink usage (requires `e_ink_topic`, e.g. EINK_PUBLISH_TOPIC from config):
+
+    listener.publish_eink(["1:Press Red", "2:"], wait=True)  # one refresh, blocks until drawn
+
 Notes:
 - Payloads are expected to be UTF-8 JSON or simple scalars. We attempt
   JSON decode, fallback to raw text / repr on decode failure.
@@ -28,9 +37,10 @@ Notes:
 """
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional, Sequence, Union
 import json
 import time
+import uuid
 
 
 class BusyBoxListener:
@@ -40,11 +50,23 @@ class BusyBoxListener:
         port: int,
         topics: Dict[str, str],
         max_history: Optional[int] | None = 10_000,
+        e_ink_topic: Optional[str] = None,
+        calibration: Any = None,
+        modules_topic: Optional[str] = None,
     ) -> None:
         self.broker = broker
         self.port = port
         self.topics = topics  # mapping logical_name -> mqtt/topic
         self.max_history = max_history
+        self.e_ink_topic = e_ink_topic
+        # bridge publishes acks next to the cmd topic: <base>/eink/cmd -> <base>/eink/ack
+        self.e_ink_ack_topic = e_ink_topic.rsplit('/', 1)[0] + '/ack' if e_ink_topic else None
+        self._eink_waiters: Dict[str, Any] = {}  # request id -> threading.Event
+        self._eink_acks: Dict[str, dict] = {}    # request id -> ack payload
+        self.calibration = calibration  # CompiledCalibration or None
+        self.modules_topic = modules_topic
+        self.decoded: Dict[str, Any] = {k: None for k in self.topics.keys()}
+        self.modules: Dict[str, Any] = {}  # bridge report: logical -> {"port", "usb_serial"}
         self._connected = False
         self._client = None
         self._lock = None  # lazy import threading only if used
@@ -112,11 +134,78 @@ class BusyBoxListener:
             self._client = None
             self._connected = False
 
+    def publish_eink(
+        self,
+        cmds: Union[str, Sequence[str]],
+        wait: bool = False,
+        timeout: float = 15.0,
+    ) -> bool:
+        """Send one or more e-ink commands ("1:Text", "2:Text", "CLEAR", "REFRESH").
+
+        All commands in one call are drawn with a single e-paper refresh. With
+        `wait=True` this blocks until the bridge acks the draw (or `timeout`),
+        replacing fixed sleeps between line updates. Returns True on success
+        (always True for fire-and-forget publishes that reached the client).
+        """
+        if self._client is None or self.e_ink_topic is None:
+            print("[BusyBoxListener] publish_eink called without a started client / e_ink_topic")
+            return False
+        import threading
+
+        if isinstance(cmds, str):
+            cmds = cmds.split('\n')
+        req_id = uuid.uuid4().hex[:12]
+        done = threading.Event()
+        if wait:
+            self._eink_waiters[req_id] = done
+        payload = json.dumps({"id": req_id, "cmds": list(cmds)})
+        try:
+            self._client.publish(self.e_ink_topic, payload, qos=0)
+        except Exception as e:  # pragma: no cover - network specific
+            print(f"[BusyBoxListener] Failed to publish e-ink command: {e}")
+            self._eink_waiters.pop(req_id, None)
+            return False
+        if not wait:
+            return True
+        acked = done.wait(timeout)
+        self._eink_waiters.pop(req_id, None)
+        ack = self._eink_acks.pop(req_id, None)
+        if not acked:
+            print(f"[BusyBoxListener] [WARNING]: no e-ink ack within {timeout}s for {list(cmds)}")
+            return False
+        return bool(ack and ack.get("ok"))
+
     def latest_state(self) -> Dict[str, Any]:
         with (self._lock or _NullContext()):
             # Return a shallow copy to avoid external mutation.
             return dict(self.latest)
 
+    def decoded_state(self) -> Dict[str, Any]:
+        """Latest semantic state per module (requires `calibration`); None for modules not seen yet."""
+        with (self._lock or _NullContext()):
+            return dict(self.decoded)
+
+    def module_serials(self, timeout: float = 0.0) -> Dict[str, Optional[str]]:
+        """logical module -> USB serial, as reported by the bridge on `modules_topic`.
+
+        Waits up to `timeout` seconds for the (retained) report; {} if none arrived.
+        """
+        t_end = time.time() + timeout
+        while not self.modules and time.time() < t_end:
+            time.sleep(0.05)
+        with (self._lock or _NullContext()):
+            return {name: info.get("usb_serial") for name, info in self.modules.items()}
+
+    def history_since(self, logical: str, t: float) -> List[Tuple[float, Any]]:
+        """Return (ts, payload) entries for `logical` received at or after `t` (oldest first)."""
+        with (self._lock or _NullContext()):
+            hist = self.history.get(logical, [])
+            i = len(hist)
+            # walk back from the newest entry; only the tail is ever needed
+            while i > 0 and hist[i - 1][0] >= t:
+                i -= 1
+            return hist[i:]
+
     # ---------------------- Internal Callbacks ------------------
     def _on_connect(self, client, userdata, flags, rc):  # noqa: D401
         if rc == 0:
@@ -129,6 +218,10 @@ class BusyBoxListener:
                     print(f"[BusyBoxListener] Subscribed: {logical} -> {topic}")
                 except Exception as e:  # pragma: no cover
                     print(f"[BusyBoxListener] Failed to subscribe {topic}: {e}")
+            if self.e_ink_ack_topic:
+                client.subscribe(self.e_ink_ack_topic, qos=0)
+            if self.modules_topic:
+                client.subscribe(self.modules_topic, qos=1)
         else:
             print(f"[BusyBoxListener] Connection failed with code {rc}")
 
@@ -146,17 +239,41 @@ class BusyBoxListener:
                 parsed = text  # keep raw
         else:
             parsed = text
+        if msg.topic == self.e_ink_ack_topic:
+            self._handle_eink_ack(parsed)
+            return
+        if msg.topic == self.modules_topic:
+            if isinstance(parsed, dict):
+                with (self._lock or _NullContext()):
+                    self.modules = parsed
+            return
         logical = self._logical_from_topic(msg.topic)
         if logical is None:
             return  # not one of ours
         ts = time.time()
+        decoded = None
+        if self.calibration is not None and isinstance(parsed, dict) and parsed.get("values") is not None:
+            try:
+                decoded = self.calibration.decode_module(logical, parsed["values"])
+            except (KeyError, IndexError):
+                decoded = None  # module not calibrated / unexpected width
         with (self._lock or _NullContext()):
             self.latest[logical] = parsed
+            self.decoded[logical] = decoded
             hist = self.history[logical]
             hist.append((ts, parsed))
             if self.max_history is not None and len(hist) > self.max_history:
                 hist.pop(0)  # O(n) trim
 
+    def _handle_eink_ack(self, ack: Any) -> None:
+        if not isinstance(ack, dict):
+            return
+        for req_id in ack.get("ids", []):
+            waiter = self._eink_waiters.get(req_id)
+            if waiter is not None:
+                self._eink_acks[req_id] = ack
+                waiter.set()
+
     # -------------------------- Helpers -------------------------
     def _logical_from_topic(self, topic: str):
         for logical, t in self.topics.items():
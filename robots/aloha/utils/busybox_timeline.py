@@ -0,0 +1,122 @@
+"""Offline decoding of recorded BusyBox snapshots into semantic state timelines.
+
+Episodes store one JSON snapshot of `BusyBoxListener.latest_state()` per
+timestep in `/busybox/state_json` (aligned with `/busybox/timestamp`). This
+module turns those rows into per-module (T, channels) arrays once, decodes
+whole arrays with `CompiledCalibration.decode_arrays`, and reduces them to:
+
+- `start_state` / `end_state`: semantic box state at the first / last valid row
+- `changed`: controls whose value differs between start and end
+- `timeline`: change events [{"t": seconds_from_first_row, "control": "sliders/top_slider", "value": 3}, ...]
+- `button_presses`: number of press onsets per button
+
+Typical usage:
+
+    cal = CompiledCalibration.from_json(BUSYBOX_DIGITAL_MAPPING_PATH)
+    summary = decode_episode_file(cal, "episode_3.hdf5")
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from robots.aloha.utils.compiled_calibration import BINARY_MODULES, CompiledCalibration
+
+MODULES = ('sliders', 'knob', 'switches', 'wires', 'buttons')
+
+
+def states_to_arrays(state_json_rows: Sequence[str]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Parse JSON snapshot rows into module -> ((T, channels) values, (T,) valid mask).
+
+    Rows where a module had not reported yet (None payload) are marked invalid.
+    """
+    rows = [json.loads(r) for r in state_json_rows]
+    n = len(rows)
+    arrays = {}
+    for module in MODULES:
+        payloads = [row.get(module) if isinstance(row, dict) else None for row in rows]
+        values = [p.get('values') if isinstance(p, dict) else None for p in payloads]
+        width = max((len(v) for v in values if v), default=0)
+        if width == 0:
+            continue
+        valid = np.array([v is not None and len(v) == width for v in values], dtype=bool)
+        arr = np.zeros((n, width), dtype=np.int64)
+        if valid.any():
+            arr[valid] = np.array([v for v, ok in zip(values, valid) if ok], dtype=np.int64)
+        arrays[module] = (arr, valid)
+    return arrays
+
+
+def _label(module: str, value) -> Any:
+    if module in BINARY_MODULES:
+        on, off = BINARY_MODULES[module][2]
+        return on if value else off
+    return int(value)
+
+
+def _set_state(state: Dict[str, Any], module: str, name: str, value) -> None:
+    if module == 'knob':
+        state['knob'] = value
+    else:
+        state.setdefault(module, {})[name] = value
+
+
+def decode_episode_states(
+    calibration: CompiledCalibration,
+    state_json_rows: Sequence[str],
+    timestamps: Sequence[float],
+) -> Dict[str, Any]:
+    """Decode one episode's snapshot rows into start/end states and a change timeline."""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    t0 = float(timestamps[0]) if len(timestamps) else 0.0
+    start_state: Dict[str, Any] = {}
+    end_state: Dict[str, Any] = {}
+    changed: List[str] = []
+    timeline: List[Dict[str, Any]] = []
+    button_presses: Dict[str, int] = {}
+
+    for module, (values, valid) in states_to_arrays(state_json_rows).items():
+        rows = np.flatnonzero(valid)
+        if len(rows) == 0:
+            continue
+        for name, series in calibration.decode_arrays(module, values[rows]).items():
+            control = module if module == 'knob' else f'{module}/{name}'
+            first, last = _label(module, series[0]), _label(module, series[-1])
+            _set_state(start_state, module, name, first)
+            _set_state(end_state, module, name, last)
+            if first != last:
+                changed.append(control)
+            change_idx = np.flatnonzero(series[1:] != series[:-1]) + 1
+            for i in change_idx.tolist():
+                timeline.append({
+                    't': round(float(timestamps[rows[i]]) - t0, 4),
+                    'control': control,
+                    'value': _label(module, series[i]),
+                })
+            if module == 'buttons':
+                # onsets: pressed now, not pressed on the previous valid row (or pressed at start)
+                onsets = int(series[0]) + int(np.count_nonzero(series[1:] & ~series[:-1]))
+                button_presses[name] = onsets
+
+    timeline.sort(key=lambda e: e['t'])
+    return {
+        'start_state': start_state,
+        'end_state': end_state,
+        'changed': changed,
+        'timeline': timeline,
+        'button_presses': button_presses,
+    }
+
+
+def decode_episode_file(calibration: CompiledCalibration, episode_path: str) -> Dict[str, Any] | None:
+    """Decode `/busybox` data from one HDF5 episode; None if the episode has no BusyBox data."""
+    import h5py
+
+    with h5py.File(episode_path, 'r') as root:
+        if 'busybox/state_json' not in root:
+            return None
+        rows = root['busybox/state_json'].asstr()[...]
+        timestamps = root['busybox/timestamp'][...]
+    return decode_episode_states(calibration, rows, timestamps)
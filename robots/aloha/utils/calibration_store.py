@@ -0,0 +1,142 @@
+"""Persistent, versioned BusyBox calibration profiles.
+
+`scripts/busybox_calibration.py` writes one profile per physical box to
+`BUSYBOX_CALIBRATION_DIR/<box_id>.json`. Each module section records the USB
+serial of the Arduino it was calibrated on, so a swapped or re-flashed module
+is detected and can be re-calibrated on its own without redoing the rest:
+
+    {
+        "schema_version": 1,
+        "box_id": "busybox_0",
+        "revision": 4,
+        "updated_at": "2026-10-19T10:12:03",
+        "modules": {
+            "buttons":  {"usb_serial": "A10KXYZ1", "calibrated_at": "...",
+                         "mapping": {"red_button": {"index": 2, "pressed_state": 0}, ...}},
+            "switches": {..., "mapping": {"top_switch": {"index": 1, "on_value": 1, "off_value": 0}, ...}},
+            "wires":    {..., "mapping": {"black_wire": {"index": 0, "connected_value": 1, "disconnected_value": 0}, ...}},
+            "sliders":  {..., "mapping": {"top_slider": {"index": 0, "mapping": {"1": 1010, ...}}, ...}},
+            "knob":     {..., "mapping": {"index": 0, "mapping": {"1": 40, ...}}}
+        }
+    }
+
+Every save bumps `revision` and keeps the previous file as
+`<box_id>.r<revision>.json`. `to_digital_mapping` flattens a profile into the
+legacy `busybox_digital_mapping.json` layout consumed by CompiledCalibration.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from robots.aloha.utils.compiled_calibration import CompiledCalibration
+from robots.aloha.utils.config import BUSYBOX_CALIBRATION_DIR, BUSYBOX_DIGITAL_MAPPING_PATH
+
+SCHEMA_VERSION = 1
+CALIBRATED_MODULES = ('buttons', 'switches', 'wires', 'sliders', 'knob')
+
+
+def profile_path(box_id: str, calibration_dir: Path = BUSYBOX_CALIBRATION_DIR) -> Path:
+    return Path(calibration_dir) / f"{box_id}.json"
+
+
+def new_profile(box_id: str) -> Dict[str, Any]:
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "box_id": box_id,
+        "revision": 0,
+        "updated_at": None,
+        "modules": {},
+    }
+
+
+def load_profile(box_id: str, calibration_dir: Path = BUSYBOX_CALIBRATION_DIR) -> Optional[Dict[str, Any]]:
+    path = profile_path(box_id, calibration_dir)
+    if not path.exists():
+        return None
+    with path.open('r') as f:
+        profile = json.load(f)
+    if profile.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(
+            f"Calibration profile {path} has schema_version {profile.get('schema_version')}, expected {SCHEMA_VERSION}"
+        )
+    return profile
+
+
+def save_profile(profile: Dict[str, Any], calibration_dir: Path = BUSYBOX_CALIBRATION_DIR) -> Path:
+    """Write the profile atomically, keeping the previous revision alongside it."""
+    path = profile_path(profile["box_id"], calibration_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        with path.open('r') as f:
+            previous_revision = json.load(f).get("revision", 0)
+        shutil.copy2(path, path.with_name(f"{profile['box_id']}.r{previous_revision}.json"))
+    profile["revision"] = profile.get("revision", 0) + 1
+    profile["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    tmp_path = path.with_suffix('.json.tmp')
+    with tmp_path.open('w') as f:
+        json.dump(profile, f, indent=4)
+    os.replace(tmp_path, path)
+    return path
+
+
+def update_module(
+    profile: Dict[str, Any], module: str, mapping: Dict[str, Any], usb_serial: Optional[str]
+) -> Dict[str, Any]:
+    """Replace one module's calibration in place (other modules are untouched)."""
+    if module not in CALIBRATED_MODULES:
+        raise ValueError(f"Unknown module {module!r}; expected one of {CALIBRATED_MODULES}")
+    profile["modules"][module] = {
+        "usb_serial": usb_serial,
+        "calibrated_at": datetime.now().isoformat(timespec="seconds"),
+        "mapping": mapping,
+    }
+    return profile
+
+
+def stale_modules(profile: Dict[str, Any], module_serials: Dict[str, Optional[str]]) -> List[str]:
+    """Modules whose connected USB serial differs from the one they were calibrated on.
+
+    `module_serials` is the bridge's `<base>/status/modules` report
+    (logical name -> usb serial). Modules without a known serial on either
+    side are not reported.
+    """
+    stale = []
+    for module, section in profile.get("modules", {}).items():
+        connected = module_serials.get(module)
+        if connected and section.get("usb_serial") and connected != section["usb_serial"]:
+            stale.append(module)
+    return stale
+
+
+def warn_if_stale(box_id: Optional[str], module_serials: Dict[str, Optional[str]]) -> List[str]:
+    """Print a warning for modules that need re-calibration; returns their names."""
+    profile = load_profile(box_id) if box_id else None
+    if profile is None:
+        return []
+    stale = stale_modules(profile, module_serials)
+    if stale:
+        print(
+            f"[Calibration] [WARNING]: modules {stale} are not the ones profile {box_id} was calibrated on. "
+            f"Re-run: python scripts/busybox_calibration.py --box-id {box_id} " + " ".join(f"--module {m}" for m in stale)
+        )
+    return stale
+
+
+def to_digital_mapping(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a profile into the legacy busybox_digital_mapping.json layout."""
+    return {module: section["mapping"] for module, section in profile.get("modules", {}).items()}
+
+
+def load_calibration(box_id: Optional[str], calibration_dir: Path = BUSYBOX_CALIBRATION_DIR) -> CompiledCalibration:
+    """Compile the box's stored profile, falling back to the legacy mapping JSON."""
+    profile = load_profile(box_id, calibration_dir) if box_id else None
+    if profile is not None:
+        print(f"[Calibration] Using profile {box_id} revision {profile['revision']}")
+        return CompiledCalibration(to_digital_mapping(profile))
+    print(f"[Calibration] No profile for {box_id!r}; using {BUSYBOX_DIGITAL_MAPPING_PATH}")
+    return CompiledCalibration.from_json(BUSYBOX_DIGITAL_MAPPING_PATH)
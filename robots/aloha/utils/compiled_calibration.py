@@ -0,0 +1,219 @@
+"""CompiledCalibration: precompiled lookup tables for decoding raw BusyBox values.
+
+Built once from `busybox_digital_mapping.json` (the format written by the
+calibration script) and reused for every decode:
+
+- Sliders / knob: calibrated raw readings are sorted and turned into bin edges
+  (midpoints between neighbouring readings), so the nearest calibrated position
+  is a single `searchsorted` instead of a linear scan over string keys.
+- Switches / wires / buttons: channel indices and "active" values (on /
+  connected / pressed) are stored as arrays; a module's `values` vector packs
+  into one integer bit word, and target states compile to (care_mask,
+  expected_word) pairs so a whole module is checked with one comparison.
+
+The same tables decode a single live snapshot (`decode`, `matches`) or whole
+recorded `/busybox` arrays (`decode_arrays`).
+
+Semantic state format (matches `check_busybox_state` targets):
+
+    {
+        'sliders': {'top_slider': 3, 'bottom_slider': 1},
+        'switches': {'top_switch': 'on', 'bottom_switch': 'off'},
+        'wires': {'black': 'connected', 'blue': 'disconnected', ...},
+        'buttons': {'red': False, ...},   # True while pressed (if calibrated)
+        'knob': 4,                        # only if the mapping has a 'knob' entry
+    }
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# module -> (suffix stripped from mapping names, active-value key, (active label, inactive label))
+BINARY_MODULES = {
+    'switches': ('', 'on_value', ('on', 'off')),
+    'wires': ('_wire', 'connected_value', ('connected', 'disconnected')),
+    'buttons': ('_button', 'pressed_state', (True, False)),
+}
+
+
+class _PositionTable:
+    """Nearest-calibrated-position lookup for one analog channel."""
+
+    def __init__(self, index: int, mapping: Dict[str, int]) -> None:
+        self.index = index
+        self.raw_by_position = {int(pos): raw for pos, raw in mapping.items()}
+        order = sorted(self.raw_by_position.items(), key=lambda kv: kv[1])
+        self.positions = np.array([pos for pos, _ in order], dtype=np.int64)
+        raws = np.array([raw for _, raw in order], dtype=np.float64)
+        self.edges = (raws[1:] + raws[:-1]) / 2.0
+
+    def decode(self, raw):
+        """Map raw reading(s) (scalar or array) to the nearest calibrated position."""
+        return self.positions[np.searchsorted(self.edges, raw)]
+
+    def in_range(self, raw, bounds: Tuple[int, int]) -> bool:
+        a, b = (self.raw_by_position[p] for p in bounds)
+        return min(a, b) <= raw <= max(a, b)
+
+
+class _BitTable:
+    """Bit-packed decode for one binary module (switches, wires or buttons)."""
+
+    def __init__(self, module: str, entries: Dict[str, Dict[str, Any]]) -> None:
+        suffix, active_key, labels = BINARY_MODULES[module]
+        self.labels = labels
+        self.names: List[str] = []
+        indices, active = [], []
+        for full_name, info in entries.items():
+            if info.get('index') is None:
+                continue  # not calibrated
+            name = full_name[: -len(suffix)] if suffix and full_name.endswith(suffix) else full_name
+            self.names.append(name)
+            indices.append(info['index'])
+            active.append(info.get(active_key, 0 if module == 'buttons' else 1))
+        self.indices = np.array(indices, dtype=np.int64)
+        self.active = np.array(active, dtype=np.int64)
+        self.bit = {name: 1 << i for i, name in enumerate(self.names)}
+        self._weights = np.array([1 << i for i in range(len(self.names))], dtype=np.int64)
+
+    def pack(self, values) -> int:
+        word = 0
+        for i, (idx, act) in enumerate(zip(self.indices.tolist(), self.active.tolist())):
+            if values[idx] == act:
+                word |= 1 << i
+        return word
+
+    def pack_arrays(self, values: np.ndarray) -> np.ndarray:
+        """(T, channels) raw values -> (T,) packed words."""
+        if not self.names:
+            return np.zeros(len(values), dtype=np.int64)
+        bits = values[:, self.indices] == self.active
+        return bits.astype(np.int64) @ self._weights
+
+    def unpack(self, word: int) -> Dict[str, Any]:
+        on, off = self.labels
+        return {name: (on if word & bit else off) for name, bit in self.bit.items()}
+
+    def compile_target(self, target: Dict[str, Any]) -> Tuple[int, int]:
+        """Target {name: label} -> (care_mask, expected_word)."""
+        on, _ = self.labels
+        care = expected = 0
+        for name, label in target.items():
+            bit = self.bit[name]
+            care |= bit
+            if label == on:
+                expected |= bit
+        return care, expected
+
+
+class CompiledCalibration:
+    def __init__(self, mapping: Dict[str, Any]) -> None:
+        self.mapping = mapping
+        self.sliders: Dict[str, _PositionTable] = {
+            name: _PositionTable(info['index'], info['mapping'])
+            for name, info in mapping.get('sliders', {}).items()
+        }
+        knob = mapping.get('knob')
+        self.knob: Optional[_PositionTable] = (
+            _PositionTable(knob['index'], knob['mapping']) if knob and knob.get('mapping') else None
+        )
+        self.bits: Dict[str, _BitTable] = {
+            module: _BitTable(module, mapping.get(module, {})) for module in BINARY_MODULES
+        }
+
+    @classmethod
+    def from_json(cls, path) -> "CompiledCalibration":
+        with Path(path).open('r') as f:
+            return cls(json.load(f))
+
+    # ------------------------ Live decode ------------------------
+    def decode_module(self, module: str, values) -> Any:
+        """Decode one module's raw `values` vector into its semantic sub-state."""
+        if module == 'sliders':
+            return {name: int(t.decode(values[t.index])) for name, t in self.sliders.items()}
+        if module == 'knob':
+            return int(self.knob.decode(values[self.knob.index])) if self.knob is not None else None
+        table = self.bits[module]
+        return table.unpack(table.pack(values))
+
+    def decode(self, latest_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Decode a `BusyBoxListener.latest_state()` snapshot; modules without data are skipped."""
+        decoded = {}
+        for module in ('sliders', 'knob', *BINARY_MODULES):
+            payload = latest_state.get(module)
+            values = payload.get('values') if isinstance(payload, dict) else None
+            if values is None:
+                continue
+            decoded[module] = self.decode_module(module, values)
+        return decoded
+
+    def matches(self, latest_state: Dict[str, Any], target: Dict[str, Any], debug: bool = False):
+        """Compare a raw snapshot against a target state.
+
+        Returns (all_correct, (slider_correctness, switches_correct, wires_correct)),
+        the same shape as `check_busybox_state`. Slider targets may be an int
+        (nearest calibrated position) or a (pos_a, pos_b) tuple (raw reading
+        between the two calibrated readings). An optional 'knob' target is
+        checked when the knob is calibrated; until a knob reading has arrived
+        the state does not match.
+        """
+        slider_values = latest_state['sliders']['values']
+        slider_correctness = []
+        for name in ('top_slider', 'bottom_slider'):
+            table = self.sliders[name]
+            raw = slider_values[table.index]
+            target_pos = target['sliders'][name]
+            if isinstance(target_pos, (tuple, list)):
+                ok = table.in_range(raw, target_pos)
+                reading = raw
+            else:
+                reading = int(table.decode(raw))
+                ok = reading == target_pos
+            if not ok and debug:
+                print(f"Slider {name.split('_')[0]} incorrect: reading {reading}, target {target_pos}")
+            slider_correctness.append(ok)
+
+        module_correct = {}
+        for module in ('switches', 'wires'):
+            table = self.bits[module]
+            word = table.pack(latest_state[module]['values'])
+            care, expected = table.compile_target(target[module])
+            module_correct[module] = (word & care) == expected
+            if not module_correct[module] and debug:
+                wrong = [n for n, b in table.bit.items() if care & b and (word ^ expected) & b]
+                print(f"{module.title()} incorrect: {wrong} (reading {table.unpack(word)})")
+
+        all_correct = all(slider_correctness) and module_correct['switches'] and module_correct['wires']
+        if 'knob' in target and self.knob is not None:
+            knob_state = latest_state.get('knob')
+            if not knob_state:
+                all_correct = False
+                if debug:
+                    print(f"Knob incorrect: no reading yet, target {target['knob']}")
+                return all_correct, (slider_correctness, module_correct['switches'], module_correct['wires'])
+            reading = int(self.knob.decode(knob_state['values'][self.knob.index]))
+            if reading != target['knob']:
+                all_correct = False
+                if debug:
+                    print(f"Knob incorrect: reading {reading}, target {target['knob']}")
+        return all_correct, (slider_correctness, module_correct['switches'], module_correct['wires'])
+
+    # ------------------------ Bulk decode ------------------------
+    def decode_arrays(self, module: str, values: np.ndarray) -> Dict[str, np.ndarray]:
+        """Decode a (T, channels) array of raw readings for one module.
+
+        Returns name -> (T,) array: positions for sliders/knob, booleans
+        (True = on / connected / pressed) for binary modules.
+        """
+        values = np.asarray(values)
+        if module == 'sliders':
+            return {name: t.decode(values[:, t.index]) for name, t in self.sliders.items()}
+        if module == 'knob':
+            return {'knob': self.knob.decode(values[:, self.knob.index])} if self.knob is not None else {}
+        table = self.bits[module]
+        words = table.pack_arrays(values)
+        return {name: (words & bit) != 0 for name, bit in table.bit.items()}
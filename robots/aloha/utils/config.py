@@ -1,12 +1,31 @@
 import os
+from pathlib import Path
 
 DATA_DIR = os.path.expanduser('~/aloha_data')
+BUSYBOX_DIGITAL_MAPPING_PATH = Path("/home/aloha/BusyBox/robots/busybox_digital_mapping.json")  # legacy fallback
+BUSYBOX_CALIBRATION_DIR = Path(os.path.expanduser('~/.busybox/calibration'))  # <box_id>.json profiles
 COLLECTION_CONFIG = {
     'dataset_dir': DATA_DIR + '/busybox_collection',
     'camera_names': ['cam_high', 'cam_left_wrist', 'cam_right_wrist'],
     'using_instrumented_busybox': True,  # requires BusyBox to publish to MQTT
+    'busybox_id': 'busybox_0',  # selects the calibration profile in BUSYBOX_CALIBRATION_DIR
     'MQTT_broker': 'localhost',
     'MQTT_port': 1883,
+    'loop_missed_tick_policy': 'skip',  # capture loop overruns: 'skip' | 'catch_up' | 'reset' (see loop_scheduler.py)
+    'loop_spin_s': 0.001,  # busy-wait this long before each deadline instead of sleeping
+    'camera_timestamps': False,  # store each frame's capture stamp in /observations/image_timestamp (see frame_grabber.py)
+    'preroll_s': 0.0,  # ticks kept from before the LEFT pedal and prepended to the episode (0 disables)
+    'preroll_jpeg_quality': None,  # JPEG-compress pre-roll frames to save memory (None keeps raw frames)
+    'postroll_s': 0.0,  # keep recording this long after the MIDDLE pedal (0 disables)
+    'pipelined_reset': False,  # write episodes in the background and shorten the between-episode reset
+    'metrics_port': None,  # serve session metrics at http://<host>:<port>/metrics (always written to metrics.prom)
+    # 'uniform' | 'adaptive' (fill under-represented task/edge cells first) | 'box_state' (tasks the box is already set up for)
+    'task_selector': 'uniform',
+    'target_demos_per_cell': 10,  # adaptive selector: successful demos wanted per (task, edge) cell
+    'joint_slider_coverage': False,  # uniform selector: cover slider moves over the joint (top, bottom) state
+    'pedal_device': None,  # /dev/input/event* of the foot pedal (None: autodetect; needs evdev, else keyboard)
+    # True: instruction window + pedal keys handled on a UI thread, off the capture loop (see data_collect_ui.py)
+    'threaded_ui': False,
 }
 
 MQTT_SUBSCRIBE_TOPICS = {
@@ -16,6 +35,8 @@ MQTT_SUBSCRIBE_TOPICS = {
     'switches': 'busybox/switches/state',
     'wires': 'busybox/wires/state',
 }
+MQTT_MODULES_TOPIC = 'busybox/status/modules'  # retained: logical module -> {port, usb_serial}
+EINK_PUBLISH_TOPIC = 'busybox/eink/cmd'  # bridge acks on busybox/eink/ack once the refresh is drawn
 
 TASKBOX_TASKS = {
     # PullWire instructions
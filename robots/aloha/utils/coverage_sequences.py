@@ -0,0 +1,297 @@
+"""Covering sequences over control-transition graphs.
+
+A TransitionGraph holds the moves we want demonstrated (required edges) and
+the moves that may be used to get between them (optional edges, e.g. the
+operator nudging the knob between two detents). `covering_circuit()` returns
+the shortest closed walk from `start` that traverses every required edge at
+least once (directed Chinese postman):
+
+- if every node has equal in- and out-degree over the required edges the walk
+  is an Eulerian circuit (each edge exactly once, Hierholzer);
+- otherwise the cheapest set of extra paths (by edge weight) that balances the
+  degrees is added first (min-cost flow between surplus and deficit nodes over
+  shortest paths), then the circuit is taken on the augmented multigraph.
+
+Graphs are immutable and hashable, so circuits are cached (`lru_cache`) and
+large plans such as the joint top x bottom slider graph (25 states, 200 moves)
+are only computed once per process. `CoverageCursor` walks a circuit and
+serialises its position so a session can resume where the last one stopped.
+
+Typical usage:
+
+    knob = TransitionGraph.complete(KNOB_EXACT_VALUES)
+    circuit = covering_circuit(knob, start=1)               # 30 edges, each once
+    sliders = TransitionGraph.product(TransitionGraph.complete(SLIDER_EXACT_VALUES),
+                                      TransitionGraph.complete(SLIDER_EXACT_VALUES))
+    cursor = CoverageCursor(sliders, start=(1, 1))
+    (top_from, bottom_from), (top_to, bottom_to) = next(cursor)
+"""
+from __future__ import annotations
+
+import hashlib
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+Node = Hashable
+Edge = Tuple[Node, Node]
+
+INF = float('inf')
+
+
+def _order(node: Node) -> str:
+    # nodes may mix ints and tuples (intermediate positions); order them by repr
+    return repr(node)
+
+
+class TransitionGraph:
+    def __init__(
+        self,
+        required: Iterable[Edge],
+        optional: Iterable[Edge] = (),
+        weights: Optional[Mapping[Edge, float]] = None,
+        default_weight: float = 1.0,
+    ) -> None:
+        weights = weights or {}
+        req = {(u, v) for u, v in required if u != v}
+        opt = {(u, v) for u, v in optional if u != v} - req
+        self.required: Tuple[Edge, ...] = tuple(sorted(req, key=_order))
+        self.optional: Tuple[Edge, ...] = tuple(sorted(opt, key=_order))
+        self.weights: Dict[Edge, float] = {e: float(weights.get(e, default_weight)) for e in req | opt}
+        self.nodes: Tuple[Node, ...] = tuple(sorted({n for e in req | opt for n in e}, key=_order))
+        self._key = (self.required, self.optional, tuple(sorted(self.weights.items(), key=_order)))
+
+    # ------------------------ Builders ------------------------
+    @classmethod
+    def complete(
+        cls,
+        positions: Iterable[Node],
+        intermediates: Iterable[Node] = (),
+        forbidden: Iterable[Edge] = (),
+        weights: Optional[Mapping[Edge, float]] = None,
+        reset_weight: float = 3.0,
+    ) -> "TransitionGraph":
+        """Every move between two `positions`, plus every move out of an intermediate position.
+
+        Intermediate positions (e.g. `KNOB_INTERMEDIATE_VALUES`) are never a
+        commanded target, so reaching one is an optional manual reset from an
+        exact position, costed at `reset_weight`.
+        """
+        positions = sorted(set(positions), key=_order)
+        intermediates = sorted(set(intermediates), key=_order)
+        forbidden = set(forbidden)
+        required = [(u, v) for u in positions + intermediates for v in positions if u != v]
+        resets = [(u, v) for u in positions for v in intermediates]
+        weights = dict(weights or {})
+        for e in resets:
+            weights.setdefault(e, reset_weight)
+        return cls(
+            [e for e in required if e not in forbidden],
+            [e for e in resets if e not in forbidden],
+            weights,
+        )
+
+    @classmethod
+    def product(cls, first: "TransitionGraph", second: "TransitionGraph") -> "TransitionGraph":
+        """Joint state (a, b) of two controls where one control moves per demo."""
+        required, optional, weights = [], [], {}
+
+        def add(edges, out, a_nodes, b_nodes, graph, moving_first):
+            for u, v in edges:
+                for other in (b_nodes if moving_first else a_nodes):
+                    e = ((u, other), (v, other)) if moving_first else ((other, u), (other, v))
+                    out.append(e)
+                    weights[e] = graph.weights[(u, v)]
+
+        add(first.required, required, first.nodes, second.nodes, first, True)
+        add(second.required, required, first.nodes, second.nodes, second, False)
+        add(first.optional, optional, first.nodes, second.nodes, first, True)
+        add(second.optional, optional, first.nodes, second.nodes, second, False)
+        return cls(required, optional, weights)
+
+    # ------------------------ Identity ------------------------
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha1(repr(self._key).encode()).hexdigest()[:12]
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, TransitionGraph) and self._key == other._key
+
+    def __repr__(self) -> str:
+        return f"TransitionGraph({len(self.nodes)} nodes, {len(self.required)} required, {len(self.optional)} optional)"
+
+
+# ------------------------ Circuits ------------------------
+@lru_cache(maxsize=64)
+def covering_circuit(graph: TransitionGraph, start: Node) -> Tuple[Edge, ...]:
+    """Shortest closed walk from `start` covering every required edge (see module docstring)."""
+    if not graph.required:
+        return ()
+    if start not in graph.nodes:
+        raise ValueError(f"start {start!r} is not a node of {graph}")
+    dist, nxt = _shortest_paths(graph)
+    for u, v in graph.required:
+        if dist[start][u] == INF or dist[v][start] == INF:
+            raise ValueError(f"required edge {(u, v)!r} cannot be part of a closed walk from {start!r}")
+
+    multi: List[Edge] = list(graph.required)
+    balance: Dict[Node, int] = defaultdict(int)  # in - out
+    for u, v in graph.required:
+        balance[u] -= 1
+        balance[v] += 1
+    surplus = {n: b for n, b in balance.items() if b > 0}   # must leave n b more times
+    deficit = {n: -b for n, b in balance.items() if b < 0}  # must enter n b more times
+    for src, dst, units in _transport(surplus, deficit, dist):
+        for _ in range(units):
+            multi.extend(_path(nxt, src, dst))
+    return tuple(_hierholzer(multi, start))
+
+
+def eulerian_circuit(positions: Iterable[int], start: int) -> List[Edge]:
+    """Every directed move between `positions`, each exactly once, as a circuit from `start`."""
+    return list(covering_circuit(TransitionGraph.complete(positions), start))
+
+
+def _shortest_paths(graph: TransitionGraph):
+    """Floyd-Warshall over required + optional edges (graphs here have tens of nodes)."""
+    nodes = graph.nodes
+    dist = {u: {v: (0.0 if u == v else INF) for v in nodes} for u in nodes}
+    nxt: Dict[Node, Dict[Node, Optional[Node]]] = {u: {v: None for v in nodes} for u in nodes}
+    for (u, v), w in graph.weights.items():
+        if w < dist[u][v]:
+            dist[u][v] = w
+            nxt[u][v] = v
+    for k in nodes:
+        dk = dist[k]
+        for i in nodes:
+            dik = dist[i][k]
+            if dik == INF:
+                continue
+            di, ni = dist[i], nxt[i]
+            for j in nodes:
+                alt = dik + dk[j]
+                if alt < di[j]:
+                    di[j] = alt
+                    ni[j] = ni[k]
+    return dist, nxt
+
+
+def _path(nxt, src: Node, dst: Node) -> List[Edge]:
+    edges = []
+    while src != dst:
+        hop = nxt[src][dst]
+        edges.append((src, hop))
+        src = hop
+    return edges
+
+
+def _transport(surplus: Dict[Node, int], deficit: Dict[Node, int], dist) -> List[Tuple[Node, Node, int]]:
+    """Min-cost assignment of surplus units to deficit units (successive shortest paths).
+
+    Uncapacitated transportation problem on the bipartite surplus x deficit
+    graph with shortest-path costs. Reverse (un-assign) edges carry negative
+    cost, hence Bellman-Ford; sizes are a few dozen nodes at most.
+    """
+    sources = sorted(surplus, key=_order)
+    sinks = sorted(deficit, key=_order)
+    n_src = len(sources)
+    cost = [[dist[s][t] for t in sinks] for s in sources]
+    supply = [surplus[s] for s in sources]
+    demand = [deficit[t] for t in sinks]
+    flow = [[0] * len(sinks) for _ in sources]
+    while any(supply):
+        # vertices 0..n_src-1 are sources, n_src.. are sinks
+        best = [0.0 if supply[i] > 0 else INF for i in range(n_src)] + [INF] * len(sinks)
+        prev = [-1] * (n_src + len(sinks))
+        for _ in range(n_src + len(sinks)):
+            changed = False
+            for i in range(n_src):
+                if best[i] == INF:
+                    continue
+                for j, c in enumerate(cost[i]):
+                    if best[i] + c < best[n_src + j]:
+                        best[n_src + j] = best[i] + c
+                        prev[n_src + j] = i
+                        changed = True
+            for j in range(len(sinks)):
+                if best[n_src + j] == INF:
+                    continue
+                for i in range(n_src):
+                    if flow[i][j] > 0 and best[n_src + j] - cost[i][j] < best[i]:
+                        best[i] = best[n_src + j] - cost[i][j]
+                        prev[i] = n_src + j
+                        changed = True
+            if not changed:
+                break
+        open_sinks = [j for j in range(len(sinks)) if demand[j] > 0 and best[n_src + j] < INF]
+        if not open_sinks:
+            raise ValueError("required edges cannot be balanced with the available moves")
+        j = min(open_sinks, key=lambda k: best[n_src + k])
+        demand[j] -= 1
+        v = n_src + j
+        while True:
+            i = prev[v]
+            flow[i][v - n_src] += 1
+            if prev[i] == -1:
+                break
+            v = prev[i]
+            flow[i][v - n_src] -= 1
+        supply[i] -= 1
+    return [
+        (sources[i], sinks[j], flow[i][j])
+        for i in range(n_src) for j in range(len(sinks)) if flow[i][j] > 0
+    ]
+
+
+def _hierholzer(edges: List[Edge], start: Node) -> List[Edge]:
+    adj: Dict[Node, List[Node]] = defaultdict(list)
+    for u, v in sorted(edges, key=_order, reverse=True):
+        adj[u].append(v)  # reverse order so .pop() yields the smallest target first
+    stack = [start]
+    vertices: List[Node] = []
+    while stack:
+        v = stack[-1]
+        if adj[v]:
+            stack.append(adj[v].pop())
+        else:
+            vertices.append(stack.pop())
+    vertices.reverse()
+    return [(vertices[i], vertices[i + 1]) for i in range(len(vertices) - 1)]
+
+
+# ------------------------ Cursor ------------------------
+def _from_json(node: Any) -> Node:
+    return tuple(_from_json(n) for n in node) if isinstance(node, list) else node
+
+
+class CoverageCursor(Iterator):
+    """Cycles through `covering_circuit(graph, start)`; `to_dict()`/`from_dict()` resume it."""
+
+    def __init__(self, graph: TransitionGraph, start: Node, index: int = 0) -> None:
+        self.graph = graph
+        self.start = start
+        self.sequence = covering_circuit(graph, start)
+        self.index = index % len(self.sequence) if self.sequence else 0
+
+    def __iter__(self) -> "CoverageCursor":
+        return self
+
+    def __next__(self) -> Edge:
+        if not self.sequence:
+            raise StopIteration
+        edge = self.sequence[self.index]
+        self.index = (self.index + 1) % len(self.sequence)
+        return edge
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'graph': self.graph.fingerprint, 'start': self.start, 'index': self.index}
+
+    @classmethod
+    def from_dict(cls, graph: TransitionGraph, state: Optional[Dict[str, Any]], start: Node) -> "CoverageCursor":
+        """Resume from `state` if it was saved for this graph, else start a new circuit at `start`."""
+        if state and state.get('graph') == graph.fingerprint:
+            return cls(graph, _from_json(state['start']), int(state.get('index', 0)))
+        return cls(graph, start)
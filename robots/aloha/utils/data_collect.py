@@ -1,6 +1,7 @@
 import os
 import time
 import json
+from concurrent.futures import Future, ThreadPoolExecutor
 import h5py
 import pyfiglet  # TODO(dean): what exactly does this do? Can we remove?
 import random
@@ -9,7 +10,7 @@ from datetime import datetime
 import cv2
 
 from robots.aloha.utils.smart_task_selector import SmartTaskSelector
-from robots.aloha.utils.config import TASKBOX_TASKS
+from robots.aloha.utils.task_registry import TASKBOX_REGISTRY
 
 from aloha.constants import IS_MOBILE
 
@@ -21,6 +22,7 @@ def create_data_dict(
         camera_names,
         busybox_states=None,
         busybox_timestamps=None,
+        image_timestamps=None,
     ):
     """
     For each timestep:
@@ -34,6 +36,9 @@ def create_data_dict(
     - qvel                  (14,)         'float64'
 
     action                  (14,)         'float64'
+
+    If `image_timestamps` (one {cam_name: capture_ts} dict per timestep, from
+    FrameGrabber / ImageRecorderFrames) is given, it is stored as /observations/image_timestamp/<cam>.
     """
 
     # Core datasets used by downstream EpisodeWriter. We extend this with optional
@@ -52,6 +57,8 @@ def create_data_dict(
         data_dict['/busybox/timestamp'] = []   # float timestamp aligned with observation
     for cam_name in camera_names:
         data_dict[f'/observations/images/{cam_name}'] = []
+        if image_timestamps is not None:
+            data_dict[f'/observations/image_timestamp/{cam_name}'] = []
 
     # len(action): max_observations, len(time_steps): max_observations + 1
     while actions:
@@ -69,6 +76,10 @@ def create_data_dict(
             data_dict[f'/observations/images/{cam_name}'].append(
                 obs.observation['images'][cam_name]
             )
+        if image_timestamps is not None:
+            stamps = image_timestamps.pop(0)
+            for cam_name in camera_names:
+                data_dict[f'/observations/image_timestamp/{cam_name}'].append(stamps[cam_name])
         if busybox_states is not None and busybox_timestamps is not None:
             # Pop front to stay consistent with action/obs consumption semantics.
             # Each state is JSON-serialized later (variable length); we keep raw dict here.
@@ -85,8 +96,9 @@ def create_data_dict(
     return data_dict
 
 class EpisodeWriter:
-    def __init__(self, dataset_path, camera_names, n = 0, compress=True):
+    def __init__(self, dataset_path, camera_names, n = 0, compress=True, metrics=None):
         #self.dataset_path = dataset_path
+        self.metrics = metrics  # SessionMetrics or None
         self.n = n
         self.camera_names = camera_names
         # self.session_folder = session_folder
@@ -104,9 +116,49 @@ class EpisodeWriter:
             os.makedirs(dataset_path)
         self.dataset_path = dataset_path
         
+        self._write_manifest({})
+        # single worker: episodes are written one at a time, in the order they were submitted
+        self._executor = None
+        self._pending = []
+
+    def write_episode_async(self, data_dict, task_instruction, task_folder, total_timesteps,
+                            recorded_fps, reject_recording) -> Future:
+        """Queue `write_episode` on a background writer thread and return immediately.
+
+        The episode index is reserved now, so names stay in recording order.
+        `data_dict` must not be touched by the caller afterwards. Call `flush()`
+        before exiting.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="EpisodeWriter")
+        n = self.n
+        self.n += 1
+        future = self._executor.submit(
+            self.write_episode, data_dict, task_instruction, task_folder, total_timesteps,
+            recorded_fps, reject_recording, n=n,
+        )
+        future.add_done_callback(self._report_failure)
+        self._pending = [f for f in self._pending if not f.done()] + [future]
+        return future
+
+    def flush(self):
+        """Block until every queued episode is on disk."""
+        for future in self._pending:
+            future.result()
+        self._pending = []
+
+    @staticmethod
+    def _report_failure(future):
+        if future.exception() is not None:
+            print(f"[EpisodeWriter] [ERROR]: writing episode failed: {future.exception()!r}")
+
+    def _write_manifest(self, manifest):
+        # atomic: task selectors and decoders may read manifest.json while episodes are written
         manifest_path = os.path.join(self.dataset_path, 'manifest.json')
-        with open(manifest_path, 'w') as f:
-            json.dump({}, f)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(tmp_path, manifest_path)
 
     def write_episode(self, data_dict,
                       task_instruction,
@@ -116,8 +168,9 @@ class EpisodeWriter:
                       reject_recording, n=None):
         if n is None:
             n = self.n
-        self.n += 1
-        
+            self.n += 1
+        t_write_start = time.time()
+
         if self.COMPRESS:
             # JPEG compression
             t0 = time.time()
@@ -163,11 +216,12 @@ class EpisodeWriter:
             'recorded_fps': recorded_fps,
             'success': not reject_recording,
         }
+        if data_dict.get('task_edge') is not None:
+            self.manifest_json[f'episode_{n}']['task_edge'] = [int(p) for p in data_dict['task_edge']]
         n += 1
         if reject_recording:
             self.total_rejects += 1
-        with open(os.path.join(self.dataset_path, 'manifest.json'), 'w') as f:
-            json.dump(self.manifest_json, f, indent=4)
+        self._write_manifest(self.manifest_json)
         # HDF5
         with h5py.File(episode_path, 'w', rdcc_nbytes=1024**2*2) as root:
             root.attrs['sim'] = False
@@ -232,6 +286,8 @@ class EpisodeWriter:
         print(f"Episode saved to {episode_path}")
 
         print(pyfiglet.figlet_format(f'{n} episodes recorded!'))
+        if self.metrics is not None:
+            self.metrics.record_save(time.time() - t_write_start)
         return True
     
 class TaskGenerator:
@@ -292,10 +348,10 @@ class TaskGenerator:
 
 
     def select_random_taskbox_task_given_type(self, task_type):
-        # Fix the iteration over TASKBOX_TASKS dictionary
-        tasks_of_type = [(task_folder, task_instruction) for task_id, (task_folder, task_instruction) in TASKBOX_TASKS.items() if task_folder == task_type]
-        print(f"Tasks of type {task_type}:", tasks_of_type)
-        return random.choice(tasks_of_type)
+        tasks_of_type = TASKBOX_REGISTRY.of_type(task_type)
+        print(f"Tasks of type {task_type}:", [spec.instruction for spec in tasks_of_type])
+        spec = random.choice(tasks_of_type)
+        return spec.task_type, spec.instruction
     
     def generate_task(self):
         np.random.seed(int(datetime.now().timestamp()))
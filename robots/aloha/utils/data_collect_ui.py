@@ -1,3 +1,22 @@
+"""Operator instruction window and foot-pedal input for the recorder.
+
+With `threaded=True` the HighGUI window is owned by a background thread, so
+the capture loop never calls `imshow`/`waitKey`:
+
+- `paint_instructions` only posts the requested state; the UI thread
+  coalesces requests and redraws at its own pace.
+- Static text for each (arm state, recording) layout is rendered once up
+  front; a repaint copies the cached layout and redraws only the instruction
+  band when its text changes.
+- Pedal keys are collected by the UI thread into a queue; `get_key` pops one
+  without blocking and returns 255 (what `cv2.waitKey(1) & 0xFF` returns with
+  no key) when the queue is empty.
+
+`drain_keys` drops keys pressed while the caller was not polling (e.g. while
+an episode was saved), in either mode.
+"""
+import queue
+import threading
 from enum import Enum, auto
 
 import cv2
@@ -18,21 +37,136 @@ MIDDLE_PEDAL = ord('b')
 RIGHT_PEDAL = ord('c')
 
 
+NO_KEY = 255  # cv2.waitKey(...) & 0xFF when no key was pressed
+CANVAS_SHAPE = (600, 1600, 3)
+ROW_STEP = 100
+INSTRUCTION_ROW = 400  # baseline of the "INSTRUCTION: ..." line
+INSTRUCTION_BAND = slice(INSTRUCTION_ROW - 50, INSTRUCTION_ROW + 50)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+WHITE = (255, 255, 255)
+YELLOW = (0, 255, 255)
+RED = (0, 0, 255)
+
+
 class DataCollectUI:
-    def __init__(self):
+    def __init__(self, threaded=False, refresh_ms=10):
         self.window_name = "Instructions"
+        self.threaded = threaded
+        self.refresh_ms = refresh_ms
+        self._keys = queue.Queue()
+        self._request = None  # latest (arm_state, task_instruction, record_state) not yet drawn
+        self._request_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # cached rendering state (UI thread only)
+        self._layouts = {}
+        self._canvas = None
+        self._drawn_layout = None
+        self._drawn_instruction = None
 
     def create_window(self):
-        img = np.zeros((600, 1600, 3), dtype=np.uint8)
-        # cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
-        cv2.imshow(self.window_name, img)
-        cv2.waitKey(1)  # show image
-    
+        if not self.threaded:
+            img = np.zeros(CANVAS_SHAPE, dtype=np.uint8)
+            # cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+            cv2.imshow(self.window_name, img)
+            cv2.waitKey(1)  # show image
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name="DataCollectUI")
+        self._thread.start()
+
     def paint_instructions(self, arm_state, task_instruction, record_state=None):
-        return paint_instructions(arm_state, task_instruction, record_state)
-    
+        if not self.threaded:
+            return paint_instructions(arm_state, task_instruction, record_state)
+        with self._request_lock:
+            self._request = (arm_state, task_instruction, record_state)
+
     def get_key(self, delay=1):
-        return cv2.waitKey(delay) & 0xFF
+        if not self.threaded:
+            return cv2.waitKey(delay) & 0xFF
+        try:
+            # delay <= 1 keeps the capture loop non-blocking
+            return self._keys.get(timeout=delay / 1000) if delay > 1 else self._keys.get_nowait()
+        except queue.Empty:
+            return NO_KEY
+
+    def drain_keys(self, max_keys=100):
+        """Discard keys pressed since the last `get_key`; returns how many were dropped."""
+        dropped = 0
+        if not self.threaded:
+            while dropped < max_keys and cv2.waitKey(1) & 0xFF != NO_KEY:
+                dropped += 1
+            return dropped
+        while True:
+            try:
+                self._keys.get_nowait()
+            except queue.Empty:
+                return dropped
+            dropped += 1
+
+    def close_window(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join(timeout=1.0)  # the UI thread destroys its own window
+            self._thread = None
+        else:
+            cv2.destroyWindow(self.window_name)
+            cv2.waitKey(1)
+
+    # ---------------------- UI thread ----------------------------
+    def _run(self):
+        self._layouts = {
+            (arm, recording): _render_layout(arm, recording)
+            for arm in ("IDLE", "ACTIVE") for recording in (False, True)
+        }
+        self._canvas = np.zeros(CANVAS_SHAPE, dtype=np.uint8)
+        cv2.imshow(self.window_name, self._canvas)
+        while not self._stop_event.is_set():
+            with self._request_lock:
+                request, self._request = self._request, None
+            if request is not None:
+                self._draw(*request)
+                cv2.imshow(self.window_name, self._canvas)
+            key = cv2.waitKey(self.refresh_ms) & 0xFF
+            if key != NO_KEY:
+                self._keys.put(key)
+        cv2.destroyWindow(self.window_name)
+        cv2.waitKey(1)
+
+    def _draw(self, arm_state, task_instruction, record_state):
+        layout = ("IDLE" if arm_state == ArmState.IDLE else "ACTIVE", record_state == RecordState.RECORDING)
+        if layout != self._drawn_layout:
+            np.copyto(self._canvas, self._layouts[layout])
+            self._drawn_layout = layout
+            self._drawn_instruction = None  # band was overwritten by the layout copy
+        if task_instruction != self._drawn_instruction:
+            band = self._canvas[INSTRUCTION_BAND]
+            band[...] = 0
+            cv2.putText(band, f"INSTRUCTION: {task_instruction}", (10, INSTRUCTION_ROW - INSTRUCTION_BAND.start),
+                        FONT, 1.0, YELLOW, 1)
+            self._drawn_instruction = task_instruction
+
+
+def _render_layout(arm_state_print, recording):
+    """Everything but the instruction line, for one (arm state, recording) combination."""
+    img = np.zeros(CANVAS_SHAPE, dtype=np.uint8)
+    row = ROW_STEP
+    if not recording:
+        cv2.putText(img, f"Press the RIGHT foot pedal to Enable/Disable Robot. Current State: {arm_state_print}", (10, row), FONT, 1.0, WHITE, 1)
+        row += ROW_STEP
+        cv2.putText(img, "Press the MIDDLE foot pedal to refresh prompt", (10, row), FONT, 1.0, WHITE, 1)
+    else:
+        cv2.putText(img, "Press the RIGHT foot pedal to Reject current recording", (10, row), FONT, 1.0, WHITE, 1)
+        row += ROW_STEP
+        cv2.putText(img, "Press the MIDDLE foot pedal to Stop Recording", (10, row), FONT, 1.0, WHITE, 1)
+    row += ROW_STEP
+    cv2.putText(img, "Press the LEFT foot pedal to Start Recording", (10, row), FONT, 1.0, WHITE, 1)
+    row = INSTRUCTION_ROW + ROW_STEP
+    cv2.putText(img, "End Teleop by slowly placing leader arms to resting place and press Ctrl + C", (10, row), FONT, 1.0, WHITE, 1)
+    if recording:
+        center = (CANVAS_SHAPE[1] - 60, 60)
+        cv2.circle(img, center, 30, RED, -1)
+        cv2.circle(img, center, 50, RED, 2)
+    return img
 
 
 # TODO(dean): make a class out of this
@@ -0,0 +1,231 @@
+"""Reproducible, stratified evaluation plans generated in batch.
+
+A plan is a list of rollouts (task + initial box state), grouped into strata
+by task type. Every stratum draws from its own `numpy.random.Generator`,
+seeded from `SeedSequence(seed, spawn_key=(crc32(stratum),))`. Adding,
+removing or resizing one stratum therefore never changes another, and the
+same seed gives the same plan in every process (control and task orders are
+sorted, not taken from set iteration).
+
+Within a stratum:
+
+- tasks are spread evenly over the stratum's instructions (shuffled repeats of
+  a permutation rather than independent draws);
+- initial values for all rollouts are drawn at once per control from
+  precomputed value arrays. The goal value is excluded by drawing from K-1
+  values and shifting past the goal's index;
+- wire values are taken from the rendered module states (with
+  `all_wires_connected` every non-goal wire is plugged in whatever was drawn),
+  so `init_values`, `busybox_module_states` and the operator instruction
+  describe the same box;
+- every initial state is checked against `BoxState` (the task's
+  preconditions must hold, see `box_state_planner.unmet_preconditions`), and
+  violating rows are redrawn.
+
+Each rollout has a stable `rollout_id` (`<TaskType>-<n>`). `shard(plan, i, n)`
+splits a plan deterministically across n operators / rigs, and `plan_id()`
+fingerprints it so results can be matched to the plan they came from.
+
+Typical usage:
+
+    plan = generate_plan(seed=37, rollouts_per_task_type=500)   # 3500 rollouts
+    mine = shard(plan, index=0, count=4)
+    save_plan('eval_plan.json', plan, seed=37)
+
+    python -m robots.aloha.utils.eval_plan_generator --seed 37 --per-type 500 --shard 0/4 --out plan.json
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from evaluation.generate_task_eval_list import BoxState
+from robots.aloha.utils.box_state_planner import unmet_preconditions
+from robots.aloha.utils.sample_init_states import (
+    BOX_DISPLACEMENT_DIRECTIONS,
+    CONTROLS2INIT_TUPLES,
+    render_init_state,
+)
+from robots.aloha.utils.task_registry import CATALOG_REGISTRY, TaskRegistry, TaskSpec
+
+DEFAULT_TASK_TYPES = ("FlipSwitch", "PushButton", "PullWire", "InsertWire", "MoveSlider", "TurnKnob", "MoveBox")
+MAX_REDRAWS = 10
+
+
+def stratum_rng(seed: int, stratum: str) -> np.random.Generator:
+    """Independent generator per stratum, stable under adding or removing other strata."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(zlib.crc32(stratum.encode()),)))
+
+
+class InitStateSampler:
+    """Vectorized initial-state draws over `CONTROLS2INIT_TUPLES`."""
+
+    def __init__(self, controls2values: Dict[str, Tuple[Any, ...]] = CONTROLS2INIT_TUPLES) -> None:
+        self.controls = list(controls2values)
+        self.values = dict(controls2values)
+        self._index = {c: {v: i for i, v in enumerate(vals)} for c, vals in self.values.items()}
+
+    def sample(self, goals: Sequence[Dict[str, Any]], rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Value indices per control for len(goals) rows; goal values are never drawn."""
+        n = len(goals)
+        draws: Dict[str, np.ndarray] = {}
+        for control in self.controls:
+            k = len(self.values[control])
+            goal_idx = np.fromiter((self._index[control].get(g.get(control), -1) for g in goals), np.int64, n)
+            excluded = goal_idx >= 0
+            idx = rng.integers(0, k - excluded, size=n)
+            draws[control] = idx + (excluded & (idx >= goal_idx))
+        draws['_all_wires_connected'] = rng.integers(0, 2, size=n).astype(bool)
+        draws['_direction'] = rng.integers(0, len(BOX_DISPLACEMENT_DIRECTIONS), size=n)
+        return draws
+
+    def row(self, draws: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+        return {c: self.values[c][int(draws[c][i])] for c in self.controls}
+
+
+def _sync_wires(init_values: Dict[str, Any], module_states: Dict[str, Any]) -> Dict[str, Any]:
+    """`init_values` with the wire values the rendered module states actually ask for."""
+    synced = dict(init_values)
+    for color, state in module_states['wires'].items():
+        synced[f'{color} wire'] = 1 if state == 'connected' else 0
+    return synced
+
+
+def _box_state(init_values: Dict[str, Any]) -> BoxState:
+    box = BoxState()
+    box.load_from_dict({
+        'sliders': {flavor: init_values[f'{flavor} slider'] for flavor in ('top', 'bottom')},
+        'switches': {flavor: init_values[f'{flavor} switch'] == 1 for flavor in ('top', 'bottom')},
+        'wires_inserted': {color: init_values[f'{color} wire'] == 1 for color in ('black', 'blue', 'red', 'white')},
+        'knob_position': init_values['knob'],
+    })
+    return box
+
+
+def _stratum(
+    task_type: str,
+    specs: Sequence[TaskSpec],
+    n: int,
+    rng: np.random.Generator,
+    sampler: InitStateSampler,
+) -> List[Dict[str, Any]]:
+    # even spread over instructions: shuffled repeats of a permutation
+    order = np.resize(rng.permutation(len(specs)), n)
+    rng.shuffle(order)
+    chosen = [specs[int(i)] for i in order]
+    goals = [spec.goal for spec in chosen]
+    draws = sampler.sample(goals, rng)
+
+    rollouts: List[Optional[Dict[str, Any]]] = [None] * n
+    pending = list(range(n))
+    for _ in range(MAX_REDRAWS):
+        retry = []
+        for i in pending:
+            spec = chosen[i]
+            init_values = sampler.row(draws, i)
+            direction = BOX_DISPLACEMENT_DIRECTIONS[int(draws['_direction'][i])]
+            instruction, module_states = render_init_state(
+                init_values, spec.goal, bool(draws['_all_wires_connected'][i]), direction
+            )
+            init_values = _sync_wires(init_values, module_states)
+            if unmet_preconditions(_box_state(init_values), spec):
+                retry.append(i)
+                continue
+            rollouts[i] = {
+                "rollout_id": f"{task_type}-{i:04d}",
+                "task_type": task_type,
+                "task_instruction": spec.instruction,
+                "initial_state": instruction,
+                "busybox_module_states": module_states,
+                "task_goal": dict(spec.goal),
+                "init_values": init_values,
+            }
+        if not retry:
+            return rollouts
+        redraw = sampler.sample([goals[i] for i in retry], rng)
+        for key, values in redraw.items():
+            draws[key][retry] = values
+        pending = retry
+    raise ValueError(f"{len(pending)} {task_type} initial states violate the task preconditions after {MAX_REDRAWS} redraws")
+
+
+def generate_plan(
+    seed: int = 37,
+    rollouts_per_task_type: int = 10,
+    task_types: Sequence[str] = DEFAULT_TASK_TYPES,
+    registry: TaskRegistry = CATALOG_REGISTRY,
+    sampler: Optional[InitStateSampler] = None,
+) -> List[Dict[str, Any]]:
+    """Stratified plan, strata in `task_types` order (see module docstring)."""
+    sampler = sampler or InitStateSampler()
+    plan: List[Dict[str, Any]] = []
+    for task_type in task_types:
+        specs = sorted(registry.of_type(task_type), key=lambda spec: spec.instruction)
+        if not specs or rollouts_per_task_type <= 0:
+            continue
+        plan += _stratum(task_type, specs, rollouts_per_task_type, stratum_rng(seed, task_type), sampler)
+    return plan
+
+
+def shard(plan: Sequence[Dict[str, Any]], index: int, count: int) -> List[Dict[str, Any]]:
+    """Every `count`-th rollout starting at `index`; shards are disjoint and keep stratum balance."""
+    if not 0 <= index < count:
+        raise ValueError(f"shard index {index} out of range for {count} shards")
+    return list(plan[index::count])
+
+
+def plan_id(plan: Sequence[Dict[str, Any]]) -> str:
+    return hashlib.sha1(json.dumps(plan, sort_keys=True, default=list).encode()).hexdigest()[:12]
+
+
+def summarize(plan: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Counts per task type and instruction plus per-control initial value histograms."""
+    values: Dict[str, Counter] = {}
+    for rollout in plan:
+        for control, value in rollout.get("init_values", {}).items():
+            values.setdefault(control, Counter())[str(value)] += 1
+    return {
+        "plan_id": plan_id(plan),
+        "rollouts": len(plan),
+        "task_types": dict(Counter(r["task_type"] for r in plan)),
+        "instructions": dict(Counter(r["task_instruction"] for r in plan)),
+        "init_values": {control: dict(sorted(counts.items())) for control, counts in values.items()},
+    }
+
+
+def save_plan(path: str, plan: Sequence[Dict[str, Any]], **meta: Any) -> None:
+    with open(path, "w") as f:
+        json.dump({"meta": {**meta, "plan_id": plan_id(plan), "total_num_rollouts": len(plan)}, "plan": list(plan)}, f, indent=4)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a stratified evaluation plan.")
+    parser.add_argument("--seed", type=int, default=37)
+    parser.add_argument("--per-type", type=int, default=10, help="rollouts per task type")
+    parser.add_argument("--task-types", nargs="+", default=list(DEFAULT_TASK_TYPES))
+    parser.add_argument("--shard", default=None, help="i/n: keep only shard i of n")
+    parser.add_argument("--out", default=None, help="write the plan JSON here")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    plan = generate_plan(args.seed, args.per_type, args.task_types)
+    shard_meta = None
+    if args.shard:
+        i, n = (int(x) for x in args.shard.split("/"))
+        plan, shard_meta = shard(plan, i, n), {"index": i, "count": n}
+    elapsed = time.perf_counter() - t0
+    summary = summarize(plan)
+    print(f"[EvalPlan] {summary['rollouts']} rollouts in {elapsed:.2f}s, plan_id={summary['plan_id']}")
+    for task_type, count in summary["task_types"].items():
+        print(f"  {task_type}: {count}")
+    if args.out:
+        save_plan(args.out, plan, seed=args.seed, rollouts_per_task_type=args.per_type,
+                  task_types=args.task_types, shard=shard_meta)
+        print(f"[EvalPlan] Wrote {args.out}")
@@ -0,0 +1,215 @@
+"""FrameGrabber: background per-camera frame acquisition for the capture loop.
+
+For sources whose read blocks until the next frame (V4L2 / OpenCV devices),
+each camera gets a thread that waits on its source and publishes the frame,
+with its capture timestamp, by swapping a front-buffer reference under a
+lock. The control loop then reads the most recent frame of every camera in
+O(1) without waiting on any camera:
+
+- each frame is a fresh array written by the camera thread only and never
+  modified after it is published, so frames handed to the loop stay valid
+  after later frames arrive (episodes keep references to them);
+- a slow or stalled camera only makes its own frame older; it never delays
+  `get_action` / `env.step`.
+
+aloha's ROS `ImageRecorder` is already non-blocking (its subscriber callbacks
+store the newest frame per camera), so it needs no threads:
+`ImageRecorderFrames` reads those attributes on demand and adds the ROS
+header stamps as capture timestamps.
+
+Both have the same read API, and `get_images()` has the same shape as
+`ImageRecorder.get_images()`, so either can be dropped in as `env.image_recorder`.
+
+Typical usage:
+
+    frames = ImageRecorderFrames(env.image_recorder, camera_names)  # or FrameGrabber.from_opencv(...)
+    frames.start()
+    env.image_recorder = frames       # env.step() reads the newest frames
+    ...
+    stamps = frames.get_timestamps()  # capture time per camera for this tick
+    frames.stop()
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# read_fn() -> (image, capture_timestamp) or None if no frame is available (yet)
+ReadFn = Callable[[], Optional[Tuple[np.ndarray, float]]]
+
+
+class _CameraThread(threading.Thread):
+    def __init__(self, name: str, read_fn: ReadFn, copy: bool, idle_s: float) -> None:
+        super().__init__(daemon=True, name=f"FrameGrabber-{name}")
+        self.cam_name = name
+        self.read_fn = read_fn
+        self.copy = copy
+        self.idle_s = idle_s
+        self.lock = threading.Lock()
+        self.front: Optional[Tuple[np.ndarray, float, int]] = None  # (image, timestamp, seq)
+        self.new_frame = threading.Event()
+        self._stop_event = threading.Event()
+        self.errors = 0
+
+    def run(self) -> None:
+        seq = 0
+        while not self._stop_event.is_set():
+            try:
+                frame = self.read_fn()
+            except Exception as e:  # a flaky camera must not kill the grabber
+                self.errors += 1
+                print(f"[FrameGrabber] {self.cam_name} read failed: {e}")
+                time.sleep(self.idle_s)
+                continue
+            if frame is None:
+                time.sleep(self.idle_s)
+                continue
+            image, ts = frame
+            back = np.array(image, copy=True) if self.copy else image
+            seq += 1
+            with self.lock:
+                self.front = (back, ts, seq)
+            self.new_frame.set()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+class FrameGrabber:
+    def __init__(
+        self,
+        read_fns: Dict[str, ReadFn],
+        copy: bool = True,
+        idle_s: float = 0.001,
+    ) -> None:
+        self.camera_names = list(read_fns)
+        self._threads = {name: _CameraThread(name, fn, copy, idle_s) for name, fn in read_fns.items()}
+
+    # ------------------------ Sources ------------------------
+    @classmethod
+    def from_opencv(cls, devices: Dict[str, Any], **kwargs) -> "FrameGrabber":
+        """Grab straight from V4L2/OpenCV devices ({cam_name: index or path})."""
+        import cv2
+
+        def make_read_fn(device) -> ReadFn:
+            cap = cv2.VideoCapture(device)
+            if not cap.isOpened():
+                raise RuntimeError(f"Could not open camera {device!r}")
+
+            def read():
+                ok, image = cap.read()  # blocks until the next frame
+                return (image, time.time()) if ok else None
+            return read
+
+        kwargs.setdefault('copy', False)  # cap.read() returns a fresh array
+        return cls({name: make_read_fn(dev) for name, dev in devices.items()}, **kwargs)
+
+    # ------------------------ Public API ------------------------
+    def start(self, wait_first_frame_s: Optional[float] = 5.0) -> None:
+        for t in self._threads.values():
+            t.start()
+        if wait_first_frame_s:
+            t_end = time.time() + wait_first_frame_s
+            for name, t in self._threads.items():
+                if not t.new_frame.wait(max(0.0, t_end - time.time())):
+                    print(f"[FrameGrabber] [WARNING]: no frame from {name} after {wait_first_frame_s}s")
+
+    def stop(self) -> None:
+        for t in self._threads.values():
+            t.stop()
+        for t in self._threads.values():
+            t.join(timeout=1.0)
+
+    def latest(self, cam_name: str) -> Optional[Tuple[np.ndarray, float, int]]:
+        """(image, capture_timestamp, sequence_number) of the newest frame, or None before the first one."""
+        t = self._threads[cam_name]
+        with t.lock:
+            return t.front
+
+    def get_images(self) -> Dict[str, Optional[np.ndarray]]:
+        """Newest frame per camera (drop-in for ImageRecorder.get_images)."""
+        images = {}
+        for name in self.camera_names:
+            front = self.latest(name)
+            images[name] = front[0] if front is not None else None
+        return images
+
+    def get_timestamps(self) -> Dict[str, float]:
+        """Capture timestamp of the frame `get_images()` currently returns, per camera (nan before the first)."""
+        stamps = {}
+        for name in self.camera_names:
+            front = self.latest(name)
+            stamps[name] = front[1] if front is not None else float('nan')
+        return stamps
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {'frames': t.front[2] if t.front is not None else 0, 'errors': t.errors}
+            for name, t in self._threads.items()
+        }
+
+
+class ImageRecorderFrames:
+    """Timestamped, thread-free view of aloha's ROS ImageRecorder (same read API as FrameGrabber).
+
+    The recorder's subscriber callbacks already store the newest frame per
+    camera as `<cam>_image`, with its ROS header stamp in `<cam>_secs` /
+    `<cam>_nsecs`; this reads them when asked. A frame is counted as new when
+    `<cam>_image` is a different object (the recorder allocates one per frame).
+    """
+
+    def __init__(self, image_recorder: Any, camera_names: Sequence[str]) -> None:
+        self.image_recorder = image_recorder
+        self.camera_names = list(camera_names)
+        self._last: Dict[str, Any] = {name: None for name in self.camera_names}
+        self._frames: Dict[str, int] = {name: 0 for name in self.camera_names}
+
+    def start(self, wait_first_frame_s: Optional[float] = 5.0) -> None:
+        if not wait_first_frame_s:
+            return
+        t_end = time.time() + wait_first_frame_s
+        while any(self.latest(name) is None for name in self.camera_names) and time.time() < t_end:
+            time.sleep(0.05)
+        for name in self.camera_names:
+            if self.latest(name) is None:
+                print(f"[FrameGrabber] [WARNING]: no frame from {name} after {wait_first_frame_s}s")
+
+    def stop(self) -> None:
+        pass
+
+    def latest(self, cam_name: str) -> Optional[Tuple[np.ndarray, float, int]]:
+        """(image, capture_timestamp, frames_seen) of the newest frame, or None before the first one."""
+        rec = self.image_recorder
+        image = getattr(rec, f'{cam_name}_image', None)
+        if image is None:
+            return None
+        if image is not self._last[cam_name]:
+            self._last[cam_name] = image
+            self._frames[cam_name] += 1
+        secs = getattr(rec, f'{cam_name}_secs', None)
+        nsecs = getattr(rec, f'{cam_name}_nsecs', None)
+        ts = secs + nsecs * 1e-9 if secs is not None and nsecs is not None else float('nan')
+        return image, ts, self._frames[cam_name]
+
+    def get_images(self) -> Dict[str, Optional[np.ndarray]]:
+        """Newest frame per camera (drop-in for ImageRecorder.get_images)."""
+        images = {}
+        for name in self.camera_names:
+            front = self.latest(name)
+            images[name] = front[0] if front is not None else None
+        return images
+
+    def get_timestamps(self) -> Dict[str, float]:
+        """ROS header stamp of the newest frame per camera (nan before the first, or without stamps)."""
+        stamps = {}
+        for name in self.camera_names:
+            front = self.latest(name)
+            stamps[name] = front[1] if front is not None else float('nan')
+        return stamps
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Frames seen per camera; frames that arrived between two reads are not counted."""
+        return {name: {'frames': self._frames[name], 'errors': 0} for name in self.camera_names}
@@ -0,0 +1,186 @@
+"""Per-tick phase timing for the capture loop, plus a per-session jitter report.
+
+TickProfiler attributes wall time inside each loop tick to named phases with a
+single `perf_counter` read per phase boundary. Ticks flagged with
+`mark_recorded()` become rows of the episode's `/timing/*` datasets:
+
+    /timing/tick_start        (T,) seconds since the first recorded tick
+    /timing/tick_dt           (T,) seconds from this tick's start to the next one
+    /timing/<phase>           (T,) seconds spent in each phase
+    /timing/other             (T,) tick time not covered by any phase
+
+`episode_arrays(pad_front=n)` prepends n NaN rows for samples that were not
+profiled (an episode's pre-roll), so the arrays stay aligned with them.
+
+TimingReport collects those arrays across a session and writes
+`timing_report.json` with percentiles and latency histograms per phase, and
+tick-to-tick jitter relative to the target period.
+
+Typical usage:
+
+    profiler = TickProfiler()
+    while running:
+        profiler.start_tick()
+        key = ui.get_key();               profiler.lap('key_poll')
+        action = get_action(...);         profiler.lap('get_action')
+        ...
+        if recording:
+            profiler.mark_recorded()
+        scheduler.wait_next();            profiler.lap('sleep')
+    data_dict.update(profiler.episode_arrays())
+    report.add_episode('episode_3', data_dict)
+    report.write()
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+PHASES = ('key_poll', 'get_action', 'env_step', 'busybox_snapshot', 'sleep')
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class TickProfiler:
+    def __init__(self, phases: Sequence[str] = PHASES, clock=time.perf_counter) -> None:
+        self.phases = tuple(phases)
+        self.clock = clock
+        self._tick_start: Optional[float] = None
+        self._t_last = 0.0
+        self._current: Dict[str, float] = {}
+        self._recorded = False
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop committed rows (the tick in progress, if any, is kept)."""
+        self._rows: List[List[float]] = []  # [tick_start, tick_total, *phases]
+
+    def start_tick(self) -> None:
+        now = self.clock()
+        self._commit(now)
+        self._tick_start = self._t_last = now
+        self._current = dict.fromkeys(self.phases, 0.0)
+        self._recorded = False
+
+    def lap(self, phase: str) -> None:
+        """Attribute the time since the previous boundary to `phase`."""
+        now = self.clock()
+        self._current[phase] += now - self._t_last
+        self._t_last = now
+
+    def mark_recorded(self) -> None:
+        """Keep this tick as a row of the episode's timing arrays."""
+        self._recorded = True
+
+    def episode_arrays(self, pad_front: int = 0) -> Dict[str, np.ndarray]:
+        """`/timing/*` arrays for the ticks recorded since `reset()`, including the current one.
+
+        `pad_front` NaN rows are prepended; `tick_start` stays relative to the
+        first profiled tick.
+        """
+        self._commit(self._t_last)
+        if not self._rows:
+            return {}
+        rows = np.asarray(self._rows, dtype=np.float64)
+        t_first = rows[0, 0]
+        if pad_front:
+            rows = np.vstack([np.full((pad_front, rows.shape[1]), np.nan), rows])
+        starts, totals, phases = rows[:, 0], rows[:, 1], rows[:, 2:]
+        arrays = {
+            '/timing/tick_start': starts - t_first,
+            '/timing/tick_dt': totals,
+        }
+        for i, phase in enumerate(self.phases):
+            arrays[f'/timing/{phase}'] = phases[:, i]
+        arrays['/timing/other'] = np.maximum(totals - phases.sum(axis=1), 0.0)
+        return arrays
+
+    def _commit(self, now: float) -> None:
+        if self._recorded and self._tick_start is not None:
+            self._rows.append([self._tick_start, now - self._tick_start, *(self._current[p] for p in self.phases)])
+            self._recorded = False
+
+
+class TimingReport:
+    def __init__(self, session_dir: str, fps: float, hist_bin_ms: float = 0.5) -> None:
+        self.path = os.path.join(session_dir, 'timing_report.json')
+        self.period = 1.0 / fps
+        self.hist_bin_ms = hist_bin_ms
+        self.episodes: Dict[str, Dict[str, np.ndarray]] = {}
+
+    def add_episode(self, name: str, data_dict: Dict[str, Any]) -> None:
+        arrays = {
+            key.rsplit('/', 1)[1]: np.asarray(value, dtype=np.float64)
+            for key, value in data_dict.items()
+            if key.startswith('/timing/') and key != '/timing/tick_start'
+        }
+        if 'tick_dt' in arrays:
+            profiled = ~np.isnan(arrays['tick_dt'])  # skip padding rows (pre-roll)
+            arrays = {n: v[profiled] for n, v in arrays.items()}
+        self.episodes[name] = arrays
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.episodes:
+            return {}
+        names = list(next(iter(self.episodes.values())).keys())
+        merged = {n: np.concatenate([ep[n] for ep in self.episodes.values() if n in ep]) for n in names}
+        # the last tick of each episode has no sleep, so jitter is taken over full ticks only
+        full_dt = np.concatenate([ep['tick_dt'][:-1] for ep in self.episodes.values()])
+        if full_dt.size == 0:
+            full_dt = merged['tick_dt']
+        jitter = full_dt - self.period
+        return {
+            'target_period_ms': self.period * 1e3,
+            'episodes': len(self.episodes),
+            'ticks': int(len(merged['tick_dt'])),
+            'late_ticks': int(np.count_nonzero(full_dt > self.period * 1.5)),
+            'frames_lost_estimate': int(np.floor(full_dt / self.period - 0.5).clip(min=0).sum()),
+            'jitter_ms': self._stats(jitter),
+            'phases_ms': {n: self._stats(v) for n, v in merged.items()},
+            'histograms_ms': {n: self._histogram(v) for n, v in merged.items()},
+            'per_episode_p99_tick_ms': {
+                name: float(np.percentile(ep['tick_dt'], 99) * 1e3) for name, ep in self.episodes.items()
+            },
+        }
+
+    def write(self) -> Optional[str]:
+        summary = self.summary()
+        if not summary:
+            return None
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(summary, f, indent=4)
+        os.replace(tmp_path, self.path)
+        return self.path
+
+    def print_summary(self) -> None:
+        summary = self.summary()
+        if not summary:
+            return
+        print(f"[TimingReport] {summary['ticks']} ticks, {summary['late_ticks']} late, "
+              f"~{summary['frames_lost_estimate']} frames lost; jitter p99 {summary['jitter_ms']['p99']:.2f} ms")
+        for phase, stats in sorted(summary['phases_ms'].items(), key=lambda kv: -kv[1]['p99']):
+            print(f"  {phase:<18} p50 {stats['p50']:7.2f}  p99 {stats['p99']:7.2f}  max {stats['max']:7.2f} ms")
+
+    # ---------------------- Internal ----------------------------
+    @staticmethod
+    def _stats(values_s: np.ndarray) -> Dict[str, float]:
+        ms = values_s * 1e3
+        stats = {f'p{p:g}': float(v) for p, v in zip(PERCENTILES, np.percentile(ms, PERCENTILES))}
+        stats.update(mean=float(ms.mean()), max=float(ms.max()))
+        return stats
+
+    def _histogram(self, values_s: np.ndarray) -> Dict[str, Any]:
+        """Fixed-width bins up to two periods; anything slower lands in `overflow`."""
+        ms = values_s * 1e3
+        upper = 2 * self.period * 1e3
+        edges = np.arange(0.0, upper + self.hist_bin_ms, self.hist_bin_ms)
+        counts, _ = np.histogram(ms, bins=edges)
+        return {
+            'bin_ms': self.hist_bin_ms,
+            'counts': counts.tolist(),
+            'overflow': int(np.count_nonzero(ms > edges[-1])),
+        }
@@ -0,0 +1,108 @@
+"""LoopScheduler: drift-free fixed-rate pacing for the capture loop.
+
+Ticks are scheduled on absolute deadlines (`start + n * period` on
+`time.perf_counter`) instead of sleeping `period - elapsed`, so a slow tick
+does not push every later tick back. The scheduler sleeps until shortly before
+the deadline and busy-waits the last `spin_s` seconds, which absorbs the
+coarse wake-up granularity of `time.sleep`.
+
+A tick that finishes after its deadline is an overrun. What happens next
+depends on `missed_tick_policy`:
+
+- 'catch_up': keep the original grid; late ticks run back-to-back until the
+  loop is on schedule again (average rate is preserved, spacing is not).
+- 'skip': drop the grid slots that were missed entirely and wait for the next
+  one (spacing stays a multiple of the period, average rate drops).
+- 'reset': re-anchor the grid at the moment the overrun was noticed.
+
+Typical usage:
+
+    scheduler = LoopScheduler(FPS, missed_tick_policy='skip')
+    scheduler.reset()
+    while running:
+        ...  # one tick of work
+        scheduler.wait_next()
+    print(scheduler.summary())
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional
+
+MISSED_TICK_POLICIES = ('catch_up', 'skip', 'reset')
+
+
+class LoopScheduler:
+    def __init__(
+        self,
+        rate_hz: float,
+        spin_s: float = 0.001,
+        missed_tick_policy: str = 'skip',
+        clock=time.perf_counter,
+    ) -> None:
+        if missed_tick_policy not in MISSED_TICK_POLICIES:
+            raise ValueError(f"missed_tick_policy must be one of {MISSED_TICK_POLICIES}, got {missed_tick_policy!r}")
+        self.period = 1.0 / rate_hz
+        self.spin_s = spin_s
+        self.missed_tick_policy = missed_tick_policy
+        self.clock = clock
+        self.reset()
+
+    # ------------------------ Public API ------------------------
+    def reset(self) -> None:
+        """Anchor the deadline grid at now and clear the statistics."""
+        self.t_start = self.clock()
+        self.next_deadline = self.t_start + self.period
+        self.ticks = 0
+        self.overruns = 0
+        self.missed_ticks = 0
+        self.max_lateness = 0.0
+        self.lateness: List[float] = []  # seconds past the deadline per overrun
+
+    def wait_next(self) -> float:
+        """Block until the next tick's deadline; returns the lateness of the tick that just ended (0 if on time)."""
+        now = self.clock()
+        self.ticks += 1
+        late = now - self.next_deadline
+        if late > 0:
+            self._handle_overrun(now, late)
+            return late
+
+        sleep_s = self.next_deadline - now - self.spin_s
+        if sleep_s > 0:
+            time.sleep(sleep_s)
+        while self.clock() < self.next_deadline:
+            pass
+        self.next_deadline += self.period
+        return 0.0
+
+    @property
+    def achieved_rate(self) -> Optional[float]:
+        elapsed = self.clock() - self.t_start
+        return self.ticks / elapsed if self.ticks and elapsed > 0 else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'target_hz': 1.0 / self.period,
+            'achieved_hz': self.achieved_rate,
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'missed_ticks': self.missed_ticks,
+            'max_lateness_ms': self.max_lateness * 1e3,
+            'mean_lateness_ms': (sum(self.lateness) / len(self.lateness) * 1e3) if self.lateness else 0.0,
+            'missed_tick_policy': self.missed_tick_policy,
+        }
+
+    # ---------------------- Internal ----------------------------
+    def _handle_overrun(self, now: float, late: float) -> None:
+        self.overruns += 1
+        self.lateness.append(late)
+        self.max_lateness = max(self.max_lateness, late)
+        missed = int(late // self.period)  # whole grid slots that passed without a tick
+        self.missed_ticks += missed
+        if self.missed_tick_policy == 'catch_up':
+            self.next_deadline += self.period
+        elif self.missed_tick_policy == 'skip':
+            self.next_deadline += (missed + 1) * self.period
+        else:  # 'reset'
+            self.next_deadline = now + self.period
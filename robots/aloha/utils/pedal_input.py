@@ -0,0 +1,153 @@
+"""PedalInput: foot-pedal events read straight from the input device.
+
+USB foot pedals enumerate as keyboards that type 'a' / 'b' / 'c'. Reading
+them through `cv2.waitKey` ties every press to window focus and to the one
+poll per capture tick. With the optional `evdev` package, PedalInput instead
+reads the pedal's /dev/input/event* node in a background thread:
+
+- every key-down is queued (nothing is lost between ticks) with the kernel's
+  event timestamp (CLOCK_REALTIME, same base as `time.time()`); `drain()`
+  discards presses made while nobody was polling (e.g. during an episode's
+  save and reset), including keys the UI window collected meanwhile, so they
+  cannot start or stop the next episode;
+- the device is grabbed so presses do not also type into other windows.
+
+If evdev is missing or no pedal is found, `poll()` falls back to
+`ui.get_key()` and stamps the key with the time it was polled.
+
+Typical usage:
+
+    pedals = PedalInput(ui, device=COLLECTION_CONFIG.get('pedal_device'))
+    pedals.start()
+    pedals.drain()                    # at the start of each episode's loop
+    while running:
+        key, key_ts = pedals.poll()   # (NO_KEY, None) if nothing pressed
+    pedals.stop()
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import evdev
+    from evdev import ecodes
+except ImportError:  # keyboard fallback only
+    evdev = None
+    ecodes = None
+
+from robots.aloha.utils.data_collect_ui import LEFT_PEDAL, MIDDLE_PEDAL, NO_KEY, RIGHT_PEDAL
+
+DEFAULT_NAME_HINTS = ('footswitch', 'foot switch', 'pedal')
+
+
+def _default_key_map() -> Dict[int, int]:
+    return {ecodes.KEY_A: LEFT_PEDAL, ecodes.KEY_B: MIDDLE_PEDAL, ecodes.KEY_C: RIGHT_PEDAL}
+
+
+def find_pedal_device(name_hints=DEFAULT_NAME_HINTS) -> Optional[str]:
+    """Path of the first input device whose name contains one of `name_hints` (case-insensitive)."""
+    if evdev is None:
+        return None
+    for path in evdev.list_devices():
+        try:
+            name = evdev.InputDevice(path).name.lower()
+        except OSError:
+            continue  # no permission / device vanished
+        if any(hint in name for hint in name_hints):
+            return path
+    return None
+
+
+class PedalInput:
+    def __init__(
+        self,
+        ui: Any,
+        device: Optional[str] = None,
+        key_map: Optional[Dict[int, int]] = None,
+        grab: bool = True,
+    ) -> None:
+        self.ui = ui
+        self.device_path = device
+        self.key_map = key_map
+        self.grab = grab
+        self.source = 'keyboard'
+        self._events: "queue.Queue[Tuple[int, float]]" = queue.Queue()
+        self._device = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    # ------------------------ Public API ------------------------
+    def start(self) -> None:
+        if evdev is None:
+            print("[PedalInput] evdev not installed; using keyboard input from the UI window.")
+            return
+        path = self.device_path or find_pedal_device()
+        if path is None:
+            print("[PedalInput] No pedal input device found; using keyboard input from the UI window.")
+            return
+        try:
+            self._device = evdev.InputDevice(path)
+            if self.grab:
+                self._device.grab()
+        except OSError as e:
+            print(f"[PedalInput] Cannot open {path} ({e}); using keyboard input from the UI window.")
+            self._device = None
+            return
+        self.key_map = self.key_map or _default_key_map()
+        self.source = f'evdev:{path}'
+        self._thread = threading.Thread(target=self._read_loop, daemon=True, name="PedalInput")
+        self._thread.start()
+        print(f"[PedalInput] Reading pedals from {path} ({self._device.name})")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._device is not None:
+            try:
+                if self.grab:
+                    self._device.ungrab()
+                self._device.close()  # unblocks read_loop
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def poll(self) -> Tuple[int, Optional[float]]:
+        """Next pedal press as (key, timestamp); (NO_KEY, None) if there is none.
+
+        The UI is still polled with evdev active so its window keeps handling
+        keyboard input (e.g. when a pedal is unplugged mid-session).
+        """
+        ui_key = self.ui.get_key()
+        if ui_key != NO_KEY:
+            self._events.put((ui_key, time.time()))
+        try:
+            return self._events.get_nowait()
+        except queue.Empty:
+            return NO_KEY, None
+
+    def drain(self) -> int:
+        """Discard queued presses, pedal and UI keys alike; returns how many were dropped."""
+        dropped = self.ui.drain_keys()
+        while True:
+            try:
+                self._events.get_nowait()
+            except queue.Empty:
+                return dropped
+            dropped += 1
+
+    # ---------------------- Internal ----------------------------
+    def _read_loop(self) -> None:
+        try:
+            for event in self._device.read_loop():
+                if self._stop_event.is_set():
+                    return
+                # value 1 = key down (0 = up, 2 = autorepeat)
+                if event.type == ecodes.EV_KEY and event.value == 1 and event.code in self.key_map:
+                    self._events.put((self.key_map[event.code], event.timestamp()))
+        except OSError as e:
+            if not self._stop_event.is_set():
+                print(f"[PedalInput] Pedal device lost ({e}); falling back to keyboard input.")
+                self.source = 'keyboard'
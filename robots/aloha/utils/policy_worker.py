@@ -0,0 +1,315 @@
+"""PolicyWorker: a long-lived policy client that loads once and serves many rollouts.
+
+`eval_rollouts.run_inference_task` used to `cd`, activate a venv and start
+`python3 main.py` for every rollout, paying interpreter start, JAX/torch
+imports and model load each time. A worker process does that once and then
+takes prompts over its stdin/stdout, one JSON object per line:
+
+    parent -> worker   {"id": 3, "op": "run", "prompt": "Push the blue button.", "timeout": 35}
+                       {"id": 4, "op": "ping"}
+                       {"id": 5, "op": "cancel"}          # stop the running rollout
+                       {"id": 6, "op": "shutdown"}
+    worker -> parent   {"event": "ready", "load_s": 41.2, "pid": 1234}
+                       {"id": 3, "event": "started"}
+                       {"id": 4, "ok": true, "busy": true}
+                       {"id": 3, "ok": true, "result": {"status": "done", ...}, "run_s": 12.8}
+                       {"id": 3, "ok": false, "error": "..."}
+
+The worker side is `serve(load_fn)`: `load_fn()` does the expensive set-up
+and returns `run(prompt, timeout, cancel) -> dict`, which should return early
+once the `cancel` Event is set. Rollouts run on a thread, so pings are
+answered mid-rollout. `serve` moves `sys.stdout` to stderr so prints from
+policy code cannot corrupt the protocol.
+
+The parent side is `PolicyWorker(command)`: it starts the command in its own
+process group, waits for `ready`, health-checks with `ping()`, and `run()`
+returns a result with the time until the worker started acting
+(`start_latency_s`). A worker that dies, misses a ping or overruns a rollout
+by `grace_s` is killed and restarted on the next call.
+
+`python -m robots.aloha.utils.policy_worker --load-time 5 --run-time 2` runs
+a fake worker (sleeps instead of loading / acting) for testing the
+evaluation loop without a robot.
+
+Typical usage:
+
+    worker = PolicyWorker("cd ~/openpi/examples/aloha_real && source .venv/bin/activate && python3 worker.py")
+    worker.start()                                   # pays the model load once
+    result = worker.run("Push the blue button.", timeout=35, stop=oracle.succeeded)
+    result['status'], result['start_latency_s']
+    worker.close()
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+RunFn = Callable[[str, float, threading.Event], Dict[str, Any]]
+
+
+# ------------------------ Worker side ------------------------
+def serve(load_fn: Callable[[], RunFn], stdin=None, stdout=None) -> None:
+    """Load once, then answer requests from stdin until shutdown or EOF."""
+    stdin = stdin or sys.stdin
+    out = stdout or sys.stdout
+    sys.stdout = sys.stderr  # policy code prints go to stderr, stdout carries the protocol
+    lock = threading.Lock()
+
+    def send(msg: Dict[str, Any]) -> None:
+        with lock:
+            out.write(json.dumps(msg) + "\n")
+            out.flush()
+
+    t0 = time.monotonic()
+    run_fn = load_fn()
+    send({"event": "ready", "load_s": time.monotonic() - t0, "pid": os.getpid()})
+
+    cancel = threading.Event()
+    running: Dict[str, Any] = {"thread": None}
+
+    def execute(req_id: Any, prompt: str, timeout: float) -> None:
+        send({"id": req_id, "event": "started"})
+        t_run = time.monotonic()
+        try:
+            result = run_fn(prompt, timeout, cancel) or {}
+            send({"id": req_id, "ok": True, "result": result, "run_s": time.monotonic() - t_run})
+        except Exception as e:  # report, keep serving
+            send({"id": req_id, "ok": False, "error": f"{type(e).__name__}: {e}"})
+
+    for line in stdin:
+        try:
+            req = json.loads(line)
+        except json.JSONDecodeError:
+            send({"ok": False, "error": f"bad request {line.strip()!r}"})
+            continue
+        op, req_id = req.get("op"), req.get("id")
+        busy = running["thread"] is not None and running["thread"].is_alive()
+        if op == "ping":
+            send({"id": req_id, "ok": True, "busy": busy})
+        elif op == "run":
+            if busy:
+                send({"id": req_id, "ok": False, "error": "busy"})
+                continue
+            cancel.clear()
+            running["thread"] = threading.Thread(
+                target=execute, args=(req_id, req["prompt"], float(req.get("timeout", 30))), daemon=True
+            )
+            running["thread"].start()
+        elif op == "cancel":
+            cancel.set()
+            send({"id": req_id, "ok": True, "busy": busy})
+        elif op == "shutdown":
+            cancel.set()
+            if busy:
+                running["thread"].join(timeout=5.0)
+            send({"id": req_id, "ok": True})
+            return
+        else:
+            send({"id": req_id, "ok": False, "error": f"unknown op {op!r}"})
+
+
+# ------------------------ Parent side ------------------------
+class WorkerError(RuntimeError):
+    pass
+
+
+class PolicyWorker:
+    def __init__(
+        self,
+        command: str,
+        name: str = "policy",
+        ready_timeout: float = 600.0,
+        ping_timeout: float = 5.0,
+        grace_s: float = 10.0,
+        kill_after_s: float = 5.0,
+    ) -> None:
+        self.command = command
+        self.name = name
+        self.ready_timeout = ready_timeout
+        self.ping_timeout = ping_timeout
+        self.grace_s = grace_s
+        self.kill_after_s = kill_after_s
+        self.load_s: Optional[float] = None
+        self.restarts = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._inbox: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._next_id = 0
+
+    # ------------- Lifecycle -------------
+    def start(self) -> float:
+        """Start the worker and wait for it to load; returns the load time in seconds."""
+        if self.alive():
+            return self.load_s or 0.0
+        if self._proc is not None:
+            self.restarts += 1
+        self._inbox = queue.Queue()
+        self._proc = subprocess.Popen(
+            self.command, shell=True, executable="/bin/bash", start_new_session=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+        )
+        threading.Thread(target=self._read, args=(self._proc, self._inbox), daemon=True).start()
+        print(f"[PolicyWorker] starting {self.name} worker (pid {self._proc.pid})")
+        msg = self._wait(lambda m: m.get("event") == "ready", self.ready_timeout)
+        if msg is None:
+            self._kill()
+            raise WorkerError(f"{self.name} worker did not become ready within {self.ready_timeout:.0f}s")
+        self.load_s = msg.get("load_s")
+        print(f"[PolicyWorker] {self.name} worker ready (loaded in {self.load_s:.1f}s)")
+        return self.load_s
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def ping(self) -> Optional[float]:
+        """Round-trip time in seconds, or None if the worker is dead or unresponsive."""
+        if not self.alive():
+            return None
+        t0 = time.monotonic()
+        req_id = self._send({"op": "ping"})
+        if self._wait(lambda m: m.get("id") == req_id, self.ping_timeout) is None:
+            return None
+        return time.monotonic() - t0
+
+    def ensure(self) -> None:
+        """(Re)start the worker unless it is alive and answers a ping."""
+        if self.alive() and self.ping() is not None:
+            return
+        if self._proc is not None:
+            print(f"[PolicyWorker] {self.name} worker unhealthy; restarting")
+            self._kill()
+        self.start()
+
+    def close(self) -> None:
+        if not self.alive():
+            return
+        req_id = self._send({"op": "shutdown"})
+        if self._wait(lambda m: m.get("id") == req_id, self.kill_after_s) is None:
+            self._kill()
+            return
+        try:
+            self._proc.wait(timeout=self.kill_after_s)
+        except subprocess.TimeoutExpired:
+            self._kill()
+
+    # ------------- Rollouts -------------
+    def run(self, prompt: str, timeout: float, stop: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Run one rollout; `stop` (e.g. an oracle's `succeeded`) cancels it early.
+
+        Returns the worker's result plus `status` ('done' / 'cancelled' /
+        'timeout' / 'error'), `start_latency_s` (request until the worker
+        started acting) and `wall_s`.
+        """
+        self.ensure()
+        t0 = time.monotonic()
+        req_id = self._send({"op": "run", "prompt": prompt, "timeout": timeout})
+        started = self._wait(lambda m: m.get("id") == req_id, self.ping_timeout)
+        if started is None or started.get("ok") is False:
+            error = started.get("error") if started else "no start ack"
+            return {"status": "error", "error": error, "start_latency_s": None, "wall_s": time.monotonic() - t0}
+        start_latency_s = time.monotonic() - t0
+
+        deadline = t0 + timeout + self.grace_s
+        cancelled = False
+        while True:
+            msg = self._wait(lambda m: m.get("id") == req_id, 0.05)
+            if msg is not None:
+                break
+            if not self.alive():
+                return {"status": "error", "error": "worker died", "start_latency_s": start_latency_s,
+                        "wall_s": time.monotonic() - t0}
+            if stop is not None and stop.is_set() and not cancelled:
+                self._send({"op": "cancel"})
+                cancelled = True
+                deadline = min(deadline, time.monotonic() + self.kill_after_s)
+            if time.monotonic() > deadline:
+                print(f"[PolicyWorker] {self.name} worker overran the rollout; killing it")
+                self._kill()
+                return {"status": "cancelled" if cancelled else "timeout", "start_latency_s": start_latency_s,
+                        "wall_s": time.monotonic() - t0}
+
+        result = dict(msg.get("result") or {})
+        if not msg.get("ok"):
+            result.update(status="error", error=msg.get("error"))
+        result.setdefault("status", "cancelled" if cancelled else "done")
+        result.update(start_latency_s=start_latency_s, wall_s=time.monotonic() - t0)
+        return result
+
+    # ------------- Helpers -------------
+    def _send(self, msg: Dict[str, Any]) -> int:
+        self._next_id += 1
+        try:
+            self._proc.stdin.write(json.dumps(dict(msg, id=self._next_id)) + "\n")
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            pass  # dead worker, noticed by alive() / the missing reply
+        return self._next_id
+
+    def _wait(self, match: Callable[[Dict[str, Any]], bool], timeout: float) -> Optional[Dict[str, Any]]:
+        """Next message matching `match` within `timeout`; other messages are dropped."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                msg = self._inbox.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if match(msg):
+                return msg
+
+    @staticmethod
+    def _read(proc: subprocess.Popen, inbox: "queue.Queue[Dict[str, Any]]") -> None:
+        for line in proc.stdout:
+            try:
+                inbox.put(json.loads(line))
+            except json.JSONDecodeError:
+                sys.stdout.write(line)  # stray output from a worker that does not redirect it
+
+    def _kill(self) -> None:
+        if self._proc is None or self._proc.poll() is not None:
+            return
+        try:
+            os.killpg(self._proc.pid, signal.SIGINT)
+            self._proc.wait(timeout=self.kill_after_s)
+        except subprocess.TimeoutExpired:
+            os.killpg(self._proc.pid, signal.SIGKILL)
+            self._proc.wait()
+        except ProcessLookupError:
+            pass
+
+
+# ------------------------ Fake worker ------------------------
+def fake_policy(load_time: float = 2.0, run_time: float = 1.0, fail_every: int = 0) -> Callable[[], RunFn]:
+    """Stand-in client: sleeps `load_time` to 'load', `run_time` per rollout; every `fail_every`-th run raises."""
+    def load() -> RunFn:
+        time.sleep(load_time)
+        count = {"runs": 0}
+
+        def run(prompt: str, timeout: float, cancel: threading.Event) -> Dict[str, Any]:
+            count["runs"] += 1
+            if fail_every and count["runs"] % fail_every == 0:
+                raise RuntimeError("fake failure")
+            print(f"[FakePolicy] acting on {prompt!r}")
+            if cancel.wait(min(run_time, timeout)):
+                return {"status": "cancelled", "prompt": prompt}
+            return {"status": "done" if run_time <= timeout else "timeout", "prompt": prompt}
+        return run
+    return load
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake policy worker speaking the PolicyWorker protocol.")
+    parser.add_argument("--load-time", type=float, default=2.0)
+    parser.add_argument("--run-time", type=float, default=1.0)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+    serve(fake_policy(args.load_time, args.run_time, args.fail_every))
@@ -0,0 +1,95 @@
+"""PrerollBuffer: ring buffer of the most recent teleop ticks before recording starts.
+
+While teleop is active but not recording, the recorder pushes every tick
+(observation, action, their timestamps, BusyBox snapshot, camera capture
+times) into a fixed-length deque. When the LEFT pedal starts a recording the
+buffered ticks are drained and prepended to the episode, so the demo can
+begin as soon as the operator moves instead of after the press.
+
+Frames can optionally be JPEG-compressed on push to bound memory
+(`jpeg_quality`); they are decoded lazily, i.e. only when the episode is
+assembled at stop time, so neither start nor push ever decodes.
+
+Typical usage:
+
+    preroll = PrerollBuffer(seconds=2.0, fps=FPS, camera_names=camera_names)
+    ...  # idle tick
+    preroll.push(observation, t1, action, t0, busybox_state, image_stamps)
+    ...  # LEFT pedal
+    for obs, obs_ts, action, action_ts, bb_state, stamps in preroll.drain():
+        ...
+"""
+from __future__ import annotations
+
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# (observation, observation_ts, action, action_ts, busybox_state, image_timestamps)
+BufferedTick = Tuple[Any, float, Any, float, Optional[Dict[str, Any]], Optional[Dict[str, float]]]
+
+
+class _JpegImages(dict):
+    """camera -> JPEG bytes, decoded to BGR on first access."""
+
+    def __getitem__(self, cam_name):
+        value = super().__getitem__(cam_name)
+        if isinstance(value, np.ndarray) and value.ndim == 1:  # still encoded
+            value = cv2.imdecode(value, cv2.IMREAD_COLOR)
+            super().__setitem__(cam_name, value)
+        return value
+
+
+class PrerollBuffer:
+    def __init__(
+        self,
+        seconds: float,
+        fps: float,
+        camera_names: Sequence[str],
+        jpeg_quality: Optional[int] = None,
+    ) -> None:
+        self.maxlen = max(0, int(round(seconds * fps)))
+        self.camera_names = list(camera_names)
+        self.jpeg_quality = jpeg_quality
+        self._ring: deque = deque(maxlen=self.maxlen)
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def push(
+        self,
+        observation: Any,
+        observation_ts: float,
+        action: Any,
+        action_ts: float,
+        busybox_state: Optional[Dict[str, Any]] = None,
+        image_timestamps: Optional[Dict[str, float]] = None,
+    ) -> None:
+        if self.maxlen == 0:
+            return
+        if self.jpeg_quality is not None:
+            observation = self._compress(observation)
+        self._ring.append((observation, observation_ts, action, action_ts, busybox_state, image_timestamps))
+
+    def drain(self) -> List[BufferedTick]:
+        """All buffered ticks, oldest first; the buffer is left empty."""
+        ticks = list(self._ring)
+        self._ring.clear()
+        return ticks
+
+    def clear(self) -> None:
+        self._ring.clear()
+
+    def _compress(self, observation: Any) -> SimpleNamespace:
+        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        obs = dict(observation.observation)
+        images = _JpegImages()
+        for cam_name in self.camera_names:
+            _, encoded = cv2.imencode('.jpg', obs['images'][cam_name], encode_param)
+            images[cam_name] = encoded
+        obs['images'] = images
+        # same `.observation[...]` access pattern as the env's TimeStep for create_data_dict
+        return SimpleNamespace(observation=obs)
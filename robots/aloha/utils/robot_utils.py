@@ -1,9 +1,12 @@
+import threading
 import time
 
+import numpy as np
 import rclpy
 
 from aloha.robot_utils import (
     get_arm_gripper_positions,
+    get_arm_joint_positions,
     move_arms,
     move_grippers,
     torque_off,
@@ -30,15 +33,11 @@ from interbotix_common_modules.common_robot.robot import (
     robot_startup,
 )
 
-def opening_ceremony(
-    leader_bot_left: InterbotixManipulatorXS,
-    leader_bot_right: InterbotixManipulatorXS,
-    follower_bot_left: InterbotixManipulatorXS,
-    follower_bot_right: InterbotixManipulatorXS,
-    gravity_compensation: bool = False,
-    initial_pose: list = None,
-):
-    """Move all 4 robots to a pose where it is easy to start demonstration."""
+# robots whose operating modes / current limit were already applied this process
+_CONFIGURED_BOTS = set()
+
+
+def _configure_motors(leader_bot_left, leader_bot_right, follower_bot_left, follower_bot_right):
     # reboot gripper motors, and set operating modes for all motors
     follower_bot_left.core.robot_reboot_motors('single', 'gripper', True)
     follower_bot_left.core.robot_set_operating_modes('group', 'arm', 'position')
@@ -56,6 +55,56 @@ def opening_ceremony(
     leader_bot_right.core.robot_set_operating_modes('single', 'gripper', 'position')
     follower_bot_left.core.robot_set_motor_registers('single', 'gripper', 'current_limit', 300)
 
+
+def _gripper_fault(bot) -> bool:
+    """True if the gripper motor reports a hardware error, or its error status cannot be read."""
+    try:
+        response = bot.core.robot_get_motor_registers('single', 'gripper', 'Hardware_Error_Status')
+        values = list(response.values)
+    except Exception as e:
+        print(f'Could not read the gripper error status ({e!r}); rebooting it')
+        return True
+    return not values or any(values)
+
+
+def _moving_time(bots, target_poses, max_time, min_time=0.3, max_joint_speed=1.5):
+    """Scale the move time to the largest joint distance (rad / max_joint_speed), capped at `max_time`."""
+    distance = max(
+        float(np.max(np.abs(np.asarray(get_arm_joint_positions(bot)) - np.asarray(pose))))
+        for bot, pose in zip(bots, target_poses)
+    )
+    return float(np.clip(distance / max_joint_speed, min_time, max_time))
+
+
+def opening_ceremony(
+    leader_bot_left: InterbotixManipulatorXS,
+    leader_bot_right: InterbotixManipulatorXS,
+    follower_bot_left: InterbotixManipulatorXS,
+    follower_bot_right: InterbotixManipulatorXS,
+    gravity_compensation: bool = False,
+    initial_pose: list = None,
+    pipelined: bool = False,
+):
+    """Move all 4 robots to a pose where it is easy to start demonstration.
+
+    With `pipelined=True` the reset is shortened for back-to-back episodes:
+    operating-mode writes are skipped for robots already configured in this
+    process and a follower gripper is only rebooted when it reports a hardware
+    error, the arm move time is scaled to how far the arms actually are from
+    the start pose, and grippers move at the same time as the arms instead of
+    after them.
+    """
+    bots = [leader_bot_left, follower_bot_left, leader_bot_right, follower_bot_right]
+    bot_keys = {id(bot) for bot in bots}
+    if not pipelined or not bot_keys <= _CONFIGURED_BOTS:
+        _configure_motors(leader_bot_left, leader_bot_right, follower_bot_left, follower_bot_right)
+        _CONFIGURED_BOTS.update(bot_keys)
+    else:
+        for side, follower_bot in (('left', follower_bot_left), ('right', follower_bot_right)):
+            if _gripper_fault(follower_bot):
+                print(f'Rebooting the {side} follower gripper (hardware error)')
+                follower_bot.core.robot_reboot_motors('single', 'gripper', True)
+
     torque_on(follower_bot_left)
     torque_on(leader_bot_left)
     torque_on(follower_bot_right)
@@ -64,25 +113,24 @@ def opening_ceremony(
     # move arms to starting position
     if initial_pose is None:
         print('Moving arms to DEFAULT starting position')
-        start_arm_qpos = START_ARM_POSE[:6]
-        move_arms(
-            [leader_bot_left, follower_bot_left, leader_bot_right, follower_bot_right],
-            [start_arm_qpos] * 4,
-            moving_time=1.5,
-        )
+        target_poses = [START_ARM_POSE[:6]] * 4
     else:
         print('Moving arms to CUSTOM starting position')
-        move_arms(
-            [leader_bot_left, follower_bot_left, leader_bot_right, follower_bot_right],
-            initial_pose,
-            moving_time=1.5,
+        target_poses = initial_pose
+    arm_moving_time = _moving_time(bots, target_poses, max_time=1.5) if pipelined else 1.5
+    gripper_targets = [LEADER_GRIPPER_JOINT_MID, FOLLOWER_GRIPPER_JOINT_CLOSE] * 2
+    if pipelined:
+        # arm and gripper joints are separate groups, so both moves can run at once
+        gripper_thread = threading.Thread(
+            target=move_grippers, args=(bots, gripper_targets), kwargs={'moving_time': 0.5}
         )
-    # move grippers to starting position
-    move_grippers(
-        [leader_bot_left, follower_bot_left, leader_bot_right, follower_bot_right],
-        [LEADER_GRIPPER_JOINT_MID, FOLLOWER_GRIPPER_JOINT_CLOSE] * 2,
-        moving_time=0.5,
-    )
+        gripper_thread.start()
+        move_arms(bots, target_poses, moving_time=arm_moving_time)
+        gripper_thread.join()
+    else:
+        move_arms(bots, target_poses, moving_time=arm_moving_time)
+        # move grippers to starting position
+        move_grippers(bots, gripper_targets, moving_time=0.5)
 
     # press gripper to start data collection
     # disable torque for only gripper joint of leader robot to allow user movement
@@ -12,7 +12,25 @@ CONTROLS2INIT_VALUES = {sfv + ' slider': SLIDER_EXACT_VALUES | SLIDER_INTERMDEDI
         'robot rotation': ROBOT_ROTATION_VALUES}
 
 
-def sample_init_state(controls2goal_values: dict, seed=None) -> tuple:
+_FLAVORED = {'slider': 0, 'switch': 1, 'wire': 2}
+
+
+def _control_order(control: str) -> tuple:
+    # flavored controls come from iterating string sets, whose order changes with PYTHONHASHSEED
+    kind = control.split()[-1]
+    return (_FLAVORED[kind], control) if kind in _FLAVORED else (len(_FLAVORED), '')
+
+
+# value sets -> sorted tuples once, in an order that is the same in every process
+CONTROLS2INIT_TUPLES = {
+    control: tuple(sorted(CONTROLS2INIT_VALUES[control], key=lambda v: (isinstance(v, tuple), v)))
+    for control in sorted(CONTROLS2INIT_VALUES, key=_control_order)
+}
+BOX_DISPLACEMENT_DIRECTIONS = ("to the left", "to the right")
+_NO_GOAL = object()
+
+
+def sample_init_state(controls2goal_values: dict, seed=None, rng: random.Random | None = None) -> tuple:
     """Sample an initial state description and return a tuple:
     (instruction_str, busybox_module_states)
 
@@ -22,8 +40,27 @@ def sample_init_state(controls2goal_values: dict, seed=None) -> tuple:
         'switches': {'top_switch': ..., 'bottom_switch': ...},
         'wires': {'black': 'connected'|'disconnected', 'blue': 'connected'|'disconnected', ...}
     }
+
+    Draws from `rng` if given, else from a private `random.Random(seed)`; the
+    global `random` state is left alone.
+    """
+    rng = rng if rng is not None else random.Random(seed)
+    wire_sampling_indicator = rng.choice([0, 1])
+    chosen = {}
+    for control, values in CONTROLS2INIT_TUPLES.items():
+        goal = controls2goal_values.get(control, _NO_GOAL)
+        chosen[control] = rng.choice([v for v in values if v != goal])
+    direction = rng.choice(BOX_DISPLACEMENT_DIRECTIONS)
+    return render_init_state(chosen, controls2goal_values, wire_sampling_indicator == 1, direction)
+
+
+def render_init_state(chosen: dict, controls2goal_values: dict, all_wires_connected: bool, displacement_direction: str) -> tuple:
+    """Operator instruction and busybox module states for already-chosen control values.
+
+    `all_wires_connected` leaves every wire that is not part of the goal
+    plugged in; `displacement_direction` is used when the box is displaced
+    sideways.
     """
-    random.seed(seed if seed is not None else None)
     instruction = ''
     # initialize module state containers
     busybox_module_states = {
@@ -31,14 +68,9 @@ def sample_init_state(controls2goal_values: dict, seed=None) -> tuple:
         'switches': {},
         'wires': {}
     }
-    wire_sampling_indicator = random.choice([0, 1])
-
-    for control, values in CONTROLS2INIT_VALUES.items():   
-        if control in controls2goal_values.keys():
-            values = values - {controls2goal_values[control]}
 
-        # NOTE: converting value sets to lists for sampling every time is very inefficient, but we can live with this, since our sets are so small...
-        chosen_val = random.choice(list(values))
+    for control in CONTROLS2INIT_TUPLES:
+        chosen_val = chosen[control]
 
         split_control_name = control.split()
         if len(split_control_name) == 2 and split_control_name[1] == 'slider':
@@ -54,7 +86,7 @@ def sample_init_state(controls2goal_values: dict, seed=None) -> tuple:
             instruction += f"- Set the {control} {f'to {chosen_val}' if type(chosen_val) == int else f'between {chosen_val[0]} and {chosen_val[1]}'}.\n"
         elif len(split_control_name) == 2 and split_control_name[1] == 'wire':
             # With p = 1/2, leave all the wires plugged in
-            if wire_sampling_indicator == 1 and control not in controls2goal_values.keys():
+            if all_wires_connected and control not in controls2goal_values.keys():
                 instruction += f"- Plug in both ends of the {control} into the terminals of that same color.\n"
                 busybox_module_states['wires'][split_control_name[0]] = 'connected'
             else:
@@ -77,8 +109,7 @@ def sample_init_state(controls2goal_values: dict, seed=None) -> tuple:
         elif control == 'box displacement_x':
             instruction += f"- Position the BusyBox ~4'' from the edge of the table nearest to Aloha, centered along that edge.\n"
             if chosen_val != 0:
-                dir = random.choice(["to the left", "to the right"])
-                instruction += f"  Then move the BusyBox roughly {abs(chosen_val)}'' {dir}.\n"
+                instruction += f"  Then move the BusyBox roughly {abs(chosen_val)}'' {displacement_direction}.\n"
                 #instruction += f"  Then move the BusyBox roughly {abs(chosen_val)}'' to the {'right' if chosen_val > 0 else 'left'}.\n"
             
             """
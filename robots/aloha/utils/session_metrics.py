@@ -0,0 +1,173 @@
+"""SessionMetrics: live throughput counters for a data-collection session.
+
+Fed by the recorder (episodes kept / rejected, achieved FPS, reset and idle
+time) and by EpisodeWriter (save time, possibly from its background thread).
+After every update the counters are written atomically in Prometheus text
+format to `<session_dir>/metrics.prom`, which node_exporter's textfile
+collector can pick up. Optionally the same text is served on
+`http://<host>:<port>/metrics`. `print_summary()` gives a one-screen terminal
+view.
+
+Typical usage:
+
+    metrics = SessionMetrics(session_dir, http_port=None)
+    episode_writer = EpisodeWriter(session_dir, camera_names, metrics=metrics)
+    ...
+    metrics.record_episode('PushButton_Red', timesteps=812, fps=49.8)
+    metrics.print_summary()
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import numpy as np
+
+PREFIX = 'busybox_collection'
+
+
+class SessionMetrics:
+    def __init__(self, session_dir: str, http_port: Optional[int] = None) -> None:
+        self.path = os.path.join(session_dir, 'metrics.prom')
+        self.t_start = time.time()
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()  # the writer thread and the recorder both export
+        self.episodes_saved = 0
+        self.episodes_rejected = 0
+        self.timesteps = 0
+        self.per_task: Dict[str, int] = {}
+        self.per_task_rejected: Dict[str, int] = {}
+        self.fps: List[float] = []
+        self.save_s: List[float] = []
+        self.reset_s: List[float] = []
+        self.idle_s: List[float] = []
+        self._server = None
+        if http_port is not None:
+            self._serve(http_port)
+
+    # ------------------------ Recording ------------------------
+    def record_episode(self, task: str, timesteps: int, fps: float) -> None:
+        with self._lock:
+            self.episodes_saved += 1
+            self.timesteps += timesteps
+            self.per_task[task] = self.per_task.get(task, 0) + 1
+            self.fps.append(fps)
+        self._export()
+
+    def record_reject(self, task: str) -> None:
+        with self._lock:
+            self.episodes_rejected += 1
+            self.per_task_rejected[task] = self.per_task_rejected.get(task, 0) + 1
+        self._export()
+
+    def record_save(self, seconds: float) -> None:
+        with self._lock:
+            self.save_s.append(seconds)
+        self._export()
+
+    def record_reset(self, seconds: float) -> None:
+        """Robot reset (opening ceremony) duration."""
+        with self._lock:
+            self.reset_s.append(seconds)
+        self._export()
+
+    def record_idle(self, seconds: float) -> None:
+        """Time from the task being shown to the LEFT pedal starting the recording."""
+        with self._lock:
+            self.idle_s.append(seconds)
+        self._export()
+
+    # ------------------------ Export ------------------------
+    @property
+    def demos_per_hour(self) -> float:
+        hours = (time.time() - self.t_start) / 3600
+        return self.episodes_saved / hours if hours > 0 else 0.0
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            attempts = self.episodes_saved + self.episodes_rejected
+            lines = [
+                f'# TYPE {PREFIX}_episodes_total counter',
+                f'{PREFIX}_episodes_total{{outcome="saved"}} {self.episodes_saved}',
+                f'{PREFIX}_episodes_total{{outcome="rejected"}} {self.episodes_rejected}',
+                f'# TYPE {PREFIX}_timesteps_total counter',
+                f'{PREFIX}_timesteps_total {self.timesteps}',
+                f'# TYPE {PREFIX}_reject_ratio gauge',
+                f'{PREFIX}_reject_ratio {self.episodes_rejected / attempts if attempts else 0.0:.4f}',
+                f'# TYPE {PREFIX}_demos_per_hour gauge',
+                f'{PREFIX}_demos_per_hour {self.demos_per_hour:.2f}',
+                f'# TYPE {PREFIX}_session_uptime_seconds gauge',
+                f'{PREFIX}_session_uptime_seconds {time.time() - self.t_start:.1f}',
+                f'# TYPE {PREFIX}_task_episodes_total counter',
+            ]
+            for outcome, counts in (('saved', self.per_task), ('rejected', self.per_task_rejected)):
+                lines += [
+                    f'{PREFIX}_task_episodes_total{{task="{task}",outcome="{outcome}"}} {count}'
+                    for task, count in sorted(counts.items())
+                ]
+            for name, values in (('recorded_fps', self.fps), ('save_seconds', self.save_s),
+                                 ('reset_seconds', self.reset_s), ('idle_seconds', self.idle_s)):
+                lines += self._summary_lines(name, values)
+        return '\n'.join(lines) + '\n'
+
+    def print_summary(self) -> None:
+        with self._lock:
+            attempts = self.episodes_saved + self.episodes_rejected
+            reject = 100.0 * self.episodes_rejected / attempts if attempts else 0.0
+            mean = lambda values: float(np.mean(values)) if values else float('nan')  # noqa: E731
+            print(
+                f"[SessionMetrics] {self.episodes_saved} saved, {self.episodes_rejected} rejected ({reject:.0f}%), "
+                f"{self.demos_per_hour:.1f} demos/h | fps {mean(self.fps):.1f} | save {mean(self.save_s):.1f}s | "
+                f"reset {mean(self.reset_s):.1f}s | idle {mean(self.idle_s):.1f}s"
+            )
+            if self.per_task:
+                print("  per task: " + ", ".join(f"{t}={c}" for t, c in sorted(self.per_task.items())))
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+    # ---------------------- Internal ----------------------------
+    @staticmethod
+    def _summary_lines(name: str, values: List[float]) -> List[str]:
+        metric = f'{PREFIX}_{name}'
+        lines = [f'# TYPE {metric} summary']
+        if values:
+            for q, v in zip((0.5, 0.9, 0.99), np.quantile(values, (0.5, 0.9, 0.99))):
+                lines.append(f'{metric}{{quantile="{q}"}} {v:.4f}')
+        lines += [f'{metric}_sum {sum(values):.4f}', f'{metric}_count {len(values)}']
+        return lines
+
+    def _export(self) -> None:
+        with self._export_lock:
+            text = self.prometheus_text()
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+
+    def _serve(self, port: int) -> None:
+        metrics = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # keep the recorder's console clean
+                pass
+
+        self._server = ThreadingHTTPServer(('0.0.0.0', port), _Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="SessionMetrics").start()
+        print(f"[SessionMetrics] Serving http://0.0.0.0:{port}/metrics")
@@ -1,8 +1,11 @@
-from collections import defaultdict
+from pathlib import Path
 from typing import List, Tuple, Dict, Iterable, Iterator, Optional
+import json
+import os
 import random
 
-from robots.aloha.utils.config import TASKBOX_TASKS
+from robots.aloha.utils.coverage_sequences import CoverageCursor, TransitionGraph, eulerian_circuit
+from robots.aloha.utils.task_registry import TASKBOX_REGISTRY, TaskRegistry
 
 class TaskSelectionHandler(Iterator):
     """Iterator that yields the next task to collect a demonstration for.
@@ -18,6 +21,9 @@ class TaskSelectionHandler(Iterator):
          - Convert each directed edge (u, v) into a concrete task instruction by selecting the matching task whose instruction
            text refers to moving/turning to position v.
          - We return tasks in the sequence order, cycling indefinitely.
+         - With `joint_sliders=True` the two sliders share one circuit over the joint (top, bottom) state, so every
+           move of one slider is demonstrated with the other slider at every position.
+    4. With `state_path`, circuit positions are saved after every move and the next session resumes from them.
 
     Yields:
         A tuple: (task_id, task_type, instruction_text)
@@ -28,64 +34,58 @@ class TaskSelectionHandler(Iterator):
         - Iterator never raises StopIteration unless all task types become empty (not expected under static config).
     """
 
-    def __init__(self, seed: Optional[int] = None):
-        self.tasks: Dict[int, Tuple[str, str]] = TASKBOX_TASKS
+    def __init__(self, seed: Optional[int] = None, joint_sliders: bool = False, state_path: Optional[str] = None):
+        self.registry: TaskRegistry = TASKBOX_REGISTRY
         self._rng = random.Random(seed)
-        # Pre-group tasks by type for efficient sampling
-        self._tasks_by_type: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
-        for tid, (t_type, instr) in self.tasks.items():
-            self._tasks_by_type[t_type].append((tid, instr))
+        self.state_path = Path(state_path) if state_path else None
+        # Tasks by type, as (task_id, instruction), for sampling
+        self._tasks_by_type: Dict[str, List[Tuple[int, str]]] = {
+            t_type: [(spec.task_id, spec.instruction) for spec in self.registry.of_type(t_type)]
+            for t_type in self.registry.types
+        }
 
         # Identify special types (base labels in TASKBOX_TASKS)
         self._slider_type = "MoveSlider"
         self._knob_type = "TurnKnob"
 
-        # Split slider tasks into top vs bottom variants based on instruction text
-        self._top_slider_tasks: List[Tuple[int, str]] = []
-        self._bottom_slider_tasks: List[Tuple[int, str]] = []
-        for tid, (ttype, instr) in self.tasks.items():
-            if ttype == self._slider_type:
-                low = instr.lower()
-                if "top" in low:
-                    self._top_slider_tasks.append((tid, instr))
-                elif "bottom" in low:
-                    self._bottom_slider_tasks.append((tid, instr))
-
-        # Prepare Eulerian sequences for knob, top slider, bottom slider
-        self._knob_sequence: List[Tuple[int, int]] = []
-        self._top_slider_sequence: List[Tuple[int, int]] = []
-        self._bottom_slider_sequence: List[Tuple[int, int]] = []
-        self._knob_index = 0
-        self._top_slider_index = 0
-        self._bottom_slider_index = 0
+        # Covering circuits for knob, top slider, bottom slider (or both sliders jointly)
+        self._knob_cursor: Optional[CoverageCursor] = None
+        self._top_slider_cursor: Optional[CoverageCursor] = None
+        self._bottom_slider_cursor: Optional[CoverageCursor] = None
+        self._joint_slider_cursor: Optional[CoverageCursor] = None
 
         # Track last emitted edges
         self._last_knob_edge: Optional[Tuple[int, int]] = None
         self._last_top_slider_edge: Optional[Tuple[int, int]] = None
         self._last_bottom_slider_edge: Optional[Tuple[int, int]] = None
 
-        # Derive position sets
-        knob_positions = self._infer_positions(self._tasks_by_type.get(self._knob_type, []))
-        top_positions = self._infer_positions(self._top_slider_tasks)
-        bottom_positions = self._infer_positions(self._bottom_slider_tasks)
-
-        if knob_positions:
-            max_knob = max(knob_positions)
-            start_knob = self._rng.randint(1, max_knob)
-            self._knob_sequence = SmartTaskSelector.generate_turn_sequence(max_knob, start_knob)
-        if top_positions:
-            max_top = max(top_positions)
-            start_top = self._rng.randint(1, max_top)
-            self._top_slider_sequence = SmartTaskSelector.generate_turn_sequence(max_top, start_top)
-        if bottom_positions:
-            max_bottom = max(bottom_positions)
-            start_bottom = self._rng.randint(1, max_bottom)
-            self._bottom_slider_sequence = SmartTaskSelector.generate_turn_sequence(max_bottom, start_bottom)
-
-        # Build position target maps
-        self._knob_tasks_by_target = self._build_position_map(self._tasks_by_type.get(self._knob_type, []))
-        self._top_slider_tasks_by_target = self._build_position_map(self._top_slider_tasks)
-        self._bottom_slider_tasks_by_target = self._build_position_map(self._bottom_slider_tasks)
+        # Position sets
+        knob_positions = self.registry.positions('knob')
+        top_positions = self.registry.positions('top slider')
+        bottom_positions = self.registry.positions('bottom slider')
+
+        saved = self._load_state()
+        if len(knob_positions) > 1:
+            self._knob_cursor = self._make_cursor(self._knob_type, TransitionGraph.complete(knob_positions), saved)
+        if joint_sliders and len(top_positions) > 1 and len(bottom_positions) > 1:
+            graph = TransitionGraph.product(
+                TransitionGraph.complete(top_positions), TransitionGraph.complete(bottom_positions)
+            )
+            self._joint_slider_cursor = self._make_cursor(f"{self._slider_type}:Joint", graph, saved)
+        else:
+            if len(top_positions) > 1:
+                self._top_slider_cursor = self._make_cursor(
+                    f"{self._slider_type}:Top", TransitionGraph.complete(top_positions), saved
+                )
+            if len(bottom_positions) > 1:
+                self._bottom_slider_cursor = self._make_cursor(
+                    f"{self._slider_type}:Bottom", TransitionGraph.complete(bottom_positions), saved
+                )
+
+        # Position target maps
+        self._knob_tasks_by_target = self._position_map('knob', knob_positions)
+        self._top_slider_tasks_by_target = self._position_map('top slider', top_positions)
+        self._bottom_slider_tasks_by_target = self._position_map('bottom slider', bottom_positions)
 
         # Cached list of task types for sampling (only those with tasks)
         self._task_types: List[str] = list(self._tasks_by_type.keys())
@@ -100,19 +100,21 @@ class TaskSelectionHandler(Iterator):
         # Sample a task type uniformly
         task_type = self._rng.choice(self._task_types)
         if task_type == self._slider_type:
+            if self._joint_slider_cursor is not None:
+                return self._next_joint_slider()
             # Decide top vs bottom 50/50 (fallbacks if one list empty)
             choose_top = True
-            if self._top_slider_sequence and self._bottom_slider_sequence:
+            if self._top_slider_cursor and self._bottom_slider_cursor:
                 choose_top = bool(self._rng.getrandbits(1))
-            elif self._bottom_slider_sequence and not self._top_slider_sequence:
+            elif self._bottom_slider_cursor and not self._top_slider_cursor:
                 choose_top = False
             # Select appropriate sequence/mapping
-            if choose_top and self._top_slider_sequence:
+            if choose_top and self._top_slider_cursor:
                 return self._next_slider_variant(True)
-            if (not choose_top) and self._bottom_slider_sequence:
+            if (not choose_top) and self._bottom_slider_cursor:
                 return self._next_slider_variant(False)
             # If neither sequence exists (should not happen), fall through to uniform sampling
-        if task_type == self._knob_type and self._knob_sequence:
+        if task_type == self._knob_type and self._knob_cursor:
             return self._next_knob()
         # Regular type: uniform sample among tasks for that type
         tid, instr = self._rng.choice(self._tasks_by_type[task_type])
@@ -120,9 +122,8 @@ class TaskSelectionHandler(Iterator):
 
     # ------------- Helpers -------------
     def _next_knob(self):
-        idx = self._knob_index
-        self._knob_index = (self._knob_index + 1) % len(self._knob_sequence)
-        _from, to = self._knob_sequence[idx]
+        _from, to = next(self._knob_cursor)
+        self.save_state()
         self._last_knob_edge = (_from, to)
         candidates = self._knob_tasks_by_target.get(to, [])
         if not candidates:
@@ -133,18 +134,26 @@ class TaskSelectionHandler(Iterator):
 
     def _next_slider_variant(self, top: bool):
         if top:
-            seq = self._top_slider_sequence
-            idx = self._top_slider_index
-            self._top_slider_index = (self._top_slider_index + 1) % len(seq)
-            _from, to = seq[idx]
+            _from, to = next(self._top_slider_cursor)
+        else:
+            _from, to = next(self._bottom_slider_cursor)
+        self.save_state()
+        return self._slider_task(top, (_from, to))
+
+    def _next_joint_slider(self):
+        (top_from, bottom_from), (top_to, bottom_to) = next(self._joint_slider_cursor)
+        self.save_state()
+        if top_from != top_to:
+            return self._slider_task(True, (top_from, top_to))
+        return self._slider_task(False, (bottom_from, bottom_to))
+
+    def _slider_task(self, top: bool, edge: Tuple[int, int]):
+        _from, to = edge
+        if top:
             self._last_top_slider_edge = (_from, to)
             mapping = self._top_slider_tasks_by_target
             variant_label = "Top"
         else:
-            seq = self._bottom_slider_sequence
-            idx = self._bottom_slider_index
-            self._bottom_slider_index = (self._bottom_slider_index + 1) % len(seq)
-            _from, to = seq[idx]
             self._last_bottom_slider_edge = (_from, to)
             mapping = self._bottom_slider_tasks_by_target
             variant_label = "Bottom"
@@ -164,35 +173,48 @@ class TaskSelectionHandler(Iterator):
             f"{self._slider_type}:Bottom": self._last_bottom_slider_edge,
         }
 
-    def _infer_positions(self, tasks: List[Tuple[int, str]]) -> List[int]:
-        positions = set()
-        for _, instr in tasks:
-            # Expect patterns like "position X." or "to position X." where X is int
-            parts = instr.split()
-            for i, p in enumerate(parts):
-                if p.lower() == "position" and i + 1 < len(parts):
-                    num = ''.join(ch for ch in parts[i + 1] if ch.isdigit())
-                    if num:
-                        positions.add(int(num))
-        return sorted(positions)
-
-    def _build_position_map(self, tasks: List[Tuple[int, str]]) -> Dict[int, List[Tuple[int, str]]]:
-        mapping: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
-        for tid, instr in tasks:
-            parts = instr.split()
-            for i, p in enumerate(parts):
-                if p.lower() == "position" and i + 1 < len(parts):
-                    num = ''.join(ch for ch in parts[i + 1] if ch.isdigit())
-                    if num:
-                        mapping[int(num)].append((tid, instr))
-        return mapping
-
+    def record_outcome(self, saved: bool) -> None:
+        """Selection here does not depend on outcomes (see AdaptiveTaskSelector)."""
+
+    def save_state(self) -> None:
+        """Persist circuit positions so the next session resumes them (no-op without `state_path`)."""
+        if self.state_path is None:
+            return
+        cursors = {
+            self._knob_type: self._knob_cursor,
+            f"{self._slider_type}:Top": self._top_slider_cursor,
+            f"{self._slider_type}:Bottom": self._bottom_slider_cursor,
+            f"{self._slider_type}:Joint": self._joint_slider_cursor,
+        }
+        state = {name: cursor.to_dict() for name, cursor in cursors.items() if cursor is not None}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.json.tmp')
+        with tmp_path.open('w') as f:
+            json.dump(state, f, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+    def _load_state(self) -> dict:
+        if self.state_path is None or not self.state_path.exists():
+            return {}
+        with self.state_path.open('r') as f:
+            return json.load(f)
+
+    def _make_cursor(self, name: str, graph: TransitionGraph, saved: dict) -> CoverageCursor:
+        """Resume the saved circuit for `name` if it matches `graph`, else start one at a random node."""
+        return CoverageCursor.from_dict(graph, saved.get(name), self._rng.choice(graph.nodes))
+
+    def _position_map(self, control: str, positions: Iterable[int]) -> Dict[int, List[Tuple[int, str]]]:
+        return {
+            pos: [(spec.task_id, spec.instruction) for spec in self.registry.for_target(control, pos)]
+            for pos in positions
+        }
 
 
 class SmartTaskSelector:
     """
     A class that generates optimal task selection sequences using Eulerian circuits
-    on complete digraphs.
+    on complete digraphs. General transition graphs (joint controls, intermediate
+    positions, weighted / forbidden moves) live in coverage_sequences.py.
     """
     
     @staticmethod
@@ -200,27 +222,9 @@ class SmartTaskSelector:
         """
         Return an Eulerian circuit on the complete digraph with vertices 1..n,
         starting at `start`.  Each directed edge (u, v) with u ≠ v appears exactly once.
+        Circuits are computed once per (n, start) and cached (see coverage_sequences.py).
         """
-        # Build adjacency lists (store in reverse order so we can .pop() in O(1)).
-        adj = defaultdict(list)
-        for u in range(1, n + 1):
-            adj[u] = [v for v in range(1, n + 1) if v != u][::-1]
-
-        stack = [start]
-        circuit_vertices = []
-
-        # Iterative Hierholzer
-        while stack:
-            v = stack[-1]
-            if adj[v]:                 # still have unused outgoing edges
-                stack.append(adj[v].pop())
-            else:                      # dead end – add vertex to circuit
-                circuit_vertices.append(stack.pop())
-
-        circuit_vertices.reverse()     # forward order
-        # Convert vertex list to edge list
-        return [(circuit_vertices[i], circuit_vertices[i + 1])
-                for i in range(len(circuit_vertices) - 1)]
+        return eulerian_circuit(range(1, n + 1), start)
     
     @classmethod
     def generate_turn_sequence(self, max_number: int = 6, start_position: int = 1) -> List[Tuple[int, int]]:
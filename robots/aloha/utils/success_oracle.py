@@ -0,0 +1,256 @@
+"""TaskSuccessOracle: automatic rollout success detection from live BusyBox state.
+
+Replaces the "Was the task successful? (y/n)" prompt for tasks whose outcome is
+observable on the instrumented box:
+
+- State tasks (sliders, switches, wires): the full box must match the expected
+  post-task state (as checked by `check_busybox_state`) continuously for
+  `settle_s` seconds.
+- Button tasks: the target button must appear pressed in the listener's event
+  history at any point after the rollout started (presses are too short to be
+  caught by polling the latest snapshot).
+
+Typical usage:
+
+    oracle = TaskSuccessOracle(listener, target_state=expected, button=None)
+    oracle.start()
+    returncode, stopped_early = run_client_until_success(shell_cmd, oracle, early_stop=True)
+    oracle.stop()
+    if oracle.verifiable:
+        success, t = oracle.succeeded.is_set(), oracle.time_to_success
+
+Notes:
+- `target_state` uses the `check_busybox_state` format
+  ({'sliders': {'top_slider': ..}, 'switches': {'top_switch': 'on'}, 'wires': {'red': 'connected'}}).
+  Use `target_from_box_state` / `target_from_task_goal` to build it.
+- Decoding uses `calibration` (a `CompiledCalibration`), by default the box
+  profile `check_busybox_state` loads; pass e.g. `CompiledCalibration(SIM_MAPPING)`
+  to use the oracle without the real box.
+- Knob targets are only checked when the calibration profile includes the
+  knob; box-pose tasks are never verifiable. A live state that cannot be
+  decoded against the target (uncalibrated channel, malformed payload) sets
+  `error` and makes the rollout unverifiable. Callers should fall back to
+  asking the operator when `verifiable` is False (also after `stop()`).
+"""
+from __future__ import annotations
+
+import copy
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from robots.aloha.utils.busybox_listener import BusyBoxListener
+from robots.aloha.utils.compiled_calibration import CompiledCalibration
+
+STATE_MODULES = ('sliders', 'switches', 'wires')  # modules every state target is checked against
+
+
+def default_calibration() -> CompiledCalibration:
+    """The box's calibration, loaded by `check_busybox_state` on first use."""
+    from robots.aloha.utils.check_busybox_state import BUSYBOX_CALIBRATION
+    return BUSYBOX_CALIBRATION
+
+
+def target_from_box_state(
+    box_state: Dict[str, Any], calibration: Optional[CompiledCalibration] = None
+) -> Dict[str, Any]:
+    """Convert a `BoxState.to_dict()` snapshot into a `check_busybox_state` target.
+
+    The knob target is only included when `calibration` has the knob.
+    """
+    calibration = calibration or default_calibration()
+    target = {
+        'sliders': {
+            'top_slider': box_state['sliders']['top'],
+            'bottom_slider': box_state['sliders']['bottom'],
+        },
+        'switches': {
+            'top_switch': 'on' if box_state['switches']['top'] else 'off',
+            'bottom_switch': 'on' if box_state['switches']['bottom'] else 'off',
+        },
+        'wires': {
+            color: 'connected' if inserted else 'disconnected'
+            for color, inserted in box_state['wires_inserted'].items()
+        },
+    }
+    if calibration.knob is not None:
+        target['knob'] = box_state['knob_position']
+    return target
+
+
+def target_from_task_goal(
+    init_module_states: Dict[str, Any],
+    task_goal: Dict[str, Any],
+    calibration: Optional[CompiledCalibration] = None,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Apply a `task_generator` goal (e.g. {'top slider': 3}) to `sample_init_state` module states.
+
+    Returns (target_state, button_color). `target_state` is None when the goal
+    cannot be verified from the box (uncalibrated knob, box pose, empty goal);
+    `button_color` is set for push-button goals.
+    """
+    calibration = calibration or default_calibration()
+    target = copy.deepcopy(init_module_states)
+    button = None
+    for control, value in task_goal.items():
+        if control == 'knob' and calibration.knob is not None:
+            target['knob'] = value
+            continue
+        parts = control.split()
+        if len(parts) != 2:
+            return None, None
+        flavor, kind = parts
+        if kind == 'slider':
+            target['sliders'][f'{flavor}_slider'] = value
+        elif kind == 'switch':
+            target['switches'][f'{flavor}_switch'] = 'on' if value == 1 else 'off'
+        elif kind == 'wire':
+            target['wires'][flavor] = 'connected' if value == 1 else 'disconnected'
+        elif kind == 'button':
+            button = flavor
+        else:
+            return None, None
+    if button is not None:
+        return None, button
+    if not task_goal:
+        return None, None
+    return target, None
+
+
+class TaskSuccessOracle:
+    def __init__(
+        self,
+        listener: BusyBoxListener,
+        target_state: Optional[Dict[str, Any]] = None,
+        button: Optional[str] = None,
+        settle_s: float = 0.3,
+        poll_dt: float = 0.02,
+        calibration: Optional[CompiledCalibration] = None,
+    ) -> None:
+        self.listener = listener
+        self.calibration = calibration or default_calibration()
+        self.target_state = target_state
+        self.button = button
+        self.settle_s = settle_s
+        self.poll_dt = poll_dt
+        self.succeeded = threading.Event()
+        self.time_to_success: Optional[float] = None
+        self.t_start: Optional[float] = None
+        self.error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._buttons = self.calibration.bits['buttons']
+        self._button_bit = self._buttons.bit.get(button) if button is not None else None
+
+    @property
+    def verifiable(self) -> bool:
+        """True if this oracle can decide the outcome without a human."""
+        if self.error is not None:
+            return False
+        if self.button is not None:
+            return self._button_bit is not None
+        return self.target_state is not None
+
+    # ------------------------ Public API ------------------------
+    def start(self) -> None:
+        """Mark the rollout start and begin polling in the background."""
+        self.t_start = time.time()
+        self.succeeded.clear()
+        self.time_to_success = None
+        self.error = None
+        self._stop.clear()
+        if not self.verifiable:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.succeeded.wait(timeout)
+
+    # ---------------------- Internal ----------------------------
+    def _run(self) -> None:
+        satisfied_since = None
+        while not self._stop.is_set():
+            now = time.time()
+            if self.button is not None:
+                hit_ts = self._button_press_ts()
+                if hit_ts is not None:
+                    self._mark_success(hit_ts)
+                    return
+            elif self._state_matches():
+                if satisfied_since is None:
+                    satisfied_since = now
+                if now - satisfied_since >= self.settle_s:
+                    self._mark_success(satisfied_since)
+                    return
+            elif self.error is not None:
+                return
+            else:
+                satisfied_since = None
+            time.sleep(self.poll_dt)
+
+    def _mark_success(self, ts: float) -> None:
+        self.time_to_success = max(0.0, ts - self.t_start)
+        self.succeeded.set()
+
+    def _state_matches(self) -> bool:
+        latest_state = self.listener.latest_state()
+        if any(latest_state.get(module) is None for module in STATE_MODULES):
+            return False  # a module has not reported yet
+        try:
+            is_correct, _ = self.calibration.matches(latest_state, self.target_state)
+        except (KeyError, TypeError, IndexError) as e:
+            self.error = f"cannot check the box state against the target ({type(e).__name__}: {e})"
+            print(f"[TaskSuccessOracle] WARNING: {self.error}; the operator has to judge this rollout.")
+            return False
+        return is_correct
+
+    def _button_press_ts(self) -> Optional[float]:
+        for ts, payload in self.listener.history_since('buttons', self.t_start):
+            values = payload.get('values') if isinstance(payload, dict) else None
+            if values and self._buttons.pack(values) & self._button_bit:
+                return ts
+        return None
+
+
+def run_client_until_success(
+    shell_cmd: str,
+    oracle: Optional[TaskSuccessOracle],
+    early_stop: bool = True,
+    poll_dt: float = 0.05,
+) -> Tuple[int, bool]:
+    """Run a policy client shell command, optionally interrupting it once the oracle reports success.
+
+    The client is started in its own process group and sent SIGINT (then SIGKILL
+    after 5s) so it can shut down its robot connection cleanly.
+    Returns (returncode, stopped_early).
+    """
+    proc = subprocess.Popen(shell_cmd, shell=True, executable='/bin/bash', start_new_session=True)
+    stopped_early = False
+    try:
+        while proc.poll() is None:
+            if early_stop and oracle is not None and oracle.succeeded.is_set():
+                print(f"[TaskSuccessOracle] success after {oracle.time_to_success:.1f}s; stopping client early.")
+                stopped_early = True
+                os.killpg(proc.pid, signal.SIGINT)
+                try:
+                    proc.wait(timeout=5.0)
+                except subprocess.TimeoutExpired:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                break
+            time.sleep(poll_dt)
+    except KeyboardInterrupt:
+        os.killpg(proc.pid, signal.SIGINT)
+        proc.wait()
+        raise
+    return proc.wait(), stopped_early
@@ -116,20 +116,21 @@ def sample_with_resample(population, k):
     else:
         return random.choices(population, k=k)
 
-sampled_tasks = {
-    "flip_switches": sample_with_resample(flip_switches, 10),
-    "push_button": sample_with_resample(push_button, 10),
-    "pull_wire": sample_with_resample(pull_wire, 10),
-    "insert_wire": sample_with_resample(insert_wire, 10),
-    "move_slider": sample_with_resample(move_slider, 10),
-    "turn_knob": sample_with_resample(turn_knob, 10),
-}
-
-# create a fully shuffled order of all sampled tasks, one entry per task
-sample_order = [[category, task] for category, tasks in sampled_tasks.items() for task in tasks]
-random.shuffle(sample_order)
-sampled_tasks["eval_order"] = sample_order
-
-with open("/home/aloha/dean/sampled_tasks.json", "w") as f:
-    json.dump(sampled_tasks, f, indent=4)
 
+if __name__ == "__main__":
+    sampled_tasks = {
+        "flip_switches": sample_with_resample(flip_switches, 10),
+        "push_button": sample_with_resample(push_button, 10),
+        "pull_wire": sample_with_resample(pull_wire, 10),
+        "insert_wire": sample_with_resample(insert_wire, 10),
+        "move_slider": sample_with_resample(move_slider, 10),
+        "turn_knob": sample_with_resample(turn_knob, 10),
+    }
+
+    # create a fully shuffled order of all sampled tasks, one entry per task
+    sample_order = [[category, task] for category, tasks in sampled_tasks.items() for task in tasks]
+    random.shuffle(sample_order)
+    sampled_tasks["eval_order"] = sample_order
+
+    with open("/home/aloha/dean/sampled_tasks.json", "w") as f:
+        json.dump(sampled_tasks, f, indent=4)
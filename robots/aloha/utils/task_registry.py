@@ -0,0 +1,204 @@
+"""TaskRegistry: structured task specs, parsed once, with O(1) lookups.
+
+Every selector used to re-derive task structure from instruction text (split
+on "position", search for "top"/"bottom", filter TASKBOX_TASKS per call). The
+registry parses each instruction once, against patterns built from the flavor
+and value sets in `control_values.py`, into a TaskSpec:
+
+- `control`: the box control the task acts on, named as in task_generator's
+  `task_goal` keys ('top slider', 'knob', 'red wire', 'blue button',
+  'top switch'), None for tasks that do not change the box (MoveBox, ...);
+- `target`: the value the control ends at (slider / knob position, 1 for
+  inserted / on / pressed, 0 for pulled / off);
+- `gripper`: 'left' / 'right' if the instruction names one;
+- `goal`: {control: target}, the task_generator `task_goal` format.
+
+Indexes by id, instruction, type and (control, target) are plain dicts.
+
+`TASKBOX_REGISTRY` covers the collection tasks in `TASKBOX_TASKS`;
+`CATALOG_REGISTRY` covers task_generator's full catalog (gripper variants,
+MoveBox) used by the evaluation plans.
+
+Typical usage:
+
+    spec = TASKBOX_REGISTRY.get(task_id)
+    spec.control, spec.target, spec.move_control   # 'top slider', 3, 'MoveSlider:Top'
+    TASKBOX_REGISTRY.positions('knob')             # (1, 2, 3, 4, 5, 6)
+    TASKBOX_REGISTRY.for_target('knob', 4)         # (TaskSpec(24, TurnKnob, ...),)
+"""
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from robots.aloha.utils.config import TASKBOX_TASKS
+from robots.aloha.utils.control_values import (
+    BUTTON_FLAVOR_VALUES,
+    GRIPPER_FLAVOR_VALUES,
+    KNOB_EXACT_VALUES,
+    SLIDER_EXACT_VALUES,
+    SLIDER_FLAVOR_VALUES,
+    SWITCH_FLAVOR_VALUES,
+    WIRE_FLAVOR_VALUES,
+)
+from robots.aloha.utils import task_generator
+
+
+def _alt(values) -> str:
+    return '|'.join(sorted(values))
+
+
+_GRIPPER = rf"(?: with the (?P<gripper>{_alt(GRIPPER_FLAVOR_VALUES)}) gripper)?"
+
+# task type -> pattern over the lower-cased instruction
+_PATTERNS = {
+    'FlipSwitch': re.compile(rf"flip the (?P<flavor>{_alt(SWITCH_FLAVOR_VALUES)}) switch (?P<value>on|off){_GRIPPER}"),
+    'PushButton': re.compile(rf"push the (?P<flavor>{_alt(BUTTON_FLAVOR_VALUES)}) button{_GRIPPER}"),
+    'PullWire': re.compile(rf"pull the (?P<flavor>{_alt(WIRE_FLAVOR_VALUES)}) wire"),
+    'InsertWire': re.compile(rf"insert the (?P<flavor>{_alt(WIRE_FLAVOR_VALUES)}) wire"),
+    'MoveSlider': re.compile(rf"move the (?P<flavor>{_alt(SLIDER_FLAVOR_VALUES)}) slider to position (?P<value>\d+)"),
+    'TurnKnob': re.compile(r"turn the knob to position (?P<value>\d+)"),
+}
+
+# task type -> BoxState task category (evaluation/generate_task_eval_list.py)
+BOX_STATE_CATEGORIES = {
+    'PullWire': 'pull_wire',
+    'InsertWire': 'insert_wire',
+    'PushButton': 'push_button',
+    'MoveSlider': 'move_slider',
+    'TurnKnob': 'turn_knob',
+    'FlipSwitch': 'flip_switch',
+    'MoveBox': 'move_bb',
+}
+
+
+class TaskSpec:
+    __slots__ = ('task_id', 'task_type', 'instruction', 'flavor', 'control', 'target', 'gripper', 'goal')
+
+    def __init__(self, task_id: int, task_type: str, instruction: str) -> None:
+        self.task_id = task_id
+        self.task_type = task_type
+        self.instruction = instruction
+        self.flavor: Optional[str] = None  # 'top' / 'red' / ...
+        self.control: Optional[str] = None
+        self.target: Optional[int] = None
+        self.gripper: Optional[str] = None
+        pattern = _PATTERNS.get(task_type)
+        if pattern is not None:
+            match = pattern.search(instruction.lower())
+            if match is None:
+                raise ValueError(f"Cannot parse {task_type} instruction {instruction!r}")
+            self._fill(match.groupdict())
+        self.goal: Dict[str, int] = {self.control: self.target} if self.control is not None else {}
+
+    def _fill(self, groups: Dict[str, Optional[str]]) -> None:
+        flavor, value = groups.get('flavor'), groups.get('value')
+        self.flavor = flavor
+        self.gripper = groups.get('gripper')
+        if self.task_type == 'FlipSwitch':
+            self.control, self.target = f"{flavor} switch", int(value == 'on')
+        elif self.task_type == 'PushButton':
+            self.control, self.target = f"{flavor} button", 1
+        elif self.task_type in ('PullWire', 'InsertWire'):
+            self.control, self.target = f"{flavor} wire", int(self.task_type == 'InsertWire')
+        elif self.task_type == 'MoveSlider':
+            self.control, self.target = f"{flavor} slider", int(value)
+            if self.target not in SLIDER_EXACT_VALUES:
+                raise ValueError(f"Slider position {self.target} not in {sorted(SLIDER_EXACT_VALUES)}")
+        elif self.task_type == 'TurnKnob':
+            self.control, self.target = 'knob', int(value)
+            if self.target not in KNOB_EXACT_VALUES:
+                raise ValueError(f"Knob position {self.target} not in {sorted(KNOB_EXACT_VALUES)}")
+
+    @property
+    def move_control(self) -> Optional[str]:
+        """Edge-tracking label for position moves ('TurnKnob', 'MoveSlider:Top', ...), else None."""
+        if self.task_type == 'TurnKnob':
+            return 'TurnKnob'
+        if self.task_type == 'MoveSlider':
+            return f"MoveSlider:{self.flavor.capitalize()}"
+        return None
+
+    @property
+    def category(self) -> Optional[str]:
+        return BOX_STATE_CATEGORIES.get(self.task_type)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"TaskSpec({self.task_id}, {self.task_type}, {self.instruction!r})"
+
+
+class TaskRegistry:
+    def __init__(self, specs: Iterable[TaskSpec]) -> None:
+        self._specs: Tuple[TaskSpec, ...] = tuple(specs)
+        self._by_id: Dict[int, TaskSpec] = {}
+        self._by_instruction: Dict[str, TaskSpec] = {}
+        by_type: Dict[str, List[TaskSpec]] = defaultdict(list)
+        by_target: Dict[Tuple[str, int], List[TaskSpec]] = defaultdict(list)
+        positions: Dict[str, set] = defaultdict(set)
+        for spec in self._specs:
+            self._by_id[spec.task_id] = spec
+            self._by_instruction[spec.instruction] = spec
+            by_type[spec.task_type].append(spec)
+            if spec.control is not None:
+                by_target[(spec.control, spec.target)].append(spec)
+                if spec.task_type in ('MoveSlider', 'TurnKnob'):
+                    positions[spec.control].add(spec.target)
+        self._by_type = {t: tuple(specs) for t, specs in by_type.items()}
+        self._by_target = {k: tuple(specs) for k, specs in by_target.items()}
+        self._positions = {c: tuple(sorted(p)) for c, p in positions.items()}
+
+    @classmethod
+    def from_tasks(cls, tasks: Dict[int, Tuple[str, str]]) -> "TaskRegistry":
+        """From a `{task_id: (task_type, instruction)}` table such as TASKBOX_TASKS."""
+        return cls(TaskSpec(task_id, task_type, instruction) for task_id, (task_type, instruction) in tasks.items())
+
+    @classmethod
+    def from_catalog(cls, tasks: Iterable[Dict[str, Any]]) -> "TaskRegistry":
+        """From task_generator dicts (`task_type`, `task_instruction`), numbered from 1 like `generate_tasks()`."""
+        return cls(
+            TaskSpec(task.get('task_id', i + 1), task['task_type'], task['task_instruction'])
+            for i, task in enumerate(tasks)
+        )
+
+    # ------------------------ Lookups ------------------------
+    def __iter__(self) -> Iterator[TaskSpec]:
+        return iter(self._specs)
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    @property
+    def types(self) -> Tuple[str, ...]:
+        return tuple(self._by_type)
+
+    def get(self, task_id: int) -> TaskSpec:
+        return self._by_id[task_id]
+
+    def lookup(self, instruction: str) -> Optional[TaskSpec]:
+        return self._by_instruction.get(instruction)
+
+    def of_type(self, task_type: str) -> Tuple[TaskSpec, ...]:
+        return self._by_type.get(task_type, ())
+
+    def for_target(self, control: str, target: int) -> Tuple[TaskSpec, ...]:
+        return self._by_target.get((control, target), ())
+
+    def positions(self, control: str) -> Tuple[int, ...]:
+        """Target positions that have a task, for 'knob' / 'top slider' / 'bottom slider'."""
+        return self._positions.get(control, ())
+
+
+TASKBOX_REGISTRY = TaskRegistry.from_tasks(TASKBOX_TASKS)
+CATALOG_REGISTRY = TaskRegistry.from_catalog(
+    task_generator.flip_switches
+    + task_generator.push_button
+    + task_generator.pull_wire
+    + task_generator.insert_wire
+    + task_generator.move_slider
+    + task_generator.turn_knob
+    + task_generator.move_box
+)
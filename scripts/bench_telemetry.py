@@ -0,0 +1,354 @@
+"""Benchmark the BusyBox telemetry path: serial line -> mqtt_bridge.py -> MQTT -> BusyBoxListener.
+
+Module traffic is written into the ptys of a `FakeBusyBox` and travels the
+real path set up by `SimRig`: the unmodified bridge reads and parses the
+lines, publishes them to the `MiniBroker`, and `BusyBoxListener` stores them
+in `latest_state()` / its history. Every line carries a sequence tag (an
+extra `S=<n>` channel, or the encoder count itself for the knob), so each
+message is matched to the moment its line was written:
+
+- serial:   line written -> bridge read it (the bridge's `ts` field);
+- mqtt:     bridge read -> listener stored it (visible in `latest_state()`);
+- total:    line written -> listener stored it.
+
+Per run the report has the delivered throughput, p50 / p99 / max latency per
+stage, drops (lines the pty refused because the bridge fell behind, and
+lines written but never delivered) and CPU time per stage from /proc (bridge
+process, broker thread, listener network thread, generator thread), as a
+fraction of one core.
+
+Traffic is synthetic (`--rates`: lines/s over all five modules, 0 = as fast
+as possible) or replayed from recordings (`--trace`): HDF5 episodes (every
+change between the `/busybox/state_json` snapshots becomes a line at its
+recorded time) or JSON lines `{"t": seconds, "module": "sliders", "values":
+[515, 1010]}`, sped up by `--speed`. Tags replace the knob's value, so
+replayed contents are not bit-exact; timing and line shapes are.
+
+Note that ptys ignore the baud rate: the real modules at 9600 baud top out at
+roughly 40 lines/s each, so rates far beyond that measure software headroom.
+
+Results are saved as JSON (default `~/.busybox/bench/telemetry_<time>.json`);
+`--compare` checks them against an earlier file (or `latest`) and exits 1
+when a run lost more than `--tolerance` of its throughput or p99 latency.
+
+Usage (from the repository root; needs pyserial and paho-mqtt):
+    python scripts/bench_telemetry.py
+    python scripts/bench_telemetry.py --rates 200 2000 0 --duration 10 --compare latest
+    python scripts/bench_telemetry.py --trace ~/aloha_data/busybox_collection/session_1/episode_3.hdf5 --speed 5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import numpy as np  # noqa: E402
+
+from robots.aloha.sim.fake_busybox import format_line  # noqa: E402
+from robots.aloha.sim.rig import SimRig  # noqa: E402
+
+BENCH_DIR = Path(os.path.expanduser("~/.busybox/bench"))
+DATA_MODULES = ("buttons", "knob", "sliders", "switches", "wires")
+SEQ_BASE = 1_000_000  # tags start here; real readings stay far below (analog <= 1023)
+CHANNELS = {"buttons": 4, "knob": 1, "sliders": 2, "switches": 2, "wires": 4}
+
+
+# ------------------------ Traffic ------------------------
+def synthetic_traffic(rate, duration, seed=0):
+    """(t, module, values) round-robin over the modules at `rate` lines/s (t None: unpaced)."""
+    rng = random.Random(seed)
+    state = {"buttons": [1, 1, 1, 1], "knob": [0], "sliders": [515, 515], "switches": [1, 0], "wires": [1, 1, 1, 1]}
+    k = 0
+    while rate <= 0 or k / rate < duration:
+        module = DATA_MODULES[k % len(DATA_MODULES)]
+        values = state[module]
+        if module == "sliders":
+            values[:] = [min(1023, max(0, v + rng.randint(-8, 8))) for v in values]
+        elif module != "knob" and rng.random() < 0.1:
+            i = rng.randrange(len(values))
+            values[i] = 1 - values[i]
+        yield (k / rate if rate > 0 else None), module, list(values)
+        k += 1
+
+
+def load_trace(path):
+    """[(t, module, values)] from an HDF5 episode or a JSON-lines trace, t from 0."""
+    events = []
+    if path.endswith((".hdf5", ".h5")):
+        import h5py
+
+        with h5py.File(path, "r") as root:
+            rows = root["busybox/state_json"].asstr()[...]
+            timestamps = root["busybox/timestamp"][...]
+        previous = {}
+        for ts, row in zip(timestamps, rows):
+            state = json.loads(row) or {}
+            for module in DATA_MODULES:
+                payload = state.get(module)
+                values = payload.get("values") if isinstance(payload, dict) else None
+                if values is not None and values != previous.get(module):
+                    events.append((float(ts), module, values))
+                    previous[module] = values
+    else:
+        with open(path, "r") as f:
+            events = [(float(e["t"]), e["module"], e["values"]) for e in map(json.loads, f) if e.get("module") in CHANNELS]
+    if not events:
+        raise ValueError(f"No BusyBox module traffic in {path}")
+    t0 = min(t for t, _, _ in events)
+    return sorted(((t - t0, module, values) for t, module, values in events), key=lambda e: e[0])
+
+
+def tagged_line(module, values, seq):
+    if module == "knob":
+        return format_line("knob", [SEQ_BASE + seq])
+    return format_line(module, values[:CHANNELS[module]], extra={"S": SEQ_BASE + seq})
+
+
+# ------------------------ CPU (/proc) ------------------------
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _cpu_s(stat_path):
+    """utime + stime in seconds from a /proc stat file (None if unavailable)."""
+    try:
+        with open(stat_path, "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / _CLK_TCK
+
+
+def _thread_id(name_prefix):
+    for thread in threading.enumerate():
+        if thread.name.startswith(name_prefix):
+            return thread.native_id
+    return None
+
+
+def cpu_probes(rig):
+    """stage -> /proc stat path of the process / thread doing that stage's work."""
+    pid = os.getpid()
+    probes = {
+        "generator": f"/proc/{pid}/task/{threading.get_native_id()}/stat",
+        "bridge": f"/proc/{rig.bridge.pid}/stat",
+    }
+    for stage, prefix in (("broker", "MiniBroker"), ("listener", "paho-mqtt-client")):
+        tid = _thread_id(prefix)
+        if tid is not None:
+            probes[stage] = f"/proc/{pid}/task/{tid}/stat"
+    return probes
+
+
+def cpu_snapshot(probes):
+    return {stage: _cpu_s(path) for stage, path in probes.items()}
+
+
+# ------------------------ Runs ------------------------
+def latency_stats(samples):
+    if not samples:
+        return None
+    arr = np.asarray(samples) * 1000.0
+    return {"p50_ms": float(np.percentile(arr, 50)), "p99_ms": float(np.percentile(arr, 99)),
+            "max_ms": float(arr.max()), "mean_ms": float(arr.mean())}
+
+
+def run_load(rig, label, traffic, duration, speed, drain_s, seq_start):
+    """Write `traffic` into the ptys and match what the listener received; returns (result, next seq)."""
+    box, listener = rig.box, rig.listener
+    write_ts = {}
+    refused = 0
+    probes = cpu_probes(rig)
+    cpu_before = cpu_snapshot(probes)
+    broker_dropped = rig.broker.dropped
+    t_start = time.time()
+    start = time.perf_counter()
+    seq = seq_start
+    for t_rel, module, values in traffic:
+        now = time.perf_counter() - start
+        if now >= duration:
+            break
+        if t_rel is not None:
+            delay = t_rel / speed - now
+            if delay > 0:
+                time.sleep(delay)
+        line = tagged_line(module, values, seq)
+        write_ts[seq] = time.time()
+        if not box.send_line(module, line):
+            refused += 1
+            del write_ts[seq]
+        seq += 1
+    send_s = time.perf_counter() - start
+
+    # wait for the tail to arrive (or drain_s without progress)
+    delivered = {}
+    scanned = {module: 0 for module in DATA_MODULES}
+    last_count, last_change = -1, time.monotonic()
+    while time.monotonic() - last_change < drain_s:
+        for module in DATA_MODULES:
+            entries = listener.history_since(module, t_start)
+            for ts, payload in entries[scanned[module]:]:
+                values = payload.get("values") if isinstance(payload, dict) else None
+                if values and values[-1] >= SEQ_BASE and (values[-1] - SEQ_BASE) in write_ts:
+                    delivered[values[-1] - SEQ_BASE] = (payload.get("ts"), ts)
+            scanned[module] = len(entries)
+        if len(delivered) == len(write_ts):
+            break
+        if len(delivered) != last_count:
+            last_count, last_change = len(delivered), time.monotonic()
+        time.sleep(0.05)
+    wall_s = time.perf_counter() - start
+    cpu_after = cpu_snapshot(probes)
+
+    serial, mqtt, total = [], [], []
+    last_arrival = t_start
+    for n, (bridge_ts, listener_ts) in delivered.items():
+        total.append(listener_ts - write_ts[n])
+        if bridge_ts is not None:
+            serial.append(bridge_ts - write_ts[n])
+            mqtt.append(listener_ts - bridge_ts)
+        last_arrival = max(last_arrival, listener_ts)
+    written = len(write_ts)
+    result = {
+        "label": label,
+        "send_s": send_s,
+        "offered_per_s": (written + refused) / send_s if send_s > 0 else None,
+        "written": written,
+        "delivered": len(delivered),
+        "throughput_per_s": len(delivered) / (last_arrival - t_start) if delivered else 0.0,
+        "drops": {"pty_refused": refused, "lost": written - len(delivered),
+                  "broker": rig.broker.dropped - broker_dropped},
+        "latency": {"serial": latency_stats(serial), "mqtt": latency_stats(mqtt), "total": latency_stats(total)},
+        "cpu": {stage: (cpu_after[stage] - cpu_before[stage]) / wall_s
+                if cpu_after[stage] is not None and cpu_before[stage] is not None else None
+                for stage in probes},
+    }
+    return result, seq
+
+
+# ------------------------ Results ------------------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def latest_result(exclude=None):
+    files = sorted(p for p in BENCH_DIR.glob("telemetry_*.json") if str(p) != str(exclude))
+    return files[-1] if files else None
+
+
+def compare(current, baseline, tolerance):
+    """Print per-run changes against `baseline`; returns the labels that regressed."""
+    base_runs = {run["label"]: run for run in baseline["runs"]}
+    regressions = []
+    print(f"\nCompared with {baseline.get('saved_to')} ({baseline.get('timestamp')}, commit {baseline.get('commit')}):")
+    for run in current["runs"]:
+        base = base_runs.get(run["label"])
+        if base is None:
+            print(f"  {run['label']:24s} no baseline run")
+            continue
+        tp, base_tp = run["throughput_per_s"], base["throughput_per_s"]
+        p99 = (run["latency"]["total"] or {}).get("p99_ms")
+        base_p99 = (base["latency"]["total"] or {}).get("p99_ms")
+        worse = []
+        if base_tp and tp < base_tp * (1 - tolerance):
+            worse.append("throughput")
+        if p99 is not None and base_p99 is not None and p99 > base_p99 * (1 + tolerance) and p99 - base_p99 > 1.0:
+            worse.append("p99")
+        print(f"  {run['label']:24s} throughput {base_tp:8.0f} -> {tp:8.0f}/s   "
+              f"p99 {base_p99 if base_p99 is not None else float('nan'):7.2f} -> "
+              f"{p99 if p99 is not None else float('nan'):7.2f} ms" + (f"   REGRESSION ({', '.join(worse)})" if worse else ""))
+        if worse:
+            regressions.append(run["label"])
+    return regressions
+
+
+def print_run(run):
+    total = run["latency"]["total"] or {}
+    serial = run["latency"]["serial"] or {}
+    mqtt = run["latency"]["mqtt"] or {}
+    cpu = ", ".join(f"{stage} {100 * v:.0f}%" for stage, v in run["cpu"].items() if v is not None)
+    print(f"{run['label']:24s} {run['throughput_per_s']:8.0f}/s  total p50 {total.get('p50_ms', float('nan')):6.2f} "
+          f"p99 {total.get('p99_ms', float('nan')):7.2f} ms  (serial p99 {serial.get('p99_ms', float('nan')):6.2f}, "
+          f"mqtt p99 {mqtt.get('p99_ms', float('nan')):6.2f})  drops {run['drops']}  cpu {cpu}")
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="BusyBox telemetry path throughput / latency benchmark.")
+    ap.add_argument("--rates", type=float, nargs="+", default=[50, 500, 2000, 0],
+                    help="synthetic lines/s over all modules (0: as fast as possible)")
+    ap.add_argument("--trace", nargs="+", default=[], help="HDF5 episodes / JSON-lines traces to replay")
+    ap.add_argument("--speed", type=float, default=1.0, help="replay speed-up for --trace")
+    ap.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    ap.add_argument("--drain-s", type=float, default=1.0, help="wait this long without new arrivals after a run")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help=f"results JSON (default: {BENCH_DIR}/telemetry_<time>.json)")
+    ap.add_argument("--compare", default=None, help="earlier results JSON, or 'latest'")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="relative change counted as a regression")
+    ap.add_argument("--verbose", action="store_true", help="show bridge output")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    loads = [(f"synthetic@{rate:g}/s" if rate > 0 else "synthetic@max", lambda r=rate: synthetic_traffic(r, args.duration, args.seed))
+             for rate in args.rates]
+    for path in args.trace:
+        events = load_trace(path)
+        loads.append((f"trace:{Path(path).stem}x{args.speed:g}", lambda e=events: iter(e)))
+
+    runs = []
+    seq = 0
+    with SimRig(listener_kwargs={"max_history": None}, verbose=args.verbose) as rig:
+        print(f"Telemetry path up in {rig.setup_s:.1f}s; {len(loads)} runs of {args.duration:g}s")
+        for label, traffic in loads:
+            speed = args.speed if label.startswith("trace:") else 1.0
+            run, seq = run_load(rig, label, traffic(), args.duration, speed, args.drain_s, seq)
+            runs.append(run)
+            print_run(run)
+
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "runs": runs,
+    }
+    out = Path(args.out) if args.out else BENCH_DIR / f"telemetry_{datetime.now():%Y%m%d_%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    result["saved_to"] = str(out)
+    tmp_path = str(out) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(result, f, indent=2)
+    os.replace(tmp_path, out)
+    print(f"Saved {out}")
+
+    if args.compare:
+        baseline_path = latest_result(exclude=out) if args.compare == "latest" else Path(args.compare)
+        if baseline_path is None:
+            print("No earlier results to compare with.")
+            return 0
+        with open(baseline_path, "r") as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
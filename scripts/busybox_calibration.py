@@ -1,17 +1,40 @@
+"""Interactive BusyBox calibration, saved as a versioned per-box profile.
+
+Walks the operator through each module on the e-ink display and stores the
+result with `calibration_store.save_profile` under
+`BUSYBOX_CALIBRATION_DIR/<box_id>.json`, tagged with the USB serial of each
+module's Arduino (reported by the bridge on `MQTT_MODULES_TOPIC`).
+
+Usage:
+    python scripts/busybox_calibration.py                         # all modules
+    python scripts/busybox_calibration.py --module wires          # re-calibrate one swapped module
+    python scripts/busybox_calibration.py --box-id busybox_1 --module sliders --module knob
+
+Modules not selected keep their stored calibration. The red button is needed to
+confirm every step, so buttons are calibrated first unless the profile already
+has them.
+"""
+import argparse
 import time
 
 from robots.aloha.utils.busybox_listener import BusyBoxListener
-
+from robots.aloha.utils.calibration_store import (
+    CALIBRATED_MODULES,
+    load_profile,
+    new_profile,
+    save_profile,
+    to_digital_mapping,
+    update_module,
+)
+from robots.aloha.utils.compiled_calibration import CompiledCalibration
 from robots.aloha.utils.config import COLLECTION_CONFIG
-from robots.aloha.utils.config import MQTT_SUBSCRIBE_TOPICS, EINK_PUBLISH_TOPIC
+from robots.aloha.utils.config import MQTT_SUBSCRIBE_TOPICS, EINK_PUBLISH_TOPIC, MQTT_MODULES_TOPIC
+from robots.aloha.utils.control_values import KNOB_EXACT_VALUES, SLIDER_EXACT_VALUES, WIRE_FLAVOR_VALUES
 
 
 def calibrate_buttons(button_layout, busybox_listener, bb_DT):
     for button_name in button_layout:
-        time.sleep(0.2)
-        busybox_listener.publish_eink(f"1:Press {button_name.replace('_', ' ').title()}")
-        time.sleep(0.2)
-        busybox_listener.publish_eink("2:")
+        busybox_listener.publish_eink([f"1:Press {button_name.replace('_', ' ').title()}", "2:"], wait=True)
         time.sleep(1.0)  # wait a bit before next button
         waiting_for_button = True
         while waiting_for_button:
@@ -49,11 +72,9 @@ def calibrate_buttons(button_layout, busybox_listener, bb_DT):
 def calibrate_switches(switch_layout, busybox_listener, bb_DT):
     for switch_name in switch_layout:
         for state in ("On", "Off"):
-            time.sleep(0.2)
-            busybox_listener.publish_eink(f"1:Flip {switch_name.replace('_', ' ').title()} {state}")
-            time.sleep(0.2)
-            busybox_listener.publish_eink("2:Red Btn confirm")
-            time.sleep(0.2)
+            busybox_listener.publish_eink(
+                [f"1:Flip {switch_name.replace('_', ' ').title()} {state}", "2:Red Btn confirm"], wait=True
+            )
             waiting_for_button = True
             while waiting_for_button:
                 latest = busybox_listener.latest_state()
@@ -139,9 +160,7 @@ def calibrate_switches(switch_layout, busybox_listener, bb_DT):
 
 def calibrate_wires(wire_layout, busybox_listener, bb_DT):
     # Ask user to start with all wires unplugged
-    time.sleep(0.2)
-    busybox_listener.publish_eink("1:Unplug all wires")
-    time.sleep(0.2)
+    busybox_listener.publish_eink("1:Unplug all wires", wait=True)
 
     # Wait for initial red button press to confirm starting wire calibration
     waiting_for_red_start = True
@@ -177,10 +196,9 @@ def calibrate_wires(wire_layout, busybox_listener, bb_DT):
         time.sleep(bb_DT)
 
     for wire_name in wire_layout:
-        busybox_listener.publish_eink(f"1:Insert {wire_name.replace('_', ' ').title()}")
-        time.sleep(0.2)
-        busybox_listener.publish_eink("2:Press Red to confirm")
-        time.sleep(0.2)
+        busybox_listener.publish_eink(
+            [f"1:Insert {wire_name.replace('_', ' ').title()}", "2:Press Red to confirm"], wait=True
+        )
 
         waiting_for_confirmation = True
         while waiting_for_confirmation:
@@ -261,72 +279,174 @@ def calibrate_wires(wire_layout, busybox_listener, bb_DT):
     return wire_layout
 
 
-if __name__ == "__main__":
-    bb_freq = 50  # Hz
-    bb_DT = 1.0 / bb_freq
+def wait_for_red_confirm(busybox_listener, bb_DT):
+    """Block until the red button is pressed and released; return the snapshot taken at the press."""
+    red_info = button_layout.get('red_button', {})
+    red_idx = red_info.get('index')
+    red_pressed_state = red_info.get('pressed_state', 0)
+    pressed_snapshot = None
+    while True:
+        latest = busybox_listener.latest_state()
+        buttons = latest.get('buttons') if isinstance(latest, dict) else None
+        b_values = buttons.get('values') if isinstance(buttons, dict) else None
+        if isinstance(b_values, (list, tuple)) and red_idx is not None and 0 <= red_idx < len(b_values):
+            is_pressed = b_values[red_idx] == red_pressed_state
+            if is_pressed and pressed_snapshot is None:
+                pressed_snapshot = latest
+            elif not is_pressed and pressed_snapshot is not None:
+                return pressed_snapshot
+        time.sleep(bb_DT)
 
-    busybox_listener = BusyBoxListener(
-        broker=COLLECTION_CONFIG['MQTT_broker'],
-        port=COLLECTION_CONFIG['MQTT_port'],
-        topics=MQTT_SUBSCRIBE_TOPICS,
-        e_ink_topic=EINK_PUBLISH_TOPIC
+
+def calibrate_positions(control_name, module, positions, busybox_listener, bb_DT, exclude_indices=()):
+    """Record the raw reading at each marked position of one slider or the knob.
+
+    The channel is the one whose reading varies most across the positions
+    (channels in `exclude_indices`, e.g. the other slider, are skipped).
+    """
+    title = control_name.replace('_', ' ').title()
+    readings = {}
+    for pos in sorted(positions):
+        while True:
+            busybox_listener.publish_eink([f"1:{title} to {pos}", "2:Red Btn confirm"], wait=True)
+            latest = wait_for_red_confirm(busybox_listener, bb_DT)
+            payload = latest.get(module) if isinstance(latest, dict) else None
+            values = payload.get('values') if isinstance(payload, dict) else None
+            if isinstance(values, (list, tuple)) and values:
+                readings[pos] = list(values)
+                print(f"{title} position {pos}: {values}")
+                break
+            print(f"'{module}.values' missing or malformed; repeat position {pos}.")
+
+    width = min(len(v) for v in readings.values())
+    candidates = [i for i in range(width) if i not in exclude_indices]
+    spans = {i: max(v[i] for v in readings.values()) - min(v[i] for v in readings.values()) for i in candidates}
+    idx = max(spans, key=spans.get)
+    mapping = {str(pos): readings[pos][idx] for pos in sorted(positions)}
+    print(f"{title} index: {idx} mapping: {mapping}")
+    busybox_listener.publish_eink(f"2:{title} idx:{idx} OK")
+    return {"index": idx, "mapping": mapping}
+
+
+def calibrate_sliders(busybox_listener, bb_DT):
+    top = calibrate_positions("top_slider", "sliders", SLIDER_EXACT_VALUES, busybox_listener, bb_DT)
+    bottom = calibrate_positions(
+        "bottom_slider", "sliders", SLIDER_EXACT_VALUES, busybox_listener, bb_DT, exclude_indices=(top["index"],)
     )
-    busybox_listener.start()
+    return {"top_slider": top, "bottom_slider": bottom}
 
-    # Calibrate buttons
-    print("Calibrating buttons...")
-
-    button_layout = {
-        "red_button": {
-            "index": None,  # to be filled in
-            "pressed_state": 0
-        },
-        "blue_button": {
-            "index": None,
-            "pressed_state": 0
-        },
-        "green_button": {
-            "index": None,
-            "pressed_state": 0
-        },
-        "yellow_button": {
-            "index": None,
-            "pressed_state": 0
-        },
-    }
 
-    button_layout = calibrate_buttons(button_layout, busybox_listener, bb_DT)
-    print(f"Button calibration complete:{button_layout}")
-    
+def calibrate_knob(busybox_listener, bb_DT):
+    return calibrate_positions("knob", "knob", KNOB_EXACT_VALUES, busybox_listener, bb_DT)
 
-    # loop forever and output the latest state everytime the red button is pressed
-    while True:
-        latest = busybox_listener.latest_state()
-        if not latest:
-            time.sleep(bb_DT)
-            continue
 
-        buttons = latest.get('buttons') if isinstance(latest, dict) else None
-        if not buttons:
-            time.sleep(bb_DT)
-            continue
+def switches_to_mapping(switch_layout):
+    return {
+        name: {"index": info["index"], "on_value": info.get("on_state", 1), "off_value": info.get("off_state", 0)}
+        for name, info in switch_layout.items()
+    }
 
-        b_values = buttons.get('values') if isinstance(buttons, dict) else None
-        if not isinstance(b_values, (list, tuple)):
-            time.sleep(bb_DT)
-            continue
 
-        red_info = button_layout.get('red_button', {})
-        red_idx = red_info.get('index')
-        red_pressed_state = red_info.get('pressed_state', 0)
+def wires_to_mapping(wire_layout):
+    mapping = {}
+    for name, info in wire_layout.items():
+        inserted = info.get("inserted_state", 1)
+        mapping[name] = {"index": info["index"], "connected_value": inserted, "disconnected_value": 1 - inserted}
+    return mapping
 
-        if red_idx is None or not (0 <= red_idx < len(b_values)):
-            print("Waiting for calibrated red button index...")
-            time.sleep(bb_DT)
-            continue
 
-        if b_values[red_idx] == red_pressed_state:
-            print(f"Red button pressed. Latest BusyBox state:\n{latest}")
-            busybox_listener.publish_eink("2:State printed in console")
-            time.sleep(1.0)  # debounce delay
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--box-id', default=COLLECTION_CONFIG.get('busybox_id', 'busybox_0'))
+    parser.add_argument(
+        '--module', action='append', choices=CALIBRATED_MODULES, dest='modules',
+        help='module to (re-)calibrate; repeatable (default: all)'
+    )
+    parser.add_argument('--monitor', action='store_true', help='print the decoded state on every red press afterwards')
+    args = parser.parse_args()
+    modules = args.modules or list(CALIBRATED_MODULES)
+
+    bb_freq = 50  # Hz
+    bb_DT = 1.0 / bb_freq
 
+    busybox_listener = BusyBoxListener(
+        broker=COLLECTION_CONFIG['MQTT_broker'],
+        port=COLLECTION_CONFIG['MQTT_port'],
+        topics=MQTT_SUBSCRIBE_TOPICS,
+        e_ink_topic=EINK_PUBLISH_TOPIC,
+        modules_topic=MQTT_MODULES_TOPIC,
+    )
+    busybox_listener.start()
+    module_serials = busybox_listener.module_serials(timeout=3.0)
+    if not module_serials:
+        print("[WARNING]: no module report from the bridge; profile will not record USB serials.")
+
+    profile = load_profile(args.box_id) or new_profile(args.box_id)
+    print(f"Calibrating {modules} for {args.box_id} (stored revision {profile['revision']})")
+
+    stored_buttons = profile["modules"].get("buttons", {}).get("mapping")
+    if "buttons" in modules or not stored_buttons:
+        # Calibrate buttons
+        print("Calibrating buttons...")
+
+        button_layout = {
+            "red_button": {
+                "index": None,  # to be filled in
+                "pressed_state": 0
+            },
+            "blue_button": {
+                "index": None,
+                "pressed_state": 0
+            },
+            "green_button": {
+                "index": None,
+                "pressed_state": 0
+            },
+            "yellow_button": {
+                "index": None,
+                "pressed_state": 0
+            },
+        }
+
+        button_layout = calibrate_buttons(button_layout, busybox_listener, bb_DT)
+        print(f"Button calibration complete:{button_layout}")
+        update_module(profile, "buttons", button_layout, module_serials.get("buttons"))
+    else:
+        button_layout = stored_buttons
+
+    if "switches" in modules:
+        print("Calibrating switches...")
+        switch_layout = {"top_switch": {"index": None}, "bottom_switch": {"index": None}}
+        switch_layout = calibrate_switches(switch_layout, busybox_listener, bb_DT)
+        update_module(profile, "switches", switches_to_mapping(switch_layout), module_serials.get("switches"))
+
+    if "wires" in modules:
+        print("Calibrating wires...")
+        wire_layout = {
+            f"{color}_wire": {"index": None} for color in sorted(WIRE_FLAVOR_VALUES)
+        }
+        wire_layout = calibrate_wires(wire_layout, busybox_listener, bb_DT)
+        update_module(profile, "wires", wires_to_mapping(wire_layout), module_serials.get("wires"))
+
+    if "sliders" in modules:
+        print("Calibrating sliders...")
+        update_module(profile, "sliders", calibrate_sliders(busybox_listener, bb_DT), module_serials.get("sliders"))
+
+    if "knob" in modules:
+        print("Calibrating knob...")
+        update_module(profile, "knob", calibrate_knob(busybox_listener, bb_DT), module_serials.get("knob"))
+
+    path = save_profile(profile)
+    print(f"Saved {path} (revision {profile['revision']})")
+    busybox_listener.publish_eink(["1:Calibration saved", f"2:rev {profile['revision']}"], wait=True)
+
+    if not args.monitor:
+        busybox_listener.stop()
+        raise SystemExit(0)
+
+    calibration = CompiledCalibration(to_digital_mapping(profile))
+    # loop forever and output the decoded state everytime the red button is pressed
+    while True:
+        latest = wait_for_red_confirm(busybox_listener, bb_DT)
+        print(f"Red button pressed. Latest BusyBox state:\n{latest}\nDecoded: {calibration.decode(latest)}")
+        busybox_listener.publish_eink("2:State printed in console")
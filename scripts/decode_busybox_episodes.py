@@ -0,0 +1,103 @@
+"""Batch-decode recorded BusyBox signals into semantic timelines in each session manifest.
+
+Walks a dataset directory for `manifest.json` files written by EpisodeWriter,
+decodes `/busybox` data of every listed episode in parallel, and stores the
+result under `"busybox"` in the episode's manifest entry:
+
+    "episode_3": {
+        ...,
+        "busybox": {
+            "start_state": {...}, "end_state": {...},
+            "changed": ["sliders/top_slider"],
+            "timeline": [{"t": 1.84, "control": "sliders/top_slider", "value": 3}, ...],
+            "button_presses": {"red": 0, ...}
+        }
+    }
+
+Usage:
+    python scripts/decode_busybox_episodes.py ~/aloha_data/busybox_collection
+    python scripts/decode_busybox_episodes.py <dir> --mapping my_mapping.json --workers 8 --force
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from robots.aloha.utils.busybox_timeline import decode_episode_file
+from robots.aloha.utils.compiled_calibration import CompiledCalibration
+from robots.aloha.utils.config import BUSYBOX_DIGITAL_MAPPING_PATH
+
+_calibration = None  # per-worker compiled tables
+
+
+def _init_worker(mapping_path):
+    global _calibration
+    _calibration = CompiledCalibration.from_json(mapping_path)
+
+
+def _decode(job):
+    manifest_path, episode_key, episode_path = job
+    try:
+        return manifest_path, episode_key, decode_episode_file(_calibration, episode_path), None
+    except Exception as e:  # corrupt / partially written files should not stop the batch
+        return manifest_path, episode_key, None, f"{type(e).__name__}: {e}"
+
+
+def find_jobs(dataset_dir: Path, force: bool):
+    manifests = {}
+    jobs = []
+    for manifest_path in sorted(dataset_dir.rglob('manifest.json')):
+        with manifest_path.open('r') as f:
+            manifest = json.load(f)
+        manifests[str(manifest_path)] = manifest
+        for key, entry in manifest.items():
+            if not key.startswith('episode_') or not isinstance(entry, dict):
+                continue
+            if 'busybox' in entry and not force:
+                continue
+            episode_path = os.path.join(entry['task_folder'], f'{key}.hdf5')
+            if os.path.exists(episode_path):
+                jobs.append((str(manifest_path), key, episode_path))
+    return manifests, jobs
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('dataset_dir', type=Path)
+    ap.add_argument('--mapping', default=str(BUSYBOX_DIGITAL_MAPPING_PATH), help='busybox_digital_mapping.json')
+    ap.add_argument('--workers', type=int, default=os.cpu_count())
+    ap.add_argument('--force', action='store_true', help='re-decode episodes that already have results')
+    args = ap.parse_args()
+
+    t0 = time.time()
+    manifests, jobs = find_jobs(args.dataset_dir, args.force)
+    print(f"Decoding {len(jobs)} episodes from {len(manifests)} sessions with {args.workers} workers...")
+
+    decoded = skipped = failed = 0
+    touched = set()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.mapping,)) as pool:
+        for manifest_path, key, result, error in pool.map(_decode, jobs, chunksize=8):
+            if error is not None:
+                failed += 1
+                print(f"  [FAILED] {manifest_path}:{key}: {error}")
+            elif result is None:
+                skipped += 1  # recorded without instrumented BusyBox
+            else:
+                decoded += 1
+                manifests[manifest_path][key]['busybox'] = result
+                touched.add(manifest_path)
+
+    for manifest_path in touched:
+        manifest = manifests[manifest_path]
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(tmp_path, manifest_path)
+
+    print(f"Decoded {decoded}, no BusyBox data {skipped}, failed {failed} in {time.time() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""Run the BusyBox evaluator headless, against a simulated box and a fake policy client.
+
+Everything between the policy and the results log runs for real, on plain Linux
+without robot, BusyBox, GPU or mosquitto:
+
+- `SimRig` (robots/aloha/sim/rig.py): `MiniBroker` stands in for mosquitto,
+  `FakeBusyBox` serves the module firmware protocol on ptys, the unmodified
+  `devices/pi_sw/mqtt_bridge.py` reads them and publishes to MQTT, and
+  `BusyBoxListener` follows the box;
+- the evaluation loop is `run_session()` of `evaluation/eval_bbx_client.py`,
+  configured from a generated bbx_eval_config.yaml (BBX_EVAL_CONFIG): its
+  `ClientScheduler` spawns `robots/aloha/sim/fake_client.py` per rollout, which
+  acts on the box with probability `--success-rate`, and state and button tasks
+  are judged by the real `TaskSuccessOracle` with `CompiledCalibration(SIM_MAPPING)`;
+- `SimHooks` replace the operator: they set the box to `init_box_state` (timed
+  until an oracle sees the whole state), draw the prompt on the e-ink display
+  (timed until the bridge's ack), and answer for box-pose tasks with what the
+  client did.
+
+Results go to a `ResultsStore`, so reruns resume. With `--video-device` each
+rollout is also recorded with `VideoRecorder` (needs OpenCV and a camera, e.g.
+v4l2loopback).
+
+The report has rollouts/s, per-phase timings, success rate, broker / box
+counters and the number of judged outcomes that disagree with what the client
+did; a disagreement, a rollout the oracle could not judge or a client that
+failed to start means a fault in the evaluation path and makes the exit code
+1, so the script doubles as an end-to-end check in CI.
+
+Usage (from the repository root; needs pyserial and paho-mqtt):
+    python scripts/run_headless_eval.py --limit 20
+    python scripts/run_headless_eval.py --success-rate 0.6 --results /tmp/sim_results.jsonl
+    python scripts/run_headless_eval.py --act-time 0 --move-s 0 --json-out headless_eval.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import shlex
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+EVALUATION_DIR = REPO_ROOT / "evaluation"
+for path in (REPO_ROOT, EVALUATION_DIR):  # eval_bbx_client imports its siblings by module name
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import numpy as np  # noqa: E402
+
+from results_store import ResultsStore, rollout_keys  # noqa: E402
+from robots.aloha.sim.rig import SimRig  # noqa: E402
+from robots.aloha.utils.success_oracle import TaskSuccessOracle, target_from_box_state  # noqa: E402
+
+CLIENT_NAME = "FAKE_OPENPI_CLIENT"  # ClientSpec.shell_cmd picks the flag style from the name
+
+
+def percentiles(samples):
+    samples = [s for s in samples if s is not None]
+    if not samples:
+        return None
+    arr = np.asarray(samples)
+    return {"mean": float(arr.mean()), "p50": float(np.percentile(arr, 50)), "p95": float(np.percentile(arr, 95)),
+            "max": float(arr.max()), "n": len(samples)}
+
+
+def client_command(args, control_port):
+    cmd = (f"cd {shlex.quote(str(REPO_ROOT))} && {sys.executable} -m robots.aloha.sim.fake_client "
+           f"--sim localhost:{control_port} --success-rate {args.success_rate} --act-time {args.act_time} "
+           f"--startup-time {args.startup_time} --hold-time {args.judge_timeout}")
+    if args.seed is not None:
+        cmd += f" --seed {args.seed}"
+    return cmd
+
+
+def write_config(args, work_dir, control_port):
+    """bbx_eval_config.yaml for eval_bbx_client; the listener is handed over through SimHooks."""
+    config = {
+        "DRY_RUN": False,
+        "TASK_TIMEOUT": args.task_timeout,
+        "RECORD_VIDEOS": args.video_device is not None,
+        "VIDEO_DEVICE_INDEX": args.video_device,
+        "TASK_EVAL_LIST_PATH": args.rollouts,
+        "OUTPUT_JSON_PATH": os.path.join(work_dir, "eval_results.json"),
+        "RESULTS_LOG_PATH": args.results,
+        "SLEEP_COMMAND": "true",
+        "AUTO_SUCCESS_CHECK": False,
+        "EARLY_STOP_ON_SUCCESS": True,
+        "SUCCESS_SETTLE_TIME": args.settle_s,
+        "CLIENT_GRACE_TIME": 2.0,
+        "CLIENTS_TO_EVALUATE": [
+            {CLIENT_NAME: {"command": client_command(args, control_port), "ready_pattern": "Connected to server"}},
+        ],
+    }
+    path = os.path.join(work_dir, "bbx_eval_config.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+def make_sim_hooks(session_hooks_cls, rig, args):
+    """SimHooks on eval_bbx_client.SessionHooks (which can only be imported once the config is written)."""
+
+    class SimHooks(session_hooks_cls):
+        """Operator stand-in: sets the simulated box and answers with what the fake client did."""
+
+        def __init__(self):
+            super().__init__(rig.listener, rig.calibration)
+            self.box = rig.box
+            self.current = {}
+            self._performs_before = 0
+
+        def set_up_box(self, rollout):
+            t_rollout = time.monotonic()
+            self.box.set_state(rollout["init_box_state"])
+            oracle = TaskSuccessOracle(
+                self.busybox_listener,
+                target_state=target_from_box_state(rollout["init_box_state"], self.calibration),
+                settle_s=0.0,
+                poll_dt=0.005,
+                calibration=self.calibration,
+            )
+            oracle.start()
+            reached = oracle.wait(args.settle_timeout)
+            oracle.stop()
+            set_s = time.monotonic() - t_rollout if reached else None
+            if not reached:
+                print(f"box did not reach the initial state of {rollout['task_prompt']!r} "
+                      f"within {args.settle_timeout}s", file=sys.stderr)
+            eink_s = None
+            if not args.no_eink:
+                t0 = time.monotonic()
+                if self.busybox_listener.publish_eink([f"1:{rollout['task_prompt']}", "2:"], wait=True, timeout=5.0):
+                    eink_s = time.monotonic() - t0
+            self.current = {"t_rollout": t_rollout, "set_s": set_s, "eink_s": eink_s}
+
+        def make_success_oracle(self, rollout, task_prompt):
+            self._performs_before = len(self.box.performs)
+            return super().make_success_oracle(rollout, task_prompt)
+
+        def performed(self):
+            return any(p["success"] for p in self.box.performs[self._performs_before:])
+
+        def ask_success(self, client_name):
+            return self.performed()
+
+        def ask_note(self, client_name):
+            return ""
+
+    return SimHooks()
+
+
+class SimResultsStore(ResultsStore):
+    """ResultsStore that adds the simulator's ground truth and timings to each result of the session."""
+
+    def __init__(self, path, hooks):
+        super().__init__(path)
+        self.hooks = hooks
+        self.session_results = []
+
+    def append_result(self, rollout, client, success, **fields):
+        current = self.hooks.current
+        fields.update(performed=self.hooks.performed(), set_s=current.get("set_s"), eink_s=current.get("eink_s"),
+                      rollout_s=time.monotonic() - current["t_rollout"] if current else None)
+        record = super().append_result(rollout, client, success, **fields)
+        self.session_results.append(record)
+        return record
+
+
+def build_report(store, hooks, rig, setup_s, loop_s):
+    judgeable = hooks.state_categories | {"push_button"}
+    results = [r for r in store.session_results if not r.get("error")]
+    errors = [r for r in store.session_results if r.get("error")]
+    disagree = [r for r in results if r["auto_judged"] and r["success"] != r["performed"]]
+    unjudged = [r for r in results if r["task_category"] in judgeable and not r["auto_judged"]]
+    for r in disagree:
+        print(f"[{r['index']}] judged {'success' if r['success'] else 'failure'} but the client "
+              f"{'performed' if r['performed'] else 'did not perform'} {r['task_prompt']!r}")
+    for r in unjudged:
+        print(f"[{r['index']}] the oracle could not judge {r['task_prompt']!r}")
+    for r in errors:
+        print(f"[{r['index']}] {r['error']}")
+
+    latency = [r.get("latency") or {} for r in results]
+    phases = {
+        "set_s": [r["set_s"] for r in results],
+        "eink_s": [r["eink_s"] for r in results],
+        "startup_s": [lat.get("startup_s") for lat in latency],
+        "client_s": [lat.get("wall_s") for lat in latency],
+        "time_to_success_s": [r["time_to_success"] for r in results],
+        "rollout_s": [r["rollout_s"] for r in results],
+    }
+    return {
+        "rollouts": len(results),
+        "errors": len(errors),
+        "setup_s": setup_s,
+        "loop_s": loop_s,
+        "rollouts_per_s": len(results) / loop_s if loop_s > 0 else None,
+        "success_rate": sum(bool(r["success"]) for r in results) / len(results) if results else None,
+        "verified": sum(bool(r["auto_judged"]) for r in results),
+        "disagreements": len(disagree),
+        "unjudged": len(unjudged),
+        "stopped_early": sum(bool(lat.get("stopped_early")) for lat in latency),
+        "phases": {name: percentiles(values) for name, values in phases.items()},
+        "broker": rig.broker.stats(),
+        "box": rig.box.stats(),
+        "results": store.path,
+    }
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Headless BusyBox evaluation against a simulated box.")
+    ap.add_argument("--rollouts", default=str(EVALUATION_DIR / "eval_rollouts.json"))
+    ap.add_argument("--limit", type=int, default=None, help="only the first N rollouts")
+    ap.add_argument("--success-rate", type=float, default=0.8)
+    ap.add_argument("--act-time", type=float, default=0.2, help="fake client seconds per rollout")
+    ap.add_argument("--startup-time", type=float, default=0.0, help="fake client model-load seconds")
+    ap.add_argument("--task-timeout", type=float, default=10.0)
+    ap.add_argument("--move-s", type=float, default=0.1, help="fake box slider / knob travel time")
+    ap.add_argument("--eink-refresh-s", type=float, default=0.05)
+    ap.add_argument("--settle-timeout", type=float, default=5.0)
+    ap.add_argument("--settle-s", type=float, default=0.05, help="SUCCESS_SETTLE_TIME of the oracle")
+    ap.add_argument("--judge-timeout", type=float, default=1.0,
+                    help="seconds a client that performed the task keeps running for the oracle to confirm it")
+    ap.add_argument("--no-eink", action="store_true", help="do not draw prompts on the e-ink display")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--results", default=None, help="results .jsonl (default: a fresh temp file)")
+    ap.add_argument("--json-out", default=None, help="write the report here")
+    ap.add_argument("--video-device", type=int, default=None, help="record each rollout from this camera")
+    ap.add_argument("--verbose", action="store_true", help="show evaluator, bridge and client output")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix="headless_eval_")
+    args.rollouts = os.path.abspath(args.rollouts)
+    args.results = os.path.abspath(args.results or os.path.join(work_dir, "results.jsonl"))
+    json_out = os.path.abspath(args.json_out) if args.json_out else None
+    with open(args.rollouts, "r") as f:
+        rollouts = json.load(f)["eval_rollouts"][:args.limit]
+    keys = rollout_keys(rollouts)
+
+    t_setup = time.monotonic()
+    rig = SimRig(box_kwargs={"move_s": args.move_s, "eink_refresh_s": args.eink_refresh_s, "seed": args.seed},
+                 verbose=args.verbose).start()
+    try:
+        os.environ["BBX_EVAL_CONFIG"] = write_config(args, work_dir, rig.box.control_port)
+        os.chdir(work_dir)  # eval_videos/ is relative to the working directory
+        import eval_bbx_client
+
+        hooks = make_sim_hooks(eval_bbx_client.SessionHooks, rig, args)
+        store = SimResultsStore(args.results, hooks)
+        clients = list(eval_bbx_client._clients)
+        store.start_session(models=[c.name for c in clients], task_count=len(rollouts), simulated=True,
+                            success_rate=args.success_rate, task_timeout=args.task_timeout)
+        setup_s = time.monotonic() - t_setup
+
+        t_loop = time.monotonic()
+        with open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+                eval_bbx_client.run_session(rollouts, keys, clients, store, hooks)
+        loop_s = time.monotonic() - t_loop
+        report = build_report(store, hooks, rig, setup_s, loop_s)
+    finally:
+        rig.close()
+
+    print(f"\n{report['rollouts']} rollouts in {report['loop_s']:.1f}s "
+          f"({report['rollouts_per_s'] or 0:.2f}/s, setup {report['setup_s']:.1f}s), "
+          f"success {100 * (report['success_rate'] or 0):.0f}%, {report['stopped_early']} stopped early, "
+          f"{report['disagreements']} of {report['verified']} judged outcomes disagree with the client, "
+          f"{report['unjudged']} unjudged, {report['errors']} errors")
+    for name, stats in report["phases"].items():
+        if stats:
+            print(f"  {name:18s} mean {stats['mean'] * 1000:7.1f} ms  p50 {stats['p50'] * 1000:7.1f} ms  "
+                  f"p95 {stats['p95'] * 1000:7.1f} ms")
+    print(f"  broker {report['broker']}")
+    print(f"  results in {report['results']}")
+    if json_out:
+        tmp_path = json_out + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, json_out)
+    return 1 if report["disagreements"] or report["unjudged"] or report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())